@@ -1,5 +1,172 @@
+import json
+
+import collegeapp_prerequisites
+import collegeapp_schedule
 import database_functions
 
+# The most credits a student may be enrolled in at once
+MAX_CREDIT_LOAD = 18
+
+# Results of Students.enroll
+ENROLLED = "enrolled"
+ALREADY_ENROLLED = "already enrolled"
+COURSE_FULL = "full"
+NO_SUCH_COURSE = "no such course"
+NO_SUCH_STUDENT = "no such student"
+CREDIT_LIMIT = "credit limit"
+SCHEDULE_CONFLICT = "schedule conflict"
+MISSING_PREREQUISITES = "missing prerequisites"
+WAITLISTED = "waitlisted"
+ALREADY_WAITLISTED = "already waitlisted"
+
+# Results of Students.withdrawl
+WITHDRAWN = "withdrawn"
+LEFT_WAITLIST = "left waitlist"
+NOT_ENROLLED = "not enrolled"
+
+# Published when a course is deleted
+COURSE_REMOVED = "course removed"
+
+# Published when an instructor is assigned to or removed from a course
+INSTRUCTOR_ASSIGNED = "instructor assigned"
+INSTRUCTOR_UNASSIGNED = "instructor unassigned"
+
+# Published when a row of one of REFERENCE_TABLES is added, edited or deleted
+REFERENCE_UPDATED = "reference updated"
+REFERENCE_TABLES = ("courses", "departments", "instructors", "staff")
+
+# Published when a student's name, email or major is edited
+STUDENT_UPDATED = "student updated"
+
+# The event published for each kind of change read from changelog (see
+# publish_changes); changes of other tables are published as REFERENCE_UPDATED
+# if they are one of REFERENCE_TABLES, and not at all otherwise
+_CHANGE_EVENTS = {
+    ("course_students", "I"): ENROLLED,
+    ("course_students", "D"): WITHDRAWN,
+    ("course_waitlist", "I"): WAITLISTED,
+    ("course_waitlist", "D"): LEFT_WAITLIST,
+    ("course_instructors", "I"): INSTRUCTOR_ASSIGNED,
+    ("course_instructors", "D"): INSTRUCTOR_UNASSIGNED,
+    ("courses", "D"): COURSE_REMOVED,
+    ("students", "U"): STUDENT_UPDATED,
+}
+
+# Callables notified after every committed enrollment change
+_enrollment_listeners = []
+
+# Whether this process also publishes the changes of other processes (see follow_changelog)
+_follow_changelog = False
+
+
+def subscribe_enrollment(listener):
+    """
+    Registers a callable to be notified of enrollment changes.
+
+    After a change is committed the listener is called with an event dict with
+    the keys "event" (ENROLLED, WAITLISTED, WITHDRAWN, LEFT_WAITLIST,
+    COURSE_REMOVED, INSTRUCTOR_ASSIGNED, INSTRUCTOR_UNASSIGNED, REFERENCE_UPDATED
+    or STUDENT_UPDATED), "course_id" (None for STUDENT_UPDATED and for a
+    REFERENCE_UPDATED event that is not about an existing course),
+    "student_id" (None for the course, instructor and reference events) and
+    "seq" (None for an event published by this process, the changelog seq for
+    one read back from changelog by publish_changes).
+    Caches use this to update themselves instead of re-reading the database.
+
+    Parameters:
+    listener (callable): The function to call with each event.
+
+    Returns:
+    None
+    """
+    if listener not in _enrollment_listeners:
+        _enrollment_listeners.append(listener)
+
+
+def unsubscribe_enrollment(listener):
+    """
+    Stops notifying a callable registered with subscribe_enrollment.
+
+    Parameters:
+    listener (callable): The function to remove.
+
+    Returns:
+    None
+    """
+    if listener in _enrollment_listeners:
+        _enrollment_listeners.remove(listener)
+
+
+def publish_enrollment(event, course_id, student_id=None):
+    """
+    Notifies every subscribed listener of a committed enrollment change.
+
+    A failing listener is reported and skipped, so it cannot undo or block the
+    change that was already committed.
+
+    Parameters:
+    event (str): The kind of change, e.g. ENROLLED or WITHDRAWN.
+    course_id (int): The id of the course that changed.
+    student_id (int, optional): The id of the student that changed.
+
+    Returns:
+    None
+    """
+    _notify({"event": event, "course_id": course_id, "student_id": student_id, "seq": None})
+
+
+def publish_changes(changes):
+    """
+    Notifies every subscribed listener of changes read from changelog.
+
+    Used by processes that follow the changelog (see follow_changelog), so that
+    caches and push clients also learn of the changes other processes made.
+    The changes of this process come back this way too, shortly after their
+    own event was published; listeners that must handle a change only once
+    tell the two apart by the event's "seq".
+
+    Parameters:
+    changes (list): Changes as returned by database_functions.changes_since.
+
+    Returns:
+    None
+    """
+    for seq, table_name, op, row_id, course_id, student_id in changes:
+        event = _CHANGE_EVENTS.get((table_name, op))
+        if event is None and table_name in REFERENCE_TABLES:
+            event = REFERENCE_UPDATED
+        if event is not None:
+            _notify({"event": event, "course_id": course_id, "student_id": student_id, "seq": seq})
+
+
+def follow_changelog():
+    """
+    Marks this process as one that publishes changelog changes (see publish_changes).
+
+    Returns:
+    None
+    """
+    global _follow_changelog
+    _follow_changelog = True
+
+
+def following_changelog():
+    """
+    Tells whether this process publishes changelog changes.
+
+    Returns:
+    bool: True after follow_changelog was called.
+    """
+    return _follow_changelog
+
+
+def _notify(message):
+    for listener in list(_enrollment_listeners):
+        try:
+            listener(message)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+
 
 class Tables:
     def __init__(self):
@@ -57,6 +224,7 @@ class Tables:
         placeholders = ", ".join(["?"] * len(values))
         command = f"INSERT INTO {table_name} VALUES ({placeholders})"
         database_functions.write_to_database(self.file, command, values)
+        self.publish_reference_update(table_name)
 
     def update_row(self, table_name, primary, primary_value, changes):
         """
@@ -81,6 +249,7 @@ class Tables:
                 WHERE {primary} = ?"""
         values = tuple(changes.values()) + (primary_value,)
         database_functions.write_to_database(self.file, command, values)
+        self.publish_reference_update(table_name, primary_value)
 
     def delete_row(self, table_name, primary_key, primary_value, extra_arguments=None):
         """
@@ -104,6 +273,182 @@ class Tables:
         else:
             command = f"DELETE FROM {table_name} WHERE {primary_key[0]} = ? AND {primary_value[1]} = ?"
             database_functions.write_to_database(self.file, command, primary_value)
+        self.publish_reference_update(table_name)
+
+    def publish_reference_update(self, table_name, row_id=None):
+        """
+        Publishes REFERENCE_UPDATED after a write to one of REFERENCE_TABLES,
+        or STUDENT_UPDATED after a student is edited.
+
+        Caches derived from these tables, such as the admin analytics and the
+        roster pages, are only told about changes through enrollment events, so
+        every row written with create_row, update_row or delete_row is announced.
+
+        Parameters:
+        table_name (str): The table that was written to.
+        row_id (int, optional): The id of the row, if known.
+
+        Returns:
+        None
+        """
+        if table_name == "courses" and row_id is None:
+            # A course was added or deleted; the prerequisite graph picks it up on reload
+            collegeapp_prerequisites.forget_graph(self.file)
+        if table_name in REFERENCE_TABLES:
+            publish_enrollment(REFERENCE_UPDATED, row_id if table_name == "courses" else None)
+        elif table_name == "students" and row_id is not None:
+            publish_enrollment(STUDENT_UPDATED, None, row_id)
+
+    def take_seat(self, c, course_id, student_id):
+        """
+        Enrolls a student in a course if a seat is free and the credit limit allows it.
+
+        The checks and the insert are one conditional INSERT ... SELECT, so they
+        are atomic when run inside an immediate transaction. The capacity check
+        reads courses.enrolled_count and the credit check reads
+        students.credit_load, both kept up to date by triggers. A student who
+        gets the seat leaves the course's waitlist in the same transaction.
+
+        Parameters:
+        c (sqlite3.Cursor): The cursor of the open transaction.
+        course_id (int): The id of the course.
+        student_id (int): The id of the student.
+
+        Returns:
+        bool: True if the student was enrolled, otherwise False.
+        """
+        c.execute(
+            """INSERT INTO course_students (course_id, student_id)
+            SELECT courses.id, students.id
+            FROM courses
+            JOIN students ON students.id = ?
+            WHERE courses.id = ?
+            AND (courses.capacity IS NULL OR courses.enrolled_count < courses.capacity)
+            AND students.credit_load + COALESCE(courses.credits, 0) <= ?
+            AND NOT EXISTS (
+                SELECT 1 FROM course_students
+                WHERE course_id = courses.id AND student_id = students.id
+            )""",
+            (student_id, course_id, MAX_CREDIT_LOAD),
+        )
+        if c.rowcount != 1:
+            return False
+        c.execute(
+            "DELETE FROM course_waitlist WHERE course_id = ? AND student_id = ?",
+            (course_id, student_id),
+        )
+        return True
+
+    def schedule_conflicts(self, c, student_id, course_id):
+        """
+        Finds the student's courses whose meeting times clash with a course.
+
+        The student's enrolled sections are loaded with one query into a
+        collegeapp_schedule.WeekIndex, which answers the overlap check with a
+        binary search per meeting day.
+
+        Parameters:
+        c (sqlite3.Cursor): The cursor of the open transaction.
+        student_id (int): The id of the student.
+        course_id (int): The id of the course the student wants to take.
+
+        Returns:
+        set: The ids of the clashing courses, empty if there is no conflict.
+        """
+        c.execute(
+            "SELECT meeting_days, start_time, end_time FROM courses WHERE id = ?",
+            (course_id,),
+        )
+        meeting = c.fetchone()
+        if meeting is None or meeting[1] is None or meeting[2] is None:
+            return set()
+
+        c.execute(
+            """SELECT courses.id, courses.meeting_days, courses.start_time, courses.end_time
+            FROM courses
+            JOIN course_students ON courses.id = course_students.course_id
+            WHERE course_students.student_id = ? AND courses.id != ?""",
+            (student_id, course_id),
+        )
+        week = collegeapp_schedule.WeekIndex.from_rows(c.fetchall())
+        return week.conflicts(*meeting)
+
+    def missing_prerequisites(self, c, student_id, course_id):
+        """
+        Finds the prerequisites of a course that the student has not taken.
+
+        The student's courses are read with one query and compared against the
+        direct prerequisites in the cached collegeapp_prerequisites graph.
+
+        Parameters:
+        c (sqlite3.Cursor): The cursor of the open transaction.
+        student_id (int): The id of the student.
+        course_id (int): The id of the course the student wants to take.
+
+        Returns:
+        list: The ids of the missing prerequisites, empty if there are none.
+        """
+        graph = collegeapp_prerequisites.get_graph(self.file)
+        if not graph.direct_prerequisites(course_id):
+            return []
+        c.execute(
+            "SELECT course_id FROM course_students WHERE student_id = ?", (student_id,)
+        )
+        taken = graph.mask(row[0] for row in c.fetchall())
+        return graph.missing(course_id, taken)
+
+    def promote_waitlist(self, c, course_id):
+        """
+        Moves students from the front of a course's waitlist into free seats.
+
+        This must be called with the cursor of an open transaction (see
+        database_functions.transaction) right after a seat may have been freed, so
+        the promotion is committed or rolled back together with the change that
+        freed the seat. The next student is found through the unique
+        (course_id, position) index, so each promotion is a single index lookup
+        no matter how long the waitlist is. A student who can no longer take the
+        seat because of the credit limit or a schedule conflict is dropped from
+        the waitlist, as is one who lacks a prerequisite.
+
+        Parameters:
+        c (sqlite3.Cursor): The cursor of the open transaction.
+        course_id (int): The id of the course whose waitlist should be promoted.
+
+        Returns:
+        list: The ids of the students that were enrolled, in waitlist order.
+        """
+        c.execute(
+            "SELECT capacity, enrolled_count FROM courses WHERE id = ?", (course_id,)
+        )
+        course = c.fetchone()
+        if course is None:
+            return []
+        capacity, enrolled_count = course
+
+        promoted = []
+        while capacity is None or enrolled_count < capacity:
+            c.execute(
+                """SELECT student_id FROM course_waitlist
+                WHERE course_id = ?
+                ORDER BY position
+                LIMIT 1""",
+                (course_id,),
+            )
+            waiting = c.fetchone()
+            if waiting is None:
+                break
+            c.execute(
+                "DELETE FROM course_waitlist WHERE course_id = ? AND student_id = ?",
+                (course_id, waiting[0]),
+            )
+            if self.schedule_conflicts(c, waiting[0], course_id):
+                continue
+            if self.missing_prerequisites(c, waiting[0], course_id):
+                continue
+            if self.take_seat(c, course_id, waiting[0]):
+                enrolled_count += 1
+                promoted.append(waiting[0])
+        return promoted
 
     def get_id(self, table, query):
         """
@@ -186,11 +531,181 @@ class Courses(Tables):
             self.id = self.get_id(self.table, self.name)
 
     def remove(self):
+        """
+        Deletes the course together with its enrollments, instructors, waitlist
+        and enrollment requests.
+
+        Everything is removed in one transaction so the enrollment counts, the
+        credit loads and the waitlist never point at a course that no longer exists.
+        """
         if self.id is not None:
-            self.delete_row(self.table, "id", self.id)
+            with database_functions.transaction(self.file) as c:
+                c.execute(
+                    """DELETE FROM course_prerequisites
+                    WHERE course_id = ? OR prerequisite_id = ?""",
+                    (self.id, self.id),
+                )
+                c.execute("DELETE FROM course_waitlist WHERE course_id = ?", (self.id,))
+                c.execute("DELETE FROM enrollment_requests WHERE course_id = ?", (self.id,))
+                c.execute("DELETE FROM course_students WHERE course_id = ?", (self.id,))
+                c.execute(
+                    "DELETE FROM course_instructors WHERE course_id = ?", (self.id,)
+                )
+                c.execute("DELETE FROM courses WHERE id = ?", (self.id,))
+            collegeapp_prerequisites.forget_graph(self.file)
+            publish_enrollment(COURSE_REMOVED, self.id)
+
+    def set_capacity(self, capacity):
+        """
+        Changes the seat limit of the course and fills any new seats from the waitlist.
+
+        Parameters:
+        capacity (int or None): The new seat limit, or None for unlimited seats.
+
+        Returns:
+        list: The ids of the waitlisted students that were enrolled.
+        """
+        with database_functions.transaction(self.file) as c:
+            c.execute("UPDATE courses SET capacity = ? WHERE id = ?", (capacity, self.id))
+            promoted = self.promote_waitlist(c, self.id)
+        for student_id in promoted:
+            publish_enrollment(ENROLLED, self.id, student_id)
+        return promoted
+
+    def set_meeting(self, days, start_time, end_time):
+        """
+        Sets the weekly meeting pattern of the course.
+
+        Parameters:
+        days (str): The meeting days, e.g. "MWF" or "TR" (see collegeapp_schedule.DAYS).
+        start_time (int): The start time in minutes since midnight.
+        end_time (int): The end time in minutes since midnight.
+
+        Returns:
+        None
+        """
+        if start_time >= end_time:
+            raise ValueError("A meeting must end after it starts")
+        command = """UPDATE courses
+                SET meeting_days = ?, start_time = ?, end_time = ?
+                WHERE id = ?"""
+        database_functions.write_to_database(
+            self.file, command, (days, start_time, end_time, self.id)
+        )
+
+    def add_prerequisite(self, prerequisite_id):
+        """
+        Requires another course to be taken before this one.
+
+        The prerequisite is checked against the cached graph for cycles and
+        written first; only then is the graph updated in place, so a failed
+        write leaves the cache as it was and the closure does not have to be
+        rebuilt from scratch.
+
+        Parameters:
+        prerequisite_id (int): The id of the course that must be taken first.
+
+        Returns:
+        None
+
+        Raises:
+        ValueError: If the prerequisite would create a cycle.
+        """
+        graph = collegeapp_prerequisites.get_graph(self.file)
+        graph.check(self.id, prerequisite_id)
+        command = """INSERT OR IGNORE INTO course_prerequisites (course_id, prerequisite_id)
+                VALUES (?, ?)"""
+        database_functions.write_to_database(
+            self.file, command, (self.id, prerequisite_id)
+        )
+        graph.add(self.id, prerequisite_id)
+
+    def remove_prerequisite(self, prerequisite_id):
+        """
+        Removes a prerequisite from the course.
+
+        Parameters:
+        prerequisite_id (int): The id of the prerequisite to remove.
+
+        Returns:
+        None
+        """
+        command = """DELETE FROM course_prerequisites
+                WHERE course_id = ? AND prerequisite_id = ?"""
+        database_functions.write_to_database(
+            self.file, command, (self.id, prerequisite_id)
+        )
+        collegeapp_prerequisites.get_graph(self.file).remove(self.id, prerequisite_id)
+
+    def get_prerequisites(self):
+        """
+        Retrieves every course that must be taken before this one, directly or not.
+
+        Returns:
+        list: The ids of the prerequisite courses.
+        """
+        return collegeapp_prerequisites.get_graph(self.file).all_prerequisites(self.id)
+
+    def get_roster(self, after_id=None, limit=50):
+        """
+        Retrieves one page of the students enrolled in the course.
+
+        Pages are fetched with keyset paging: the next page starts after the last
+        student id of the previous one, which the (course_id, student_id) primary
+        key of course_students answers with an index range scan. Deep pages of a
+        large lecture cost the same as the first page, unlike OFFSET paging.
+
+        Parameters:
+        after_id (int, optional): The last student id of the previous page.
+        limit (int): The most students to return.
+
+        Returns:
+        dict: {"students": a columnar payload (see database_functions.read_columnar)
+        with the columns id, name, email and major, "next": the after_id of the
+        next page, or None on the last page}.
+        """
+        command = """SELECT students.id, students.name, students.email, students.major
+                FROM course_students
+                JOIN students ON students.id = course_students.student_id
+                WHERE course_students.course_id = ? AND course_students.student_id > ?
+                ORDER BY course_students.student_id
+                LIMIT ?"""
+        page = database_functions.read_columnar(
+            self.file,
+            command,
+            (self.id, after_id if after_id is not None else -1, limit + 1),
+            ("major",),
+        )
+        ids = page["data"]["id"]
+        next_id = None
+        if len(ids) > limit:
+            for column in page["columns"]:
+                del page["data"][column][limit:]
+            next_id = ids[-1]
+        return {"students": page, "next": next_id}
+
+    def get_waitlist(self):
+        """
+        Retrieves the students waiting for a seat in the course, first in line first.
+
+        Returns:
+        list: A list of (student_id, position) tuples.
+        """
+        command = """SELECT student_id, position FROM course_waitlist
+                WHERE course_id = ?
+                ORDER BY position"""
+        return database_functions.read_from_database(
+            self.file, command, "all", (self.id,)
+        )
 
     def update_course(
-        self, name=None, department_id=None, description=None, credits=None, id=None
+        self,
+        name=None,
+        department_id=None,
+        description=None,
+        credits=None,
+        id=None,
+        capacity=None,
     ):
         """
         Updates the department's name or description.
@@ -198,6 +713,8 @@ class Courses(Tables):
         Parameters:
         name (str): The new name for the department (optional).
         description (str): The new description for the department (optional).
+        capacity (int): The new seat limit of the course (optional); new seats
+        are filled from the waitlist, see set_capacity.
 
         Note:
         Only the provided attributes will be updated. If both are provided,
@@ -217,6 +734,8 @@ class Courses(Tables):
 
         if changes:
             self.update_row(self.table, "id", self.id, changes)
+        if capacity is not None:
+            self.set_capacity(capacity)
 
     def get_instructor(self):
         command = f"""SELECT instructors.name
@@ -269,26 +788,229 @@ class Students(Tables):
         if changes:
             self.update_row(self.table, "id", self.id, changes)
 
-    def enroll(self, course_id):
-        if self.id is not None:
-            class_exist = self.validation("courses", "*", "id", course_id)
-            if class_exist:
-                enrolled_check = self.validation(
-                    "course_students", "*", course_id, self.id
-                )
-                if enrolled_check == False:
-                    self.create_row("course_students", (course_id, self.id))
+    def enroll(self, course_id, waitlist=True):
+        """
+        Enrolls the student in a course, or puts them on its waitlist if it is full.
+
+        The seat is taken with a single conditional INSERT ... SELECT (see
+        take_seat) that only inserts while enrolled_count is below the course
+        capacity and the student's credit_load stays within MAX_CREDIT_LOAD. It
+        runs inside an immediate transaction, so two students racing for the last
+        seat are serialized by SQLite and the course can never be oversold. A
+        student who does not get a seat is appended to the end of the course's
+        waitlist. A course that meets at the same time as one of the student's
+        courses, or whose prerequisites the student has not taken, is rejected
+        before any seat is taken.
+
+        Parameters:
+        course_id (int): The id of the course to enroll in.
+        waitlist (bool): Whether to join the waitlist when the course is full.
+
+        Returns:
+        str: One of ENROLLED, WAITLISTED, ALREADY_ENROLLED, ALREADY_WAITLISTED,
+        COURSE_FULL, CREDIT_LIMIT, SCHEDULE_CONFLICT, MISSING_PREREQUISITES,
+        NO_SUCH_COURSE or NO_SUCH_STUDENT.
+        """
+        if self.id is None:
+            return NO_SUCH_STUDENT
+
+        with database_functions.transaction(self.file) as c:
+            result = self.place(c, course_id, waitlist)
+        if result in (ENROLLED, WAITLISTED):
+            publish_enrollment(result, course_id, self.id)
+        return result
+
+    def place(self, c, course_id, waitlist):
+        """
+        Runs the checks and the seat allocation of enroll inside an open transaction.
+
+        Parameters:
+        c (sqlite3.Cursor): The cursor of the open transaction.
+        course_id (int): The id of the course to enroll in.
+        waitlist (bool): Whether to join the waitlist when the course is full.
+
+        Returns:
+        str: The enrollment result, as described in enroll.
+        """
+        c.execute(
+            "SELECT 1 FROM course_students WHERE course_id = ? AND student_id = ?",
+            (course_id, self.id),
+        )
+        if c.fetchone() is not None:
+            return ALREADY_ENROLLED
+        if self.missing_prerequisites(c, self.id, course_id):
+            return MISSING_PREREQUISITES
+        if self.schedule_conflicts(c, self.id, course_id):
+            return SCHEDULE_CONFLICT
+        if self.take_seat(c, course_id, self.id):
+            return ENROLLED
+
+        c.execute("SELECT credits FROM courses WHERE id = ?", (course_id,))
+        course = c.fetchone()
+        if course is None:
+            return NO_SUCH_COURSE
+        c.execute("SELECT credit_load FROM students WHERE id = ?", (self.id,))
+        student = c.fetchone()
+        if student is None:
+            return NO_SUCH_STUDENT
+        if student[0] + (course[0] or 0) > MAX_CREDIT_LOAD:
+            return CREDIT_LIMIT
+        if not waitlist:
+            return COURSE_FULL
+
+        c.execute(
+            """INSERT OR IGNORE INTO course_waitlist (course_id, student_id, position)
+            SELECT ?, ?, COALESCE(MAX(position), 0) + 1
+            FROM course_waitlist
+            WHERE course_id = ?""",
+            (course_id, self.id, course_id),
+        )
+        if c.rowcount == 1:
+            return WAITLISTED
+        return ALREADY_WAITLISTED
 
     def withdrawl(self, course_id):
-        enrolled_check = self.validation("course_students", "*", course_id, self.id)
-        if enrolled_check:
-            self.delete_row(
-                "course_students", ("course_id", "student_id"), (course_id, self.id)
+        """
+        Withdraws the student from a course or from the course's waitlist.
+
+        When a seat is freed, the next student on the waitlist is enrolled in the
+        same transaction.
+
+        Parameters:
+        course_id (int): The id of the course to withdraw from.
+
+        Returns:
+        str: One of WITHDRAWN, LEFT_WAITLIST or NOT_ENROLLED.
+        """
+        promoted = []
+        with database_functions.transaction(self.file) as c:
+            c.execute(
+                "DELETE FROM course_students WHERE course_id = ? AND student_id = ?",
+                (course_id, self.id),
             )
+            if c.rowcount == 1:
+                promoted = self.promote_waitlist(c, course_id)
+                result = WITHDRAWN
+            else:
+                c.execute(
+                    "DELETE FROM course_waitlist WHERE course_id = ? AND student_id = ?",
+                    (course_id, self.id),
+                )
+                if c.rowcount == 1:
+                    result = LEFT_WAITLIST
+                else:
+                    result = NOT_ENROLLED
+
+        if result != NOT_ENROLLED:
+            publish_enrollment(result, course_id, self.id)
+        for student_id in promoted:
+            publish_enrollment(ENROLLED, course_id, student_id)
+        return result
 
     def remove(self):
-        if self.id is not None:
-            self.delete_row(self.table, "id", self.id)
+        """
+        Deletes the student together with their enrollments, waitlist places and
+        enrollment requests.
+
+        Everything is removed in one transaction, and the seats the student held
+        are given to the next students on those courses' waitlists in the same
+        transaction, so the enrollment counts never include a deleted student.
+        """
+        if self.id is None:
+            return
+        promoted = {}
+        with database_functions.transaction(self.file) as c:
+            c.execute("SELECT course_id FROM course_students WHERE student_id = ?", (self.id,))
+            course_ids = [row[0] for row in c.fetchall()]
+            c.execute("DELETE FROM course_waitlist WHERE student_id = ?", (self.id,))
+            c.execute("DELETE FROM enrollment_requests WHERE student_id = ?", (self.id,))
+            c.execute("DELETE FROM course_students WHERE student_id = ?", (self.id,))
+            c.execute("DELETE FROM students WHERE id = ?", (self.id,))
+            for course_id in course_ids:
+                promoted[course_id] = self.promote_waitlist(c, course_id)
+
+        for course_id, student_ids in promoted.items():
+            publish_enrollment(WITHDRAWN, course_id, self.id)
+            for student_id in student_ids:
+                publish_enrollment(ENROLLED, course_id, student_id)
+
+    def request_enrollment(self, course_id, preference=1):
+        """
+        Records a request to enroll in a course at the next batch allocation run.
+
+        During a registration window students file requests instead of enrolling
+        directly, and collegeapp_lottery.run_allocation seats everyone at once.
+        Filing a request for the same course again updates its preference.
+
+        Parameters:
+        course_id (int): The id of the requested course.
+        preference (int): The student's ranking of the course, 1 being the top choice.
+
+        Returns:
+        None
+        """
+        command = """INSERT INTO enrollment_requests (student_id, course_id, preference)
+                VALUES (?, ?, ?)
+                ON CONFLICT (student_id, course_id) DO UPDATE SET preference = excluded.preference"""
+        database_functions.write_to_database(
+            self.file, command, (self.id, course_id, preference)
+        )
+
+    def check_cart(self, course_ids):
+        """
+        Checks a proposed cart of courses for meeting time conflicts all at once.
+
+        The student's current week is indexed once and every cart course is
+        checked against it and against the other cart courses (see
+        collegeapp_schedule.WeekIndex.check_cart).
+
+        Parameters:
+        course_ids (list): The ids of the courses in the cart, in priority order.
+
+        Returns:
+        dict: A mapping of course id to the list of course ids it clashes with,
+        for the cart courses that have a conflict.
+        """
+        enrolled_command = """SELECT courses.id, courses.meeting_days,
+                    courses.start_time, courses.end_time
+                FROM courses
+                JOIN course_students ON courses.id = course_students.course_id
+                WHERE course_students.student_id = ?"""
+        enrolled = database_functions.read_from_database(
+            self.file, enrolled_command, "all", (self.id,)
+        )
+
+        cart_command = """SELECT id, meeting_days, start_time, end_time
+                FROM courses
+                WHERE id IN (SELECT value FROM json_each(?))"""
+        sections = database_functions.read_from_database(
+            self.file, cart_command, "all", (json.dumps(list(course_ids)),)
+        )
+        order = {course_id: position for position, course_id in enumerate(course_ids)}
+        sections = sorted(sections or [], key=lambda section: order[section[0]])
+
+        week = collegeapp_schedule.WeekIndex.from_rows(enrolled or [])
+        clashes = week.check_cart(sections)
+        return {course_id: sorted(found) for course_id, found in clashes.items()}
+
+    def get_eligible_courses(self):
+        """
+        Lists every course in the catalog the student may take next.
+
+        A course is eligible when the student is not already in it and has taken
+        or is taking all of its direct prerequisites. The whole catalog is checked with bitset
+        operations on the cached prerequisite closure, after one query for the
+        student's courses.
+
+        Returns:
+        list: The ids of the eligible courses.
+        """
+        command = "SELECT course_id FROM course_students WHERE student_id = ?"
+        taken = database_functions.read_from_database(
+            self.file, command, "all", (self.id,)
+        )
+        graph = collegeapp_prerequisites.get_graph(self.file)
+        return graph.eligible(graph.mask(row[0] for row in taken or []))
 
     def get_courses(self):
         columns = [
@@ -317,6 +1039,53 @@ class Students(Tables):
         print(classes_registered)
         return classes_registered
 
+    def get_schedule(self, dictionary_columns=("instructor",)):
+        """
+        Retrieves the student's courses together with their instructors in one query.
+
+        The result is a column-oriented payload (see database_functions.read_columnar)
+        with the columns id, name, department_id, description, credits and instructor.
+        Courses taught by more than one instructor list every name, comma separated.
+
+        Parameters:
+        dictionary_columns (iterable): The names of the columns to dictionary encode.
+
+        Returns:
+        dict: The columnar payload of the student's schedule.
+        """
+        command = """SELECT courses.id, courses.name, courses.department_id,
+                    courses.description, courses.credits,
+                    GROUP_CONCAT(instructors.name, ', ') AS instructor
+                FROM courses
+                JOIN course_students ON courses.id = course_students.course_id
+                LEFT JOIN course_instructors ON courses.id = course_instructors.course_id
+                LEFT JOIN instructors ON instructors.id = course_instructors.instructor_id
+                WHERE course_students.student_id = ?
+                GROUP BY courses.id
+                ORDER BY courses.id"""
+        return database_functions.read_columnar(
+            self.file, command, (self.id,), dictionary_columns
+        )
+
+    def get_schedule_ids(self):
+        """
+        Retrieves the student's courses and their instructors as ids only.
+
+        The front end resolves the names from its cached copy of the courses and
+        instructors tables, so only the pairs of ids are sent. A course without an
+        instructor appears once with an instructor_id of None.
+
+        Returns:
+        dict: A columnar payload with the columns course_id and instructor_id.
+        """
+        command = """SELECT course_students.course_id, course_instructors.instructor_id
+                FROM course_students
+                LEFT JOIN course_instructors
+                    ON course_instructors.course_id = course_students.course_id
+                WHERE course_students.student_id = ?
+                ORDER BY course_students.course_id"""
+        return database_functions.read_columnar(self.file, command, (self.id,))
+
 
 class Instructors(Tables):
     def __init__(self, name, email, department_id, id=None):
@@ -358,27 +1127,87 @@ class Instructors(Tables):
             self.update_row(self.table, "id", self.id, changes)
 
     def assign_course(self, course_id):
-        if self.id is not None:
-            class_exist = self.validation("courses", "*", "id", course_id)
-            if class_exist:
-                assigned_check = self.validation(
-                    "course_instructors", "*", course_id, self.id
-                )
-                if assigned_check == False:
-                    self.create_row("course_instructors", (course_id, self.id))
+        """
+        Assigns the instructor to teach a course.
+
+        Publishes INSTRUCTOR_ASSIGNED once the assignment is committed, so the
+        views of the course's students and of its roster can be refreshed.
+
+        Parameters:
+        course_id (int): The id of the course.
+
+        Returns:
+        bool: True if the instructor was assigned, False if the course does not
+        exist or the instructor already teaches it.
+        """
+        if self.id is None:
+            return False
+        with database_functions.transaction(self.file) as c:
+            c.execute(
+                """INSERT OR IGNORE INTO course_instructors (course_id, instructor_id)
+                SELECT id, ? FROM courses WHERE id = ?""",
+                (self.id, course_id),
+            )
+            assigned = c.rowcount > 0
+        if assigned:
+            publish_enrollment(INSTRUCTOR_ASSIGNED, course_id)
+        return assigned
 
     def unassign(self, course_id):
-        assigned_check = self.validation("course_instructors", "*", course_id, self.id)
-        if assigned_check:
-            self.delete_row(
-                "course_instructors",
-                ("course_id", "instructor_id"),
+        """
+        Removes the instructor from a course.
+
+        Parameters:
+        course_id (int): The id of the course.
+
+        Returns:
+        bool: True if the instructor taught the course and was removed.
+        """
+        with database_functions.transaction(self.file) as c:
+            c.execute(
+                "DELETE FROM course_instructors WHERE course_id = ? AND instructor_id = ?",
                 (course_id, self.id),
             )
+            unassigned = c.rowcount > 0
+        if unassigned:
+            publish_enrollment(INSTRUCTOR_UNASSIGNED, course_id)
+        return unassigned
 
     def remove(self):
-        if self.id is not None:
-            self.delete_row(self.table, "id", self.id)
+        """
+        Deletes the instructor together with their course assignments and availability.
+
+        Everything is removed in one transaction, and INSTRUCTOR_UNASSIGNED is
+        published for every course the instructor taught.
+        """
+        if self.id is None:
+            return
+        with database_functions.transaction(self.file) as c:
+            c.execute(
+                "SELECT course_id FROM course_instructors WHERE instructor_id = ?", (self.id,)
+            )
+            course_ids = [row[0] for row in c.fetchall()]
+            c.execute("DELETE FROM course_instructors WHERE instructor_id = ?", (self.id,))
+            c.execute("DELETE FROM instructor_availability WHERE instructor_id = ?", (self.id,))
+            c.execute("DELETE FROM instructors WHERE id = ?", (self.id,))
+        for course_id in course_ids:
+            publish_enrollment(INSTRUCTOR_UNASSIGNED, course_id)
+
+    def get_courses(self):
+        """
+        Retrieves the courses the instructor teaches, with their enrollment counts.
+
+        Returns:
+        dict: A columnar payload with the columns id, name, department_id,
+        credits, enrolled_count and capacity.
+        """
+        command = """SELECT courses.id, courses.name, courses.department_id,
+                    courses.credits, courses.enrolled_count, courses.capacity
+                FROM courses
+                JOIN course_instructors ON courses.id = course_instructors.course_id
+                WHERE course_instructors.instructor_id = ?
+                ORDER BY courses.id"""
+        return database_functions.read_columnar(self.file, command, (self.id,))
 
 
 class Staff(Tables):
@@ -451,3 +1280,225 @@ class Views:
         data = database_functions.read_from_database(self.file, command)
 
         return data
+
+    def get_table_columnar(self, table, columns="*", dictionary_columns=()):
+        """
+        Retrieves the given table as a column-oriented payload.
+
+        Works like get_table_data, but the result is shaped for sending to the
+        front end: one list per column instead of one tuple per row, with the
+        columns in 'dictionary_columns' dictionary encoded.
+
+        Parameters:
+        table (str): The name of the table to retrieve data from.
+        columns (str): A comma-separated string of column names to retrieve, or "*" to retrieve all columns.
+        dictionary_columns (iterable): The names of the columns to dictionary encode.
+
+        Returns:
+        dict: The columnar payload built by database_functions.read_columnar.
+        """
+        command = f"SELECT {columns} FROM {table}"
+
+        return database_functions.read_columnar(
+            self.file, command, dictionary_columns=dictionary_columns
+        )
+
+    def get_table_page(self, table, after_id=None, limit=50, dictionary_columns=()):
+        """
+        Retrieves one page of a table, in id order.
+
+        Pages are fetched with keyset paging on the id primary key, like
+        Courses.get_roster, so every page costs the same however deep it is.
+
+        Parameters:
+        table (str): The name of the table, which must have an id column.
+        after_id (int, optional): The last id of the previous page.
+        limit (int): The most rows to return.
+        dictionary_columns (iterable): The names of the columns to dictionary encode.
+
+        Returns:
+        dict: {"rows": a columnar payload of the page, "next": the after_id of the
+        next page, or None on the last page}.
+        """
+        command = f"SELECT * FROM {table} WHERE id > ? ORDER BY id LIMIT ?"
+        page = database_functions.read_columnar(
+            self.file,
+            command,
+            (after_id if after_id is not None else -1, limit + 1),
+            dictionary_columns,
+        )
+        ids = page["data"]["id"]
+        next_id = None
+        if len(ids) > limit:
+            for column in page["columns"]:
+                del page["data"][column][limit:]
+            next_id = ids[-1]
+        return {"rows": page, "next": next_id}
+
+    def get_table_delta(self, table, since_version=None, columns="*", dictionary_columns=()):
+        """
+        Retrieves the rows of a table that changed since a data version.
+
+        The changed rows are found through database_functions.changes_since's
+        changelog, so a client that already holds the table only receives what
+        was inserted, updated or deleted since its version. Everything is read in
+        one transaction, so the returned version matches the returned rows. When
+        the client has no version yet, or the changelog no longer reaches back to
+        it, the whole table is returned instead.
+
+        Parameters:
+        table (str): The name of the table, one of database_functions.CHANGELOG_TABLES.
+        since_version (int, optional): The version the client holds.
+        columns (str): A comma-separated string of column names to retrieve, or "*"
+        to retrieve all columns; the first column should be the id.
+        dictionary_columns (iterable): The names of the columns to dictionary encode.
+
+        Returns:
+        dict: {"version": int, "full": bool, "rows": columnar payload of the
+        changed rows (or of every row when full), "deleted": [ids]}.
+        """
+        with database_functions.transaction(self.file, "DEFERRED") as c:
+            c.execute(
+                """SELECT COALESCE((SELECT MAX(seq) FROM changelog), 0),
+                    COALESCE((SELECT value FROM changelog_state WHERE name = 'horizon'), 0)"""
+            )
+            version, horizon = c.fetchone()
+            version = max(version, horizon)
+            if since_version is None or not horizon <= since_version <= version:
+                c.execute(f"SELECT {columns} FROM {table}")
+                return {
+                    "version": version,
+                    "full": True,
+                    "rows": database_functions.fetch_columnar(c, dictionary_columns),
+                    "deleted": [],
+                }
+
+            changed = """SELECT row_id FROM changelog
+                    WHERE table_name = ? AND seq > ? AND seq <= ?"""
+            values = (table, since_version, version)
+            c.execute(
+                f"SELECT {columns} FROM {table} WHERE rowid IN ({changed})", values
+            )
+            rows = database_functions.fetch_columnar(c, dictionary_columns)
+            c.execute(
+                f"""SELECT DISTINCT row_id FROM changelog
+                WHERE table_name = ? AND seq > ? AND seq <= ?
+                    AND row_id NOT IN (SELECT rowid FROM {table})""",
+                values,
+            )
+            deleted = [row[0] for row in c.fetchall()]
+
+        return {"version": version, "full": False, "rows": rows, "deleted": deleted}
+
+    def get_course_enrollment(self, department_id=None):
+        """
+        Lists courses together with the number of students enrolled in each.
+
+        The counts come from the courses.enrolled_count column, which is kept up to
+        date by triggers on course_students, so no rows of the join table are counted.
+
+        Parameters:
+        department_id (int, optional): Only list courses of this department.
+
+        Returns:
+        list: A list of (id, name, department_id, credits, enrolled_count) tuples.
+        """
+        command = """SELECT id, name, department_id, credits, enrolled_count
+                FROM courses"""
+        if department_id is None:
+            return database_functions.read_from_database(
+                self.file, command + " ORDER BY id"
+            )
+        command += " WHERE department_id = ? ORDER BY id"
+        return database_functions.read_from_database(
+            self.file, command, "all", (department_id,)
+        )
+
+    def get_enrolled_count(self, course_id):
+        """
+        Retrieves the number of students enrolled in a single course.
+
+        Parameters:
+        course_id (int): The id of the course.
+
+        Returns:
+        int or None: The enrolled count, or None if the course does not exist.
+        """
+        command = "SELECT enrolled_count FROM courses WHERE id = ?"
+        result = database_functions.read_from_database(
+            self.file, command, "one", (course_id,)
+        )
+        if result:
+            return result[0]
+        else:
+            return None
+
+    def get_credit_loads(self, student_ids):
+        """
+        Retrieves the current credit load of many students with a single query.
+
+        The ids are passed as one JSON array parameter and expanded with json_each,
+        so the query does not hit SQLite's limit on the number of bound variables.
+
+        Parameters:
+        student_ids (list): The ids of the students to look up.
+
+        Returns:
+        dict: A mapping of student id to credit load. Unknown ids are left out.
+        """
+        command = """SELECT id, credit_load FROM students
+                WHERE id IN (SELECT value FROM json_each(?))"""
+        rows = database_functions.read_from_database(
+            self.file, command, "all", (json.dumps(list(student_ids)),)
+        )
+        return dict(rows or [])
+
+    def get_dashboard(self, limit=5):
+        """
+        Retrieves the admin dashboard figures from the summary tables.
+
+        Nothing here scans a live table: the counts come from summary_counts and
+        summary_major_enrollment, the unassigned courses from
+        summary_unassigned_courses, and the largest and emptiest courses are read
+        through the index on courses.enrolled_count.
+
+        Parameters:
+        limit (int): How many of the largest and emptiest courses to list.
+
+        Returns:
+        dict: {"counts": {name: value}, "majors": [(major, students), ...],
+        "largest": [(id, name, enrolled_count, capacity), ...], "emptiest": [...],
+        "unassigned": [(id, name), ...]}.
+        """
+        counts = database_functions.read_from_database(
+            self.file, "SELECT name, value FROM summary_counts"
+        )
+        majors = database_functions.read_from_database(
+            self.file,
+            """SELECT major, students FROM summary_major_enrollment
+            WHERE students > 0
+            ORDER BY students DESC, major""",
+        )
+        course_command = """SELECT id, name, enrolled_count, capacity FROM courses
+                ORDER BY enrolled_count {order}
+                LIMIT ?"""
+        largest = database_functions.read_from_database(
+            self.file, course_command.format(order="DESC"), "all", (limit,)
+        )
+        emptiest = database_functions.read_from_database(
+            self.file, course_command.format(order="ASC"), "all", (limit,)
+        )
+        unassigned = database_functions.read_from_database(
+            self.file,
+            """SELECT courses.id, courses.name
+            FROM summary_unassigned_courses
+            JOIN courses ON courses.id = summary_unassigned_courses.course_id
+            ORDER BY courses.id""",
+        )
+        return {
+            "counts": dict(counts or []),
+            "majors": majors,
+            "largest": largest,
+            "emptiest": emptiest,
+            "unassigned": unassigned,
+        }
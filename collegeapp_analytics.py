@@ -0,0 +1,195 @@
+import threading
+
+import collegeapp
+import database_functions
+
+# One analytics cache per database file
+_analytics = {}
+
+
+class DepartmentAnalytics:
+    """
+    Per-department statistics for the admin view, cached between requests.
+
+    The figures are computed with a few aggregate queries and then kept current
+    from enrollment events (see collegeapp.subscribe_enrollment): enrolling or
+    withdrawing a student only adjusts the counters of the course's department.
+    Any other event, such as a removed course or an edited course, department,
+    instructor or staff member (collegeapp.REFERENCE_UPDATED), marks the cache
+    stale so the next read runs the queries again. So does any event read back
+    from the changelog (see collegeapp.publish_changes), since this process may
+    already have counted the change when it made it.
+
+    Reads may come from the batch endpoint's pool threads while events arrive
+    on the hub, so the figures are guarded by a lock, which is never held while
+    the database is read. Figures computed while an event came in are kept
+    but stay stale, as they may predate the event.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.departments = {}
+        self.instructors = {}
+        self.courses = {}
+        self.stale = True
+        self.lock = threading.Lock()
+        self.generation = 0
+
+    def refresh(self):
+        """
+        Recomputes every figure from the database.
+
+        Returns:
+        None
+        """
+        with self.lock:
+            generation = self.generation
+
+        departments = {}
+        for department_id, name in database_functions.read_from_database(
+            self.file, "SELECT id, name FROM departments ORDER BY id"
+        ) or []:
+            departments[department_id] = {
+                "id": department_id,
+                "name": name,
+                "courses": 0,
+                "enrollment": 0,
+                "credit_hours": 0,
+                "instructors": 0,
+                "teaching_credits": 0,
+                "staff": 0,
+            }
+
+        rows = database_functions.read_from_database(
+            self.file,
+            """SELECT department_id, id, COALESCE(credits, 0), enrolled_count
+            FROM courses""",
+        )
+        courses = {}
+        for department_id, course_id, credits, enrolled in rows or []:
+            courses[course_id] = (department_id, credits)
+            if department_id in departments:
+                department = departments[department_id]
+                department["courses"] += 1
+                department["enrollment"] += enrolled
+                department["credit_hours"] += credits * enrolled
+
+        rows = database_functions.read_from_database(
+            self.file,
+            """SELECT instructors.id, instructors.name, instructors.department_id,
+                COUNT(courses.id), COALESCE(SUM(courses.credits), 0)
+            FROM instructors
+            LEFT JOIN course_instructors ON instructors.id = course_instructors.instructor_id
+            LEFT JOIN courses ON courses.id = course_instructors.course_id
+            GROUP BY instructors.id""",
+        )
+        instructors = {}
+        for instructor_id, name, department_id, course_count, credits in rows or []:
+            instructors[instructor_id] = {
+                "id": instructor_id,
+                "name": name,
+                "department_id": department_id,
+                "courses": course_count,
+                "credits": credits,
+            }
+            if department_id in departments:
+                departments[department_id]["instructors"] += 1
+                departments[department_id]["teaching_credits"] += credits
+
+        rows = database_functions.read_from_database(
+            self.file,
+            "SELECT department_id, COUNT(*) FROM staff GROUP BY department_id",
+        )
+        for department_id, headcount in rows or []:
+            if department_id in departments:
+                departments[department_id]["staff"] = headcount
+
+        with self.lock:
+            self.departments = departments
+            self.instructors = instructors
+            self.courses = courses
+            self.stale = generation != self.generation
+
+    def on_enrollment(self, event):
+        """
+        Applies an enrollment event to the cached figures.
+
+        Parameters:
+        event (dict): An event published by collegeapp.publish_enrollment.
+
+        Returns:
+        None
+        """
+        if event["event"] in (
+            collegeapp.WAITLISTED,
+            collegeapp.LEFT_WAITLIST,
+            collegeapp.STUDENT_UPDATED,
+        ):
+            return
+        if event["event"] == collegeapp.ENROLLED and event["seq"] is None:
+            change = 1
+        elif event["event"] == collegeapp.WITHDRAWN and event["seq"] is None:
+            change = -1
+        else:
+            self.invalidate()
+            return
+
+        with self.lock:
+            self.generation += 1
+            if self.stale:
+                return
+            course = self.courses.get(event["course_id"])
+            if course is None:
+                self.stale = True
+                return
+            department_id, credits = course
+            if department_id in self.departments:
+                department = self.departments[department_id]
+                department["enrollment"] += change
+                department["credit_hours"] += change * credits
+
+    def invalidate(self):
+        """
+        Marks the cache stale so the next read recomputes it.
+
+        Returns:
+        None
+        """
+        with self.lock:
+            self.generation += 1
+            self.stale = True
+
+    def get_summary(self):
+        """
+        Returns the department and instructor figures, refreshing them if needed.
+
+        Returns:
+        dict: {"departments": [...], "instructors": [...]}, each a list of dicts.
+        Departments have the keys id, name, courses, enrollment, credit_hours
+        (credits times enrolled students), instructors, teaching_credits and
+        staff. Instructors have id, name, department_id, courses and credits.
+        """
+        if self.stale:
+            self.refresh()
+        with self.lock:
+            return {
+                "departments": [dict(department) for department in self.departments.values()],
+                "instructors": [dict(instructor) for instructor in self.instructors.values()],
+            }
+
+
+def get_analytics(file):
+    """
+    Returns the analytics cache of a database, subscribing it to enrollment events.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+
+    Returns:
+    DepartmentAnalytics: The shared cache.
+    """
+    if file not in _analytics:
+        analytics = DepartmentAnalytics(file)
+        collegeapp.subscribe_enrollment(analytics.on_enrollment)
+        _analytics[file] = analytics
+    return _analytics[file]
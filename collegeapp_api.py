@@ -0,0 +1,195 @@
+import gzip
+import hashlib
+import json
+
+import bottle
+
+import collegeapp_controller
+
+# The tables that can be listed page by page
+LIST_TABLES = ("students", "courses", "departments", "instructors", "staff")
+
+# The columns of each listed table worth dictionary encoding
+DICTIONARY_COLUMNS = {"students": ("major",), "staff": ("role",)}
+
+# The default and the largest page size of the list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Responses smaller than this many bytes are not worth compressing
+GZIP_MIN_SIZE = 1024
+
+
+def json_response(data, status=200):
+    """
+    Builds a JSON response with an ETag, compressed when the client accepts gzip.
+
+    The ETag is a hash of the body, so a client that sends it back in
+    If-None-Match gets an empty 304 when nothing changed.
+
+    Parameters:
+    data: The value to send, serializable to JSON.
+    status (int): The HTTP status code.
+
+    Returns:
+    bottle.HTTPResponse: The response.
+    """
+    body = json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    headers = {
+        "Content-Type": "application/json",
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+    }
+
+    if status == 200 and etag in bottle.request.get_header("If-None-Match", ""):
+        return bottle.HTTPResponse(status=304, headers=headers)
+
+    if len(body) >= GZIP_MIN_SIZE and "gzip" in bottle.request.get_header("Accept-Encoding", ""):
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return bottle.HTTPResponse(body=body, status=status, headers=headers)
+
+
+def error_response(status, message):
+    """
+    Builds a JSON error response.
+
+    Parameters:
+    status (int): The HTTP status code.
+    message (str): What went wrong.
+
+    Returns:
+    bottle.HTTPResponse: The response.
+    """
+    return json_response({"error": message}, status)
+
+
+def query_int(name, default=None, minimum=None, maximum=None):
+    """
+    Reads an integer query parameter.
+
+    Parameters:
+    name (str): The name of the parameter.
+    default (int, optional): The value when the parameter is missing.
+    minimum (int, optional): The smallest value allowed; smaller values are raised.
+    maximum (int, optional): The largest value allowed; larger values are capped.
+
+    Returns:
+    int or None: The value.
+
+    Raises:
+    ValueError: If the parameter is not an integer.
+    """
+    value = bottle.request.query.get(name)
+    if value is None or value == "":
+        return default
+    value = int(value)
+    if minimum is not None:
+        value = max(value, minimum)
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
+
+def student_data(student_id):
+    """
+    Builds the student dict the controller functions expect from an id.
+
+    Parameters:
+    student_id (int): The id of the student.
+
+    Returns:
+    dict: The student, with only the id filled in.
+    """
+    return {"id": student_id, "name": None, "email": None, "major": None}
+
+
+def build_app():
+    """
+    Builds a bottle app that serves the controller functions as a JSON API.
+
+    Every route is under /api:
+    - GET /api/<table>?after_id=&limit=, one page of a table in LIST_TABLES
+    - GET /api/versions, the data version of the reference tables
+    - GET /api/students/<id>/schedule, transcript and eligible-courses
+    - POST /api/students/<id>/enrollments with {"course_id": ...}
+    - GET /api/instructors/<id>/courses
+    - GET /api/courses/<id>/roster?after_id=&limit=
+    - GET /api/admin/analytics and /api/admin/dashboard
+
+    Returns:
+    bottle.Bottle: The app. eel.start(app=...) adds the Eel routes to it.
+    """
+    app = bottle.Bottle()
+
+    @app.get("/api/versions")
+    def versions():
+        return json_response(collegeapp_controller.get_versions())
+
+    @app.get("/api/students/<student_id:int>/schedule")
+    def schedule(student_id):
+        return json_response(
+            collegeapp_controller.process_student_schedule(student_data(student_id))
+        )
+
+    @app.get("/api/students/<student_id:int>/transcript")
+    def transcript(student_id):
+        return json_response(collegeapp_controller.get_transcript(student_id))
+
+    @app.get("/api/students/<student_id:int>/eligible-courses")
+    def eligible_courses(student_id):
+        return json_response(
+            collegeapp_controller.get_eligible_courses(student_data(student_id))
+        )
+
+    @app.post("/api/students/<student_id:int>/enrollments")
+    def enroll(student_id):
+        body = bottle.request.json or {}
+        if not isinstance(body.get("course_id"), int):
+            return error_response(400, "course_id must be an integer")
+        result = collegeapp_controller.enroll_student(
+            student_data(student_id), body["course_id"]
+        )
+        return json_response({"result": result})
+
+    @app.get("/api/instructors/<instructor_id:int>/courses")
+    def instructor_courses(instructor_id):
+        return json_response(collegeapp_controller.get_instructor_courses(instructor_id))
+
+    @app.get("/api/courses/<course_id:int>/roster")
+    def roster(course_id):
+        try:
+            after_id = query_int("after_id")
+            limit = query_int("limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        except ValueError:
+            return error_response(400, "after_id and limit must be integers")
+        return json_response(
+            collegeapp_controller.get_course_roster(course_id, after_id, limit)
+        )
+
+    @app.get("/api/admin/analytics")
+    def analytics():
+        return json_response(collegeapp_controller.get_department_analytics())
+
+    @app.get("/api/admin/dashboard")
+    def dashboard():
+        return json_response(collegeapp_controller.get_admin_dashboard())
+
+    @app.get("/api/<table>")
+    def list_table(table):
+        if table not in LIST_TABLES:
+            return error_response(404, f"Unknown table: {table}")
+        try:
+            after_id = query_int("after_id")
+            limit = query_int("limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        except ValueError:
+            return error_response(400, "after_id and limit must be integers")
+        return json_response(
+            collegeapp_controller.grab_page(
+                table, after_id, limit, DICTIONARY_COLUMNS.get(table, ())
+            )
+        )
+
+    return app
@@ -0,0 +1,253 @@
+import concurrent.futures
+import heapq
+
+import collegeapp
+import database_functions
+
+# The credit hours an instructor may teach when no capacity is given for them
+DEFAULT_INSTRUCTOR_CAPACITY = 12
+
+
+def load_departments(file, capacities=None):
+    """
+    Reads the unassigned courses and the instructors of every department.
+
+    A course is unassigned when it has no course_instructors row. An instructor's
+    current load is the credit hours of the courses already assigned to them.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    capacities (dict, optional): A mapping of instructor id to the most credit
+    hours they may teach. Instructors that are left out get
+    DEFAULT_INSTRUCTOR_CAPACITY.
+
+    Returns:
+    dict: A mapping of department id to a dict with the keys
+        - "courses": a list of (course_id, credits) tuples
+        - "instructors": a list of (instructor_id, current_load, capacity) tuples
+    """
+    with database_functions.transaction(file, "DEFERRED") as c:
+        return read_departments(c, capacities)
+
+
+def read_departments(c, capacities=None):
+    """
+    Reads the departments as load_departments does, inside an open transaction.
+
+    Parameters:
+    c (sqlite3.Cursor): The cursor of the open transaction.
+    capacities (dict, optional): See load_departments.
+
+    Returns:
+    dict: The departments, in the format returned by load_departments.
+    """
+    capacities = capacities or {}
+    departments = {}
+
+    c.execute(
+        """SELECT id, department_id, COALESCE(credits, 0)
+        FROM courses
+        WHERE NOT EXISTS (
+            SELECT 1 FROM course_instructors WHERE course_id = courses.id
+        )
+        ORDER BY id"""
+    )
+    for course_id, department_id, credits in c.fetchall():
+        department = departments.setdefault(
+            department_id, {"courses": [], "instructors": []}
+        )
+        department["courses"].append((course_id, credits))
+
+    c.execute(
+        """SELECT instructors.id, instructors.department_id,
+            COALESCE(SUM(courses.credits), 0)
+        FROM instructors
+        LEFT JOIN course_instructors ON instructors.id = course_instructors.instructor_id
+        LEFT JOIN courses ON courses.id = course_instructors.course_id
+        GROUP BY instructors.id
+        ORDER BY instructors.id"""
+    )
+    for instructor_id, department_id, load in c.fetchall():
+        if department_id not in departments:
+            continue
+        capacity = capacities.get(instructor_id, DEFAULT_INSTRUCTOR_CAPACITY)
+        departments[department_id]["instructors"].append(
+            (instructor_id, load, capacity)
+        )
+
+    return departments
+
+
+def balance_department(department, max_rounds=1000):
+    """
+    Assigns a department's unassigned courses so the heaviest load is as low as possible.
+
+    Courses are handed out largest first, each to the least loaded instructor
+    that still has room for it, using a heap keyed by load. The result is then
+    improved locally: a course of the most loaded instructor is moved to, or
+    swapped with a course of, another instructor whenever that lowers the larger
+    of the two loads. Only the new assignments are moved; existing ones stay.
+
+    Parameters:
+    department (dict): A department as returned by load_departments.
+    max_rounds (int): The most improvement steps to try.
+
+    Returns:
+    dict: A result with the keys
+        - "assignments": a mapping of course id to instructor id
+        - "unassigned": the ids of the courses no instructor had room for
+        - "loads": a mapping of instructor id to their new load
+    """
+    loads = {}
+    capacities = {}
+    heap = []
+    for instructor_id, load, capacity in department["instructors"]:
+        loads[instructor_id] = load
+        capacities[instructor_id] = capacity
+        heap.append((load, instructor_id))
+    heapq.heapify(heap)
+
+    assignments = {}
+    unassigned = []
+    credits_of = dict(department["courses"])
+    for course_id, credits in sorted(
+        department["courses"], key=lambda course: (-course[1], course[0])
+    ):
+        skipped = []
+        while heap:
+            load, instructor_id = heapq.heappop(heap)
+            if load + credits <= capacities[instructor_id]:
+                assignments[course_id] = instructor_id
+                loads[instructor_id] = load + credits
+                heapq.heappush(heap, (load + credits, instructor_id))
+                break
+            skipped.append((load, instructor_id))
+        else:
+            unassigned.append(course_id)
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+
+    teaching = {instructor_id: [] for instructor_id in loads}
+    for course_id, instructor_id in assignments.items():
+        teaching[instructor_id].append(course_id)
+
+    for _ in range(max_rounds):
+        if not _improve(loads, capacities, teaching, credits_of, assignments):
+            break
+
+    return {"assignments": assignments, "unassigned": unassigned, "loads": loads}
+
+
+def _improve(loads, capacities, teaching, credits_of, assignments):
+    heaviest = max(loads, key=lambda instructor_id: loads[instructor_id], default=None)
+    if heaviest is None:
+        return False
+    for course_id in teaching[heaviest]:
+        credits = credits_of[course_id]
+        for other in sorted(loads, key=lambda instructor_id: loads[instructor_id]):
+            if other == heaviest:
+                continue
+            # Move the course to the other instructor
+            if (
+                loads[other] + credits <= capacities[other]
+                and loads[other] + credits < loads[heaviest]
+            ):
+                _move(course_id, heaviest, other, credits, loads, teaching, assignments)
+                return True
+            # Swap it for a smaller course of the other instructor
+            for other_course in teaching[other]:
+                difference = credits - credits_of[other_course]
+                if (
+                    difference > 0
+                    and loads[other] + difference <= capacities[other]
+                    and loads[other] + difference < loads[heaviest]
+                ):
+                    _move(course_id, heaviest, other, credits, loads, teaching, assignments)
+                    _move(
+                        other_course,
+                        other,
+                        heaviest,
+                        credits_of[other_course],
+                        loads,
+                        teaching,
+                        assignments,
+                    )
+                    return True
+    return False
+
+
+def _move(course_id, source, target, credits, loads, teaching, assignments):
+    teaching[source].remove(course_id)
+    teaching[target].append(course_id)
+    loads[source] -= credits
+    loads[target] += credits
+    assignments[course_id] = target
+
+
+def balance_assignments(file, capacities=None, processes=None, write=True):
+    """
+    Assigns instructors to every unassigned course, balancing load per department.
+
+    Departments are independent of each other, so they are balanced in parallel
+    worker processes. When writing, the departments are read, balanced and the
+    new course_instructors rows written inside one immediate transaction, so
+    two concurrent runs cannot both assign the same course. A row is only
+    written while its course still has no instructor, and INSTRUCTOR_ASSIGNED
+    is published after the commit for each course that was actually assigned.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    capacities (dict, optional): A mapping of instructor id to the most credit
+    hours they may teach.
+    processes (int, optional): The number of worker processes. Set it to 1 to
+    balance the departments in the current process.
+    write (bool): Whether to store the assignments in course_instructors.
+
+    Returns:
+    dict: A mapping of department id to its result, in the format returned by
+    balance_department.
+    """
+    if not write:
+        return balance_departments(load_departments(file, capacities), processes)
+
+    assigned = []
+    with database_functions.transaction(file) as c:
+        results = balance_departments(read_departments(c, capacities), processes)
+        for result in results.values():
+            for course_id, instructor_id in result["assignments"].items():
+                c.execute(
+                    """INSERT INTO course_instructors (course_id, instructor_id)
+                    SELECT ?, ?
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM course_instructors WHERE course_id = ?
+                    )""",
+                    (course_id, instructor_id, course_id),
+                )
+                if c.rowcount == 1:
+                    assigned.append(course_id)
+    for course_id in assigned:
+        collegeapp.publish_enrollment(collegeapp.INSTRUCTOR_ASSIGNED, course_id)
+    return results
+
+
+def balance_departments(departments, processes=None):
+    """
+    Balances every department with balance_department, in parallel if asked.
+
+    Parameters:
+    departments (dict): The departments, as returned by load_departments.
+    processes (int, optional): The number of worker processes; 1 balances the
+    departments in the current process.
+
+    Returns:
+    dict: A mapping of department id to its balance_department result.
+    """
+    department_ids = list(departments)
+    if processes == 1 or len(department_ids) <= 1:
+        results = [balance_department(departments[key]) for key in department_ids]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(
+                pool.map(balance_department, [departments[key] for key in department_ids])
+            )
+    return dict(zip(department_ids, results))
@@ -1,13 +1,79 @@
 import database_functions
 import collegeapp
+import collegeapp_analytics
+import collegeapp_grades
+import collegeapp_lottery
+import collegeapp_prerequisites
+import collegeapp_push
+import collegeapp_roster
+from collegeapp_singleflight import single_flight
+from collegeapp_tracing import traced
 
+# The nearly static tables the front end keeps in its own cache
+REFERENCE_TABLES = ("courses", "departments", "instructors")
 
+# The columns sent of a reference table, leaving out the counters that change
+# with every enrollment (see database_functions.CHANGELOG_IGNORED_COLUMNS)
+REFERENCE_COLUMNS = {
+    "courses": "id, name, department_id, description, credits, capacity, "
+    "meeting_days, start_time, end_time, room_id",
+}
+
+# The columns of the students table sent as deltas; credit_load changes with
+# every enrollment without a changelog row, so it is left out
+STUDENT_COLUMNS = "id, name, email, major, class_year"
+
+# Seconds a table read by grab is reused for later callers
+GRAB_TTL = 1
+
+# Seconds a student's schedule is reused; enrollment events drop it sooner, but
+# writes made by other processes, such as a lottery run, only show once it expires
+SCHEDULE_TTL = 2
+
+
+@single_flight(ttl=GRAB_TTL)
+@traced()
 def grab(table):
     view_grab = collegeapp.Views()
     x = view_grab.get_table_data(table)
     return x
 
 
+@traced()
+def grab_columnar(table, dictionary_columns=()):
+    view_grab = collegeapp.Views()
+    return view_grab.get_table_columnar(table, dictionary_columns=dictionary_columns)
+
+
+@traced()
+def grab_page(table, after_id=None, limit=50, dictionary_columns=()):
+    view_grab = collegeapp.Views()
+    return view_grab.get_table_page(table, after_id, limit, dictionary_columns)
+
+
+@single_flight()
+@traced()
+def grab_delta(table, since_version=None, dictionary_columns=(), columns="*"):
+    view_grab = collegeapp.Views()
+    return view_grab.get_table_delta(
+        table, since_version, columns, dictionary_columns=dictionary_columns
+    )
+
+
+@traced()
+def get_versions():
+    return database_functions.table_versions(collegeapp.Views().file, REFERENCE_TABLES)
+
+
+@traced()
+def get_reference_data(table, since_version=None):
+    if table not in REFERENCE_TABLES:
+        return None
+    return grab_delta(table, since_version, columns=REFERENCE_COLUMNS.get(table, "*"))
+
+
+@single_flight(ttl=SCHEDULE_TTL, key=lambda student_data: student_data["id"])
+@traced()
 def process_student_schedule(student_data):
     student = collegeapp.Students(
         student_data["name"],
@@ -15,15 +81,151 @@ def process_student_schedule(student_data):
         student_data["major"],
         student_data["id"],
     )
-    print(student)
-    courses = student.get_courses()
-    course_data = []
-    for course in courses:
-        class_data = collegeapp.Courses(
-            course[1], course[2], course[3], course[4], course[0]
-        )
-        course_data.append(course + class_data.get_instructor())
-
-    print(course_data)
-
-    return course_data
+    return student.get_schedule_ids()
+
+
+def forget_student_schedule(event):
+    if event["student_id"] is None:
+        process_student_schedule.forget()
+    else:
+        process_student_schedule.forget(event["student_id"])
+
+
+collegeapp.subscribe_enrollment(forget_student_schedule)
+
+
+@traced()
+def enroll_student(student_data, course_id):
+    student = collegeapp.Students(
+        student_data["name"],
+        student_data["email"],
+        student_data["major"],
+        student_data["id"],
+    )
+    return student.enroll(course_id)
+
+
+@traced()
+def request_enrollment(student_data, course_id, preference=1):
+    student = collegeapp.Students(
+        student_data["name"],
+        student_data["email"],
+        student_data["major"],
+        student_data["id"],
+    )
+    student.request_enrollment(course_id, preference)
+
+
+@traced()
+def allocate_requests(seed=0, mode=collegeapp_lottery.PRIORITY):
+    return collegeapp_lottery.run_allocation(collegeapp.Views().file, seed, mode)
+
+
+@traced()
+def check_student_cart(student_data, course_ids):
+    student = collegeapp.Students(
+        student_data["name"],
+        student_data["email"],
+        student_data["major"],
+        student_data["id"],
+    )
+    return student.check_cart(course_ids)
+
+
+@traced()
+def get_credit_loads(student_ids):
+    view_grab = collegeapp.Views()
+    return view_grab.get_credit_loads(student_ids)
+
+
+@traced()
+def get_eligible_courses(student_data):
+    student = collegeapp.Students(
+        student_data["name"],
+        student_data["email"],
+        student_data["major"],
+        student_data["id"],
+    )
+    return student.get_eligible_courses()
+
+
+@traced()
+def get_transcript(student_id):
+    return collegeapp_grades.transcript(collegeapp.Views().file, student_id)
+
+
+@traced()
+def get_department_analytics():
+    analytics = collegeapp_analytics.get_analytics(collegeapp.Views().file)
+    return analytics.get_summary()
+
+
+@traced()
+def get_instructor_courses(instructor_id):
+    instructor = collegeapp.Instructors(None, None, None, instructor_id)
+    return instructor.get_courses()
+
+
+@traced()
+def get_course_roster(course_id, after_id=None, limit=50):
+    roster_cache = collegeapp_roster.get_roster_cache(collegeapp.Views().file)
+    return roster_cache.get_page(course_id, after_id, limit)
+
+
+@traced()
+def get_admin_dashboard(limit=5):
+    view_grab = collegeapp.Views()
+    return view_grab.get_dashboard(limit)
+
+
+def start_push():
+    collegeapp_push.get_push_hub()
+
+
+def flush_push():
+    return collegeapp_push.get_push_hub().flush()
+
+
+def cache_stats():
+    roster_cache = collegeapp_roster.get_roster_cache(collegeapp.Views().file)
+    stats = {"roster": {"hits": roster_cache.hits, "misses": roster_cache.misses}}
+    for name, flight in [
+        ("grab", grab),
+        ("grab_delta", grab_delta),
+        ("student_schedule", process_student_schedule),
+    ]:
+        stats[name] = {
+            "hits": flight.cached,
+            "misses": flight.executions,
+            "shared": flight.shared,
+        }
+    return stats
+
+
+def invalidate_caches():
+    file = collegeapp.Views().file
+    collegeapp_roster.get_roster_cache(file).invalidate()
+    collegeapp_analytics.get_analytics(file).invalidate()
+    collegeapp_prerequisites.forget_graph(file)
+    grab.forget()
+    process_student_schedule.forget()
+
+
+def apply_changes(changes):
+    # Called by collegeapp_server.watch_data_version with the changelog rows
+    # written since its last call, or None when the changelog was trimmed past
+    # them and nothing can be kept
+    if changes is None:
+        invalidate_caches()
+        collegeapp_push.get_push_hub().reload_all()
+        return
+    file = collegeapp.Views().file
+    tables = {change[1] for change in changes}
+    if "course_prerequisites" in tables or any(
+        change[1] == "courses" and change[2] != "U" for change in changes
+    ):
+        collegeapp_prerequisites.forget_graph(file)
+    for table in tables:
+        grab.forget(grab.make_key((table,), {}))
+    # The roster, analytics, schedule and push caches follow the events
+    collegeapp.publish_changes(changes)
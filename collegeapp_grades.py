@@ -0,0 +1,207 @@
+from array import array
+
+import database_functions
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Grade points of every letter grade
+GRADE_POINTS = {
+    "A": 4.0,
+    "A-": 3.7,
+    "B+": 3.3,
+    "B": 3.0,
+    "B-": 2.7,
+    "C+": 2.3,
+    "C": 2.0,
+    "C-": 1.7,
+    "D+": 1.3,
+    "D": 1.0,
+    "F": 0.0,
+}
+
+DEANS_LIST_GPA = 3.5
+DEANS_LIST_CREDITS = 12
+PROBATION_GPA = 2.0
+
+
+def record_grade(file, course_id, student_id, grade):
+    """
+    Stores a student's letter grade for a course they are enrolled in.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    course_id (int): The id of the course.
+    student_id (int): The id of the student.
+    grade (str): The letter grade, one of the keys of GRADE_POINTS.
+
+    Returns:
+    None
+
+    Raises:
+    ValueError: If the grade is not a known letter grade.
+    """
+    if grade not in GRADE_POINTS:
+        raise ValueError(f"Unknown grade: {grade}")
+    command = """INSERT INTO grades (course_id, student_id, grade, grade_points)
+            SELECT course_id, student_id, ?, ?
+            FROM course_students
+            WHERE course_id = ? AND student_id = ?
+            ON CONFLICT (course_id, student_id) DO UPDATE
+            SET grade = excluded.grade, grade_points = excluded.grade_points"""
+    database_functions.write_to_database(
+        file, command, (grade, GRADE_POINTS[grade], course_id, student_id)
+    )
+
+
+def load_grade_arrays(file):
+    """
+    Reads every graded course into three parallel arrays in one query.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+
+    Returns:
+    tuple: (student_ids, credits, grade_points), as NumPy arrays when NumPy is
+    installed and as array module arrays otherwise.
+    """
+    rows = database_functions.read_from_database(
+        file,
+        """SELECT grades.student_id, COALESCE(courses.credits, 0), grades.grade_points
+        FROM grades
+        JOIN courses ON courses.id = grades.course_id""",
+    )
+    rows = rows or []
+    student_ids = array("q", (row[0] for row in rows))
+    credits = array("d", (row[1] for row in rows))
+    grade_points = array("d", (row[2] for row in rows))
+    if numpy is not None:
+        return (
+            numpy.frombuffer(student_ids, dtype=numpy.int64),
+            numpy.frombuffer(credits, dtype=numpy.float64),
+            numpy.frombuffer(grade_points, dtype=numpy.float64),
+        )
+    return student_ids, credits, grade_points
+
+
+def compute_gpas(file):
+    """
+    Computes the credit-weighted GPA of every student with a grade in one pass.
+
+    With NumPy the quality points and credits are summed per student with
+    bincount over the whole student body at once. Without it, one loop over the
+    graded rows accumulates into flat arrays indexed by student id.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+
+    Returns:
+    dict: A mapping of student id to (gpa, credits_attempted). Students whose
+    graded courses carry no credits are left out.
+    """
+    student_ids, credits, grade_points = load_grade_arrays(file)
+    if not len(student_ids):
+        return {}
+
+    if numpy is not None:
+        size = int(student_ids.max()) + 1
+        quality = numpy.bincount(student_ids, weights=credits * grade_points, minlength=size)
+        attempted = numpy.bincount(student_ids, weights=credits, minlength=size)
+        graded = numpy.nonzero(attempted)[0]
+        gpas = quality[graded] / attempted[graded]
+        return {
+            int(student_id): (float(gpa), float(total))
+            for student_id, gpa, total in zip(graded, gpas, attempted[graded])
+        }
+
+    size = max(student_ids) + 1
+    quality = array("d", bytes(8 * size))
+    attempted = array("d", bytes(8 * size))
+    for student_id, credit, points in zip(student_ids, credits, grade_points):
+        quality[student_id] += credit * points
+        attempted[student_id] += credit
+    return {
+        student_id: (quality[student_id] / attempted[student_id], attempted[student_id])
+        for student_id in range(size)
+        if attempted[student_id]
+    }
+
+
+def deans_list(file, minimum_gpa=DEANS_LIST_GPA, minimum_credits=DEANS_LIST_CREDITS):
+    """
+    Lists the students on the dean's list.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    minimum_gpa (float): The lowest GPA that qualifies.
+    minimum_credits (float): The fewest graded credits that qualify.
+
+    Returns:
+    list: (student_id, gpa) tuples, best GPA first.
+    """
+    gpas = compute_gpas(file)
+    honours = [
+        (student_id, gpa)
+        for student_id, (gpa, credits) in gpas.items()
+        if gpa >= minimum_gpa and credits >= minimum_credits
+    ]
+    return sorted(honours, key=lambda entry: (-entry[1], entry[0]))
+
+
+def probation(file, maximum_gpa=PROBATION_GPA):
+    """
+    Lists the students on academic probation.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    maximum_gpa (float): Students with a GPA below this are on probation.
+
+    Returns:
+    list: (student_id, gpa) tuples, lowest GPA first.
+    """
+    gpas = compute_gpas(file)
+    at_risk = [
+        (student_id, gpa)
+        for student_id, (gpa, credits) in gpas.items()
+        if gpa < maximum_gpa
+    ]
+    return sorted(at_risk, key=lambda entry: (entry[1], entry[0]))
+
+
+def transcript(file, student_id):
+    """
+    Builds a student's transcript.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    student_id (int): The id of the student.
+
+    Returns:
+    dict: {"courses": [(course_id, name, credits, grade), ...], "gpa": float or
+    None, "credits": the graded credits}. Courses without a grade yet have a
+    grade of None.
+    """
+    rows = database_functions.read_from_database(
+        file,
+        """SELECT courses.id, courses.name, courses.credits, grades.grade, grades.grade_points
+        FROM course_students
+        JOIN courses ON courses.id = course_students.course_id
+        LEFT JOIN grades ON grades.course_id = course_students.course_id
+            AND grades.student_id = course_students.student_id
+        WHERE course_students.student_id = ?
+        ORDER BY courses.id""",
+        "all",
+        (student_id,),
+    )
+    quality = 0.0
+    attempted = 0.0
+    courses = []
+    for course_id, name, credits, grade, points in rows or []:
+        courses.append((course_id, name, credits, grade))
+        if grade is not None and credits:
+            quality += credits * points
+            attempted += credits
+    gpa = quality / attempted if attempted else None
+    return {"courses": courses, "gpa": gpa, "credits": attempted}
@@ -0,0 +1,241 @@
+import random
+
+import collegeapp
+import collegeapp_prerequisites
+import collegeapp_schedule
+import database_functions
+
+# Allocation modes
+LOTTERY = "lottery"
+PRIORITY = "priority"
+
+
+def priority_key(student, course, lottery_number, mode):
+    """
+    Builds the sort key that decides who gets a seat first; lower keys win.
+
+    In PRIORITY mode students majoring in the course's department come first,
+    then higher class years, then students with more earned credits, and the
+    lottery number only breaks ties. In LOTTERY mode the lottery number alone
+    decides. Earned credits are taken before the allocation starts, so seats
+    won in earlier rounds do not move a student up in later ones.
+
+    Parameters:
+    student (dict): The student, with "major", "class_year" and "credits_earned".
+    course (dict): The course, with "department".
+    lottery_number (float): The student's lottery number for this run.
+    mode (str): LOTTERY or PRIORITY.
+
+    Returns:
+    tuple: The sort key.
+    """
+    if mode == LOTTERY:
+        return (lottery_number,)
+    return (
+        student["major"] != course["department"],
+        -(student["class_year"] or 0),
+        -student["credits_earned"],
+        lottery_number,
+    )
+
+
+def allocate(requests, students, courses, seed=0, mode=PRIORITY):
+    """
+    Decides which enrollment requests get a seat, without touching the database.
+
+    Requests are handled in rounds by preference: every student's first choices
+    are allocated before anyone's second choice. Within a round, the requests for
+    each course are sorted with priority_key and seated while the course has free
+    seats, the student stays within collegeapp.MAX_CREDIT_LOAD, the course does
+    not clash with the student's week and its prerequisites have been taken.
+    The same seed always gives the same allocation.
+
+    Parameters:
+    requests (list): (student_id, course_id, preference) tuples.
+    students (dict): A mapping of student id to a dict with "major",
+    "class_year", "credits_earned", "credit_load", "week" (a
+    collegeapp_schedule.WeekIndex) and "taken" (a set of course ids).
+    courses (dict): A mapping of course id to a dict with "department",
+    "credits", "free_seats" (None for unlimited), "meeting"
+    ((meeting_days, start_time, end_time)) and "prerequisites" (a set of
+    course ids).
+    seed (int): The seed of the lottery.
+    mode (str): LOTTERY or PRIORITY.
+
+    Returns:
+    dict: A result with the keys
+        - "enrolled": a list of (student_id, course_id) pairs that got a seat
+        - "rejected": a list of (student_id, course_id, reason) tuples, where the
+          reason is one of the collegeapp enrollment results
+    """
+    rng = random.Random(seed)
+    lottery_numbers = {student_id: rng.random() for student_id in sorted(students)}
+
+    rounds = {}
+    for student_id, course_id, preference in requests:
+        rounds.setdefault(preference, {}).setdefault(course_id, []).append(student_id)
+
+    enrolled = []
+    rejected = []
+    for preference in sorted(rounds):
+        for course_id, student_ids in sorted(rounds[preference].items()):
+            course = courses.get(course_id)
+            if course is None:
+                rejected.extend(
+                    (student_id, course_id, collegeapp.NO_SUCH_COURSE)
+                    for student_id in student_ids
+                )
+                continue
+            student_ids = sorted(
+                student_ids,
+                key=lambda student_id: priority_key(
+                    students[student_id], course, lottery_numbers[student_id], mode
+                ),
+            )
+            for student_id in student_ids:
+                student = students[student_id]
+                reason = None
+                if course_id in student["taken"]:
+                    reason = collegeapp.ALREADY_ENROLLED
+                elif not course["prerequisites"] <= student["taken"]:
+                    reason = collegeapp.MISSING_PREREQUISITES
+                elif course["free_seats"] is not None and course["free_seats"] <= 0:
+                    reason = collegeapp.COURSE_FULL
+                elif student["credit_load"] + course["credits"] > collegeapp.MAX_CREDIT_LOAD:
+                    reason = collegeapp.CREDIT_LIMIT
+                elif student["week"].conflicts(*course["meeting"]):
+                    reason = collegeapp.SCHEDULE_CONFLICT
+
+                if reason is not None:
+                    rejected.append((student_id, course_id, reason))
+                    continue
+
+                enrolled.append((student_id, course_id))
+                student["taken"].add(course_id)
+                student["credit_load"] += course["credits"]
+                student["week"].add(course_id, *course["meeting"])
+                if course["free_seats"] is not None:
+                    course["free_seats"] -= 1
+
+    return {"enrolled": enrolled, "rejected": rejected}
+
+
+def run_allocation(file, seed=0, mode=PRIORITY):
+    """
+    Allocates seats for every pending enrollment request in one batch.
+
+    The requests, the students and courses they involve, the students' current
+    schedules and their earned credits (the credits of their courses with a
+    passing grade) are read with a handful of queries inside one immediate
+    transaction. The allocation is computed in memory, the winners are written
+    to course_students with a single bulk insert and taken off the waitlists
+    of their new courses, and the handled requests are deleted, all before the
+    transaction commits.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    seed (int): The seed of the lottery, so a run can be reproduced.
+    mode (str): LOTTERY or PRIORITY.
+
+    Returns:
+    dict: The result, in the format returned by allocate.
+    """
+    graph = collegeapp_prerequisites.get_graph(file)
+
+    with database_functions.transaction(file) as c:
+        c.execute(
+            """SELECT id, student_id, course_id, preference
+            FROM enrollment_requests
+            ORDER BY id"""
+        )
+        rows = c.fetchall()
+        if not rows:
+            return {"enrolled": [], "rejected": []}
+        last_request = rows[-1][0]
+        requests = [
+            (student_id, course_id, preference)
+            for _, student_id, course_id, preference in rows
+        ]
+
+        c.execute(
+            """SELECT id, major, class_year, credit_load FROM students
+            WHERE id IN (SELECT student_id FROM enrollment_requests WHERE id <= ?)""",
+            (last_request,),
+        )
+        students = {
+            student_id: {
+                "major": major,
+                "class_year": class_year,
+                "credits_earned": 0,
+                "credit_load": credit_load,
+                "week": collegeapp_schedule.WeekIndex(),
+                "taken": set(),
+            }
+            for student_id, major, class_year, credit_load in c.fetchall()
+        }
+
+        c.execute(
+            """SELECT grades.student_id, SUM(COALESCE(courses.credits, 0))
+            FROM grades
+            JOIN courses ON courses.id = grades.course_id
+            WHERE grades.grade_points > 0
+            AND grades.student_id IN (
+                SELECT student_id FROM enrollment_requests WHERE id <= ?
+            )
+            GROUP BY grades.student_id""",
+            (last_request,),
+        )
+        for student_id, credits_earned in c.fetchall():
+            students[student_id]["credits_earned"] = credits_earned
+
+        c.execute(
+            """SELECT course_students.student_id, courses.id, courses.meeting_days,
+                courses.start_time, courses.end_time
+            FROM course_students
+            JOIN courses ON courses.id = course_students.course_id
+            WHERE course_students.student_id IN (
+                SELECT student_id FROM enrollment_requests WHERE id <= ?
+            )""",
+            (last_request,),
+        )
+        for student_id, course_id, days, start, end in c.fetchall():
+            students[student_id]["taken"].add(course_id)
+            students[student_id]["week"].add(course_id, days, start, end)
+
+        c.execute(
+            """SELECT courses.id, departments.name, COALESCE(courses.credits, 0),
+                courses.capacity - courses.enrolled_count,
+                courses.meeting_days, courses.start_time, courses.end_time
+            FROM courses
+            LEFT JOIN departments ON departments.id = courses.department_id
+            WHERE courses.id IN (
+                SELECT course_id FROM enrollment_requests WHERE id <= ?
+            )""",
+            (last_request,),
+        )
+        courses = {}
+        for course_id, department, credits, free_seats, days, start, end in c.fetchall():
+            courses[course_id] = {
+                "department": department,
+                "credits": credits,
+                "free_seats": free_seats,
+                "meeting": (days, start, end),
+                "prerequisites": graph.direct_prerequisites(course_id),
+            }
+
+        requests = [request for request in requests if request[0] in students]
+        result = allocate(requests, students, courses, seed, mode)
+
+        c.executemany(
+            "INSERT INTO course_students (student_id, course_id) VALUES (?, ?)",
+            result["enrolled"],
+        )
+        c.executemany(
+            "DELETE FROM course_waitlist WHERE student_id = ? AND course_id = ?",
+            result["enrolled"],
+        )
+        c.execute("DELETE FROM enrollment_requests WHERE id <= ?", (last_request,))
+
+    for student_id, course_id in result["enrolled"]:
+        collegeapp.publish_enrollment(collegeapp.ENROLLED, course_id, student_id)
+    return result
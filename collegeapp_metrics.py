@@ -0,0 +1,339 @@
+import bisect
+import functools
+import json
+import os
+import re
+import threading
+
+import bottle
+import gevent
+
+import collegeapp_controller
+import collegeapp_profiling
+import database_functions
+
+# Seconds between two snapshots of a worker's metrics, see publish_periodically
+SNAPSHOT_INTERVAL = 5
+
+# Upper bounds in seconds of the statement latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+# The table a statement works on, after the keyword that names it
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+
+# Statement statistics by statement class, see on_statement
+_statements = {}
+_lock = threading.Lock()
+
+# The number of this process among pre-forked workers and where the workers
+# share their metrics, see set_worker
+_worker = None
+_directory = None
+
+
+class StatementStats:
+    """Count, error count and latency histogram of one statement class."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, seconds, failed):
+        self.count += 1
+        self.seconds += seconds
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        if failed:
+            self.errors += 1
+
+
+@functools.lru_cache(maxsize=1024)
+def statement_class(instructions):
+    """
+    Classifies a statement by its verb and the first table it names.
+
+    The SQL of the app is written in the code, so this gives a small, fixed
+    set of classes such as "select courses" or "insert course_students".
+
+    Parameters:
+    instructions (str): The SQL text.
+
+    Returns:
+    str: The class of the statement.
+    """
+    words = instructions.split(None, 1)
+    if not words:
+        return "empty"
+    verb = words[0].lower()
+    match = _TABLE_PATTERN.search(instructions)
+    if match is None or verb in ("begin", "commit", "rollback", "pragma"):
+        return verb
+    return f"{verb} {match.group(1).lower()}"
+
+
+def on_statement(instructions, seconds, error):
+    """
+    Records one executed statement; a database_functions statement listener.
+
+    Parameters:
+    instructions (str): The SQL text.
+    seconds (float): How long it took to execute.
+    error (Exception or None): What it raised.
+
+    Returns:
+    None
+    """
+    name = statement_class(instructions)
+    with _lock:
+        stats = _statements.get(name)
+        if stats is None:
+            stats = _statements[name] = StatementStats()
+        stats.record(seconds, error is not None)
+
+
+def install():
+    """
+    Starts recording the statements run through database_functions.
+
+    Returns:
+    None
+    """
+    database_functions.add_statement_listener(on_statement)
+
+
+def set_worker(worker, directory=None):
+    """
+    Labels the metrics of this process with its worker number.
+
+    Every pre-forked worker keeps its own metrics, so the label keeps each
+    worker's counters a series of their own. A scrape reaches whichever worker
+    accepts it; with a directory, workers publish snapshots of their metrics
+    there (see publish_periodically) and render adds the other workers'
+    snapshots to its own metrics, so every scrape covers all workers.
+
+    Parameters:
+    worker (int): The number of the worker.
+    directory (str, optional): A directory shared by the workers of one server
+    and only by them, e.g. a fresh temporary directory made by the supervisor.
+
+    Returns:
+    None
+    """
+    global _worker, _directory
+    _worker = worker
+    _directory = directory
+
+
+def resident_memory():
+    """
+    Returns the resident set size of this process.
+
+    Returns:
+    int: The size in bytes, or the peak size where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _labels(**labels):
+    if _worker is not None:
+        labels["worker"] = _worker
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric(families, name, kind, description):
+    lines = []
+    families[name] = {"kind": kind, "description": description, "lines": lines}
+    return lines
+
+
+def collect():
+    """
+    Collects the metrics of this process.
+
+    Returns:
+    dict: A mapping of metric family name to its kind, description and sample
+    lines in the Prometheus text format, in the order they are rendered.
+    """
+    families = {}
+    with _lock:
+        statements = {
+            name: (stats.count, stats.errors, stats.seconds, list(stats.buckets))
+            for name, stats in sorted(_statements.items())
+        }
+
+    lines = _metric(families, "collegeapp_db_queries_total", "counter", "Statements executed, by class.")
+    for name, (count, errors, seconds, buckets) in statements.items():
+        lines.append(f"collegeapp_db_queries_total{_labels(statement=name)} {count}")
+    lines = _metric(families, "collegeapp_db_query_errors_total", "counter", "Statements that raised, by class.")
+    for name, (count, errors, seconds, buckets) in statements.items():
+        lines.append(f"collegeapp_db_query_errors_total{_labels(statement=name)} {errors}")
+    lines = _metric(
+        families,
+        "collegeapp_db_query_duration_seconds",
+        "histogram",
+        "Time to execute a statement, by class.",
+    )
+    for name, (count, errors, seconds, buckets) in statements.items():
+        cumulative = 0
+        for bound, bucket in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+            cumulative += bucket
+            lines.append(
+                f"collegeapp_db_query_duration_seconds_bucket{_labels(statement=name, le=bound)} {cumulative}"
+            )
+        lines.append(f"collegeapp_db_query_duration_seconds_sum{_labels(statement=name)} {seconds}")
+        lines.append(f"collegeapp_db_query_duration_seconds_count{_labels(statement=name)} {count}")
+
+    caches = collegeapp_controller.cache_stats()
+    lines = _metric(families, "collegeapp_cache_hits_total", "counter", "Lookups answered from a cache.")
+    for cache, stats in caches.items():
+        lines.append(f"collegeapp_cache_hits_total{_labels(cache=cache)} {stats['hits']}")
+    lines = _metric(families, "collegeapp_cache_misses_total", "counter", "Lookups that had to compute their result.")
+    for cache, stats in caches.items():
+        lines.append(f"collegeapp_cache_misses_total{_labels(cache=cache)} {stats['misses']}")
+    lines = _metric(families, "collegeapp_cache_hit_ratio", "gauge", "Hits out of all lookups since start.")
+    for cache, stats in caches.items():
+        lookups = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / lookups if lookups else 0
+        lines.append(f"collegeapp_cache_hit_ratio{_labels(cache=cache)} {ratio}")
+    lines = _metric(
+        families,
+        "collegeapp_singleflight_shared_total",
+        "counter",
+        "Calls that waited for an identical call already running.",
+    )
+    for cache, stats in caches.items():
+        if "shared" in stats:
+            lines.append(f"collegeapp_singleflight_shared_total{_labels(cache=cache)} {stats['shared']}")
+
+    lines = _metric(families, "collegeapp_db_pool_connections", "gauge", "Pooled database connections, by state.")
+    for file, stats in sorted(database_functions.pool_stats().items()):
+        for state, count in sorted(stats.items()):
+            lines.append(f"collegeapp_db_pool_connections{_labels(file=file, state=state)} {count}")
+    lines = _metric(families, "collegeapp_db_pool_size", "gauge", "The most idle connections kept per database.")
+    lines.append(f"collegeapp_db_pool_size{_labels()} {database_functions.POOL_SIZE}")
+
+    threadpool = gevent.get_hub().threadpool
+    lines = _metric(families, "collegeapp_threadpool_threads", "gauge", "Threads of the gevent thread pool.")
+    lines.append(f"collegeapp_threadpool_threads{_labels()} {threadpool.size}")
+    lines = _metric(families, "collegeapp_threadpool_queue_depth", "gauge", "Tasks waiting for a pool thread.")
+    lines.append(f"collegeapp_threadpool_queue_depth{_labels()} {threadpool.task_queue.qsize()}")
+
+    endpoints = collegeapp_profiling.get_metrics()
+    lines = _metric(families, "collegeapp_endpoint_calls_total", "counter", "Calls of an exposed function.")
+    for name, stats in endpoints.items():
+        lines.append(f"collegeapp_endpoint_calls_total{_labels(endpoint=name)} {stats['calls']}")
+    lines = _metric(families, "collegeapp_endpoint_errors_total", "counter", "Calls of an exposed function that raised.")
+    for name, stats in endpoints.items():
+        lines.append(f"collegeapp_endpoint_errors_total{_labels(endpoint=name)} {stats['errors']}")
+
+    lines = _metric(families, "process_resident_memory_bytes", "gauge", "Resident memory size in bytes.")
+    lines.append(f"process_resident_memory_bytes{_labels()} {resident_memory()}")
+    return families
+
+
+def _format(families):
+    text = []
+    for name, family in families.items():
+        text.append(f"# HELP {name} {family['description']}")
+        text.append(f"# TYPE {name} {family['kind']}")
+        text.extend(family["lines"])
+    return "\n".join(text) + "\n"
+
+
+def _snapshot_path(worker):
+    return os.path.join(_directory, f"worker-{worker}.json")
+
+
+def publish():
+    """
+    Writes a snapshot of this worker's metrics for the other workers to serve.
+
+    Does nothing unless set_worker was given a directory.
+
+    Returns:
+    None
+    """
+    if _directory is None:
+        return
+    path = _snapshot_path(_worker)
+    with open(path + ".tmp", "w", encoding="utf-8") as snapshot:
+        json.dump(collect(), snapshot)
+    # Readers see either the previous snapshot or this one, never part of it
+    os.replace(path + ".tmp", path)
+
+
+def publish_periodically(interval=SNAPSHOT_INTERVAL):
+    """
+    Publishes this worker's metrics every 'interval' seconds; run it in a greenlet.
+
+    Parameters:
+    interval (float): Seconds between two snapshots.
+
+    Returns:
+    None; runs until the greenlet is killed.
+    """
+    while True:
+        try:
+            publish()
+        except OSError as e:
+            print(f"An error occurred: {e}")
+        gevent.sleep(interval)
+
+
+def render():
+    """
+    Renders the metrics in the Prometheus text format.
+
+    These are the current metrics of this process and, with a directory set by
+    set_worker, the latest snapshots of the other workers, up to
+    SNAPSHOT_INTERVAL seconds old; the worker label tells their series apart.
+
+    Returns:
+    str: The exposition text.
+    """
+    families = collect()
+    if _directory is not None:
+        for entry in sorted(os.listdir(_directory)):
+            if not entry.endswith(".json") or entry == os.path.basename(_snapshot_path(_worker)):
+                continue
+            try:
+                with open(os.path.join(_directory, entry), encoding="utf-8") as snapshot:
+                    other = json.load(snapshot)
+            except (OSError, ValueError):
+                continue
+            for name, family in other.items():
+                families.setdefault(name, {**family, "lines": []})["lines"].extend(family["lines"])
+    return _format(families)
+
+
+def add_route(app):
+    """
+    Adds a /metrics route serving render to a bottle app.
+
+    Parameters:
+    app (bottle.Bottle): The app, e.g. the one eel serves.
+
+    Returns:
+    bottle.Bottle: The app.
+    """
+
+    @app.get("/metrics")
+    def metrics():
+        return bottle.HTTPResponse(
+            body=render(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+
+    return app
@@ -0,0 +1,322 @@
+import threading
+
+import database_functions
+
+# Loaded graphs, one per database file
+_graphs = {}
+_graphs_lock = threading.Lock()
+_generation = 0
+
+
+class PrerequisiteGraph:
+    """
+    The course prerequisite graph with its transitive closure stored as bitsets.
+
+    Every course is given a bit position. requires[course_id] is an integer
+    with the bits of the course's direct prerequisites, and closure[course_id]
+    has the bits of every course that must be taken before it, directly or
+    through a chain of prerequisites. A student may take a course once they
+    have taken its direct prerequisites; a student who took A and then B may
+    take C, which needs B, even if they are no longer in A. Checking that, or
+    which courses of the whole catalog they may take next, is a handful of
+    integer AND operations instead of a query per course. The closure is only
+    used to reject cycles and to list all prerequisites of a course, and is
+    updated incrementally when a prerequisite is added or removed.
+
+    Graphs are read on the batch endpoint's pool threads while prerequisites
+    change on the hub, so every method that reads or changes the sets takes
+    the graph's lock.
+    """
+
+    def __init__(self):
+        self.positions = {}
+        self.course_ids = []
+        self.direct = {}
+        self.requires = {}
+        self.closure = {}
+        self.lock = threading.RLock()
+
+    @classmethod
+    def load(cls, file):
+        """
+        Builds the graph from the courses and course_prerequisites tables.
+
+        Parameters:
+        file (str): The path to the SQLite database file.
+
+        Returns:
+        PrerequisiteGraph: The graph with its closure computed.
+        """
+        graph = cls()
+        for (course_id,) in database_functions.read_from_database(
+            file, "SELECT id FROM courses ORDER BY id"
+        ) or []:
+            graph.bit(course_id)
+
+        edges = database_functions.read_from_database(
+            file, "SELECT course_id, prerequisite_id FROM course_prerequisites"
+        )
+        for course_id, prerequisite_id in edges or []:
+            graph.bit(course_id)
+            graph.direct[course_id].add(prerequisite_id)
+            graph.requires[course_id] |= graph.bit(prerequisite_id)
+
+        graph.recompute(graph.course_ids)
+        return graph
+
+    def bit(self, course_id):
+        """
+        Returns the bit of a course, giving it the next free position if it is new.
+
+        Parameters:
+        course_id (int): The id of the course.
+
+        Returns:
+        int: An integer with only the course's bit set.
+        """
+        if course_id not in self.positions:
+            self.positions[course_id] = len(self.course_ids)
+            self.course_ids.append(course_id)
+            self.direct[course_id] = set()
+            self.requires[course_id] = 0
+            self.closure[course_id] = 0
+        return 1 << self.positions[course_id]
+
+    def mask(self, course_ids):
+        """
+        Combines the bits of several courses into one set.
+
+        Parameters:
+        course_ids (iterable): The ids of the courses.
+
+        Returns:
+        int: The bitset of the courses. Unknown courses are left out.
+        """
+        result = 0
+        with self.lock:
+            for course_id in course_ids:
+                if course_id in self.positions:
+                    result |= 1 << self.positions[course_id]
+        return result
+
+    def ids(self, mask):
+        """
+        Converts a bitset back into course ids.
+
+        Parameters:
+        mask (int): The bitset of courses.
+
+        Returns:
+        list: The ids of the courses in the set, in bit order.
+        """
+        result = []
+        while mask:
+            low_bit = mask & -mask
+            result.append(self.course_ids[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return result
+
+    def dependents(self, course_id):
+        """
+        Finds every course that requires the given course, directly or indirectly.
+
+        Parameters:
+        course_id (int): The id of the course.
+
+        Returns:
+        list: The ids of the dependent courses.
+        """
+        with self.lock:
+            course_bit = self.bit(course_id)
+            return [other for other, mask in self.closure.items() if mask & course_bit]
+
+    def check(self, course_id, prerequisite_id):
+        """
+        Checks that a prerequisite can be added without creating a cycle.
+
+        Parameters:
+        course_id (int): The id of the course that would get the prerequisite.
+        prerequisite_id (int): The id of the course that would be taken first.
+
+        Returns:
+        None
+
+        Raises:
+        ValueError: If the prerequisite would create a cycle.
+        """
+        with self.lock:
+            course_bit = self.bit(course_id)
+            self.bit(prerequisite_id)
+            if course_id == prerequisite_id or self.closure[prerequisite_id] & course_bit:
+                raise ValueError("A course cannot require itself, directly or indirectly")
+
+    def add(self, course_id, prerequisite_id):
+        """
+        Adds a prerequisite and extends the closure of every affected course.
+
+        Parameters:
+        course_id (int): The id of the course that gets the prerequisite.
+        prerequisite_id (int): The id of the course that must be taken first.
+
+        Returns:
+        None
+
+        Raises:
+        ValueError: If the prerequisite would create a cycle.
+        """
+        with self.lock:
+            self.check(course_id, prerequisite_id)
+            self.direct[course_id].add(prerequisite_id)
+            self.requires[course_id] |= self.bit(prerequisite_id)
+            added = self.bit(prerequisite_id) | self.closure[prerequisite_id]
+            for affected in [course_id] + self.dependents(course_id):
+                self.closure[affected] |= added
+
+    def remove(self, course_id, prerequisite_id):
+        """
+        Removes a prerequisite and recomputes the closure of the affected courses.
+
+        Only the course itself and the courses that depend on it are recomputed.
+
+        Parameters:
+        course_id (int): The id of the course that loses the prerequisite.
+        prerequisite_id (int): The id of the prerequisite to remove.
+
+        Returns:
+        None
+        """
+        with self.lock:
+            if prerequisite_id not in self.direct.get(course_id, ()):
+                return
+            self.direct[course_id].discard(prerequisite_id)
+            self.requires[course_id] &= ~self.bit(prerequisite_id)
+            self.recompute([course_id] + self.dependents(course_id))
+
+    def recompute(self, course_ids):
+        """
+        Recomputes the closure of the given courses from the direct prerequisites.
+
+        Parameters:
+        course_ids (iterable): The ids of the courses to recompute.
+
+        Returns:
+        None
+        """
+        stale = set(course_ids)
+        done = {}
+
+        def visit(course_id):
+            if course_id in done:
+                return done[course_id]
+            if course_id not in stale:
+                return self.closure[course_id]
+            mask = 0
+            for prerequisite_id in self.direct[course_id]:
+                mask |= self.bit(prerequisite_id) | visit(prerequisite_id)
+            done[course_id] = mask
+            return mask
+
+        for course_id in stale:
+            visit(course_id)
+        self.closure.update(done)
+
+    def direct_prerequisites(self, course_id):
+        """
+        Returns the courses that must be taken right before a course.
+
+        Parameters:
+        course_id (int): The id of the course.
+
+        Returns:
+        set: The ids of its direct prerequisites.
+        """
+        with self.lock:
+            return set(self.direct.get(course_id, ()))
+
+    def all_prerequisites(self, course_id):
+        """
+        Returns every course that must be taken before a course, directly or not.
+
+        Parameters:
+        course_id (int): The id of the course.
+
+        Returns:
+        list: The ids of the prerequisites, in bit order.
+        """
+        with self.lock:
+            return self.ids(self.closure.get(course_id, 0))
+
+    def missing(self, course_id, taken_mask):
+        """
+        Finds the direct prerequisites of a course that are not in the taken set.
+
+        Parameters:
+        course_id (int): The id of the course.
+        taken_mask (int): The bitset of the courses the student has taken or is
+        taking.
+
+        Returns:
+        list: The ids of the missing prerequisites, empty if the student may enroll.
+        """
+        with self.lock:
+            return self.ids(self.requires.get(course_id, 0) & ~taken_mask)
+
+    def eligible(self, taken_mask):
+        """
+        Lists every course whose direct prerequisites are all in the taken set.
+
+        Courses that are already in the taken set are left out.
+
+        Parameters:
+        taken_mask (int): The bitset of the courses the student has taken or is
+        taking.
+
+        Returns:
+        list: The ids of the courses the student may take next.
+        """
+        with self.lock:
+            return [
+                course_id
+                for course_id in self.course_ids
+                if not self.requires[course_id] & ~taken_mask
+                and not taken_mask & (1 << self.positions[course_id])
+            ]
+
+
+def get_graph(file):
+    """
+    Returns the prerequisite graph of a database, loading it on first use.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+
+    Returns:
+    PrerequisiteGraph: The cached graph.
+    """
+    with _graphs_lock:
+        graph = _graphs.get(file)
+        generation = _generation
+    if graph is None:
+        # The lock is not held while the database is read. A graph loaded while
+        # forget_graph ran may predate the change, so it is used but not kept
+        graph = PrerequisiteGraph.load(file)
+        with _graphs_lock:
+            if generation == _generation:
+                graph = _graphs.setdefault(file, graph)
+    return graph
+
+
+def forget_graph(file):
+    """
+    Drops the cached graph of a database so the next get_graph reloads it.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+
+    Returns:
+    None
+    """
+    global _generation
+    with _graphs_lock:
+        _generation += 1
+        _graphs.pop(file, None)
@@ -0,0 +1,212 @@
+import cProfile
+import collections
+import functools
+import json
+import os
+import threading
+import time
+
+# How many recent call durations are kept per endpoint for percentiles
+RECENT_CALLS = 512
+
+# The payload of every this many calls of an endpoint is measured, see profiled
+SIZE_SAMPLE_INTERVAL = 50
+
+# Where profile_next writes its profiles
+PROFILE_DIRECTORY = "profiles"
+
+# Statistics by endpoint name, see profiled
+_stats = {}
+_lock = threading.Lock()
+
+# Endpoint name -> number of upcoming calls to run under cProfile
+_profile_requests = {}
+
+
+class EndpointStats:
+    """Running statistics of one endpoint."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.sized_calls = 0
+        self.serialize_seconds = 0.0
+        self.total_bytes = 0
+        self.max_bytes = 0
+        self.recent = collections.deque(maxlen=RECENT_CALLS)
+
+    def record(self, seconds, failed):
+        self.calls += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.recent.append(seconds)
+        if failed:
+            self.errors += 1
+
+    def record_size(self, serialize_seconds, size):
+        self.sized_calls += 1
+        self.serialize_seconds += serialize_seconds
+        self.total_bytes += size
+        self.max_bytes = max(self.max_bytes, size)
+
+    def summary(self):
+        """
+        Summarizes the statistics for get_metrics.
+
+        Returns:
+        dict: Call and error counts, mean, p50, p95 and max call time and mean
+        serialization time in milliseconds, and mean and max payload size in bytes,
+        the last three over the sized_calls whose payload was measured.
+        """
+        recent = sorted(self.recent)
+        calls = self.calls or 1
+        sized_calls = self.sized_calls or 1
+
+        def percentile(fraction):
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(fraction * len(recent)))] * 1000
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean_ms": self.total_seconds / calls * 1000,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": self.max_seconds * 1000,
+            "sized_calls": self.sized_calls,
+            "serialize_ms": self.serialize_seconds / sized_calls * 1000,
+            "mean_bytes": self.total_bytes / sized_calls,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def payload_size(value):
+    """
+    Measures the JSON size of a return value as eel's _safe_json serializes it.
+
+    Parameters:
+    value: The value returned by an endpoint.
+
+    Returns:
+    int: The size in bytes.
+    """
+    return len(json.dumps(value, default=lambda o: None).encode("utf-8"))
+
+
+def profiled(function):
+    """
+    Decorator that records the metrics of an endpoint under its function name.
+
+    Each call adds its duration and whether it raised. Measuring the size of
+    the JSON payload means serializing the result a second time, so that is
+    only done for every SIZE_SAMPLE_INTERVAL-th call and for profiled calls;
+    the time it takes approximates what eel's own serialization of the result
+    costs. While profile_next has calls pending for the endpoint, the call runs
+    under cProfile and its profile is written to PROFILE_DIRECTORY.
+
+    Parameters:
+    function (callable): The endpoint.
+
+    Returns:
+    callable: The wrapped endpoint.
+    """
+    name = function.__name__
+    with _lock:
+        _stats.setdefault(name, EndpointStats())
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        profiler = None
+        with _lock:
+            if _profile_requests.get(name):
+                _profile_requests[name] -= 1
+                profiler = cProfile.Profile()
+            measure = profiler is not None or _stats[name].calls % SIZE_SAMPLE_INTERVAL == 0
+
+        failed = True
+        result = None
+        started = time.perf_counter()
+        try:
+            if profiler is not None:
+                result = profiler.runcall(function, *args, **kwargs)
+            else:
+                result = function(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            seconds = time.perf_counter() - started
+            with _lock:
+                _stats[name].record(seconds, failed)
+            if measure and not failed:
+                serialize_started = time.perf_counter()
+                size = payload_size(result)
+                serialize_seconds = time.perf_counter() - serialize_started
+                with _lock:
+                    _stats[name].record_size(serialize_seconds, size)
+            if profiler is not None:
+                write_profile(name, profiler)
+
+    return wrapper
+
+
+def write_profile(name, profiler):
+    """
+    Writes the profile of one call to PROFILE_DIRECTORY.
+
+    Parameters:
+    name (str): The endpoint the profile belongs to.
+    profiler (cProfile.Profile): The profiler that ran the call.
+
+    Returns:
+    str: The path of the written file, loadable with pstats.
+    """
+    os.makedirs(PROFILE_DIRECTORY, exist_ok=True)
+    path = os.path.join(
+        PROFILE_DIRECTORY, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{time.perf_counter_ns()}.prof"
+    )
+    profiler.dump_stats(path)
+    return path
+
+
+def profile_next(name, calls=1):
+    """
+    Runs the next calls of an endpoint under cProfile.
+
+    Parameters:
+    name (str): The name of the endpoint.
+    calls (int): How many of its upcoming calls to profile; 0 cancels.
+
+    Returns:
+    bool: False if no endpoint has that name.
+    """
+    with _lock:
+        if name not in _stats:
+            return False
+        _profile_requests[name] = calls
+    return True
+
+
+def get_metrics():
+    """
+    Returns the metrics of every profiled endpoint.
+
+    Returns:
+    dict: A mapping of endpoint name to its EndpointStats.summary.
+    """
+    with _lock:
+        return {name: stats.summary() for name, stats in sorted(_stats.items())}
+
+
+def reset_metrics():
+    """
+    Clears the metrics of every endpoint.
+
+    Returns:
+    None
+    """
+    with _lock:
+        for name in _stats:
+            _stats[name] = EndpointStats()
@@ -0,0 +1,337 @@
+import json
+import time
+
+import bottle
+from geventwebsocket import WebSocketError
+
+import collegeapp
+
+# The most changed students and courses held for one client before it is told
+# to reload everything instead
+MAX_PENDING = 200
+
+# Seconds a client may leave a message unacknowledged before it is dropped
+ACK_TIMEOUT = 60
+
+# The shared hub, created by get_push_hub
+_hub = None
+
+
+class PushHub:
+    """
+    Pushes enrollment and roster changes to the clients that subscribed to them.
+
+    Every client holds its own WebSocket to the /push route (see add_route),
+    over which it subscribes to students and courses by id and acknowledges
+    messages. Events from collegeapp.publish_enrollment are not sent right
+    away: each client collects the ids of the students and courses that
+    changed, and flush sends each client only its own collection, so a burst of
+    changes to one course costs one message per subscribed client. Events
+    without a student, such as a removed course or a new instructor, concern
+    every client's view and are given to all of them. In a process that
+    follows the changelog (see collegeapp.follow_changelog), every change,
+    including those of other worker processes, arrives read back from the
+    changelog, so the process's own events are skipped and each change is
+    pushed once.
+
+    A client only gets a new message once it has acknowledged the previous one.
+    Until then its changes keep collecting, so a slow client receives fewer,
+    larger messages instead of a growing backlog. If more than MAX_PENDING ids
+    collect, they are replaced with a request to reload everything. Clients that
+    stay silent for ACK_TIMEOUT seconds are dropped and their socket is closed,
+    which tells them to reconnect and subscribe again.
+    """
+
+    def __init__(self, max_pending=MAX_PENDING, ack_timeout=ACK_TIMEOUT):
+        self.max_pending = max_pending
+        self.ack_timeout = ack_timeout
+        self.clients = {}
+        self.sockets = {}
+        self.student_clients = {}
+        self.course_clients = {}
+
+    def connect(self, client_id, socket):
+        """
+        Sets the socket a client's messages are sent over, closing an older one.
+
+        Parameters:
+        client_id (str): The id the client chose for itself.
+        socket: The client's WebSocket, with send and close methods.
+
+        Returns:
+        None
+        """
+        old = self.sockets.get(client_id)
+        self.sockets[client_id] = socket
+        if old is not None and old is not socket:
+            self._close(old)
+
+    def disconnect(self, client_id, socket):
+        """
+        Forgets a client whose socket closed, unless it has connected again since.
+
+        Parameters:
+        client_id (str): The id of the client.
+        socket: The socket that closed.
+
+        Returns:
+        None
+        """
+        if self.sockets.get(client_id) is socket:
+            del self.sockets[client_id]
+            self.unsubscribe(client_id)
+
+    def drop(self, client_id):
+        """
+        Forgets a client and closes its socket, so it reconnects and subscribes again.
+
+        Parameters:
+        client_id (str): The id of the client.
+
+        Returns:
+        None
+        """
+        self.unsubscribe(client_id)
+        socket = self.sockets.pop(client_id, None)
+        if socket is not None:
+            self._close(socket)
+
+    def _close(self, socket):
+        try:
+            socket.close()
+        except Exception as e:
+            print(f"An error occurred: {e}")
+
+    def subscribe(self, client_id, student_ids=(), course_ids=()):
+        """
+        Replaces the students and courses a client is subscribed to.
+
+        Parameters:
+        client_id (str): The id the client chose for itself.
+        student_ids (iterable): The students whose changes the client wants.
+        course_ids (iterable): The courses whose changes the client wants.
+
+        Returns:
+        None
+        """
+        client = self.clients.get(client_id)
+        if client is None:
+            client = self.clients[client_id] = {
+                "students": set(),
+                "courses": set(),
+                "pending_students": set(),
+                "pending_courses": set(),
+                "reload": False,
+                "sent_at": None,
+            }
+        self._unindex(client_id, client)
+        client["students"] = set(student_ids)
+        client["courses"] = set(course_ids)
+        for student_id in client["students"]:
+            self.student_clients.setdefault(student_id, set()).add(client_id)
+        for course_id in client["courses"]:
+            self.course_clients.setdefault(course_id, set()).add(client_id)
+
+    def unsubscribe(self, client_id):
+        """
+        Forgets a client and everything pending for it.
+
+        Parameters:
+        client_id (str): The id of the client.
+
+        Returns:
+        None
+        """
+        client = self.clients.pop(client_id, None)
+        if client is not None:
+            self._unindex(client_id, client)
+
+    def _unindex(self, client_id, client):
+        for index, ids in [
+            (self.student_clients, client["students"]),
+            (self.course_clients, client["courses"]),
+        ]:
+            for key in ids:
+                subscribers = index.get(key)
+                if subscribers is not None:
+                    subscribers.discard(client_id)
+                    if not subscribers:
+                        del index[key]
+
+    def acknowledge(self, client_id):
+        """
+        Records that a client has handled its last message.
+
+        Parameters:
+        client_id (str): The id of the client.
+
+        Returns:
+        None
+        """
+        client = self.clients.get(client_id)
+        if client is not None:
+            client["sent_at"] = None
+
+    def on_enrollment(self, event):
+        """
+        Adds an enrollment event to the pending changes of the clients it concerns.
+
+        Parameters:
+        event (dict): An event published by collegeapp.publish_enrollment.
+
+        Returns:
+        None
+        """
+        if event["seq"] is None and collegeapp.following_changelog():
+            return
+        course_id = event["course_id"]
+        student_id = event["student_id"]
+        if course_id is None:
+            # Edits of departments, instructors and staff reach clients through
+            # the reference data versions instead
+            for client_id in self.student_clients.get(student_id, ()):
+                self._add(self.clients[client_id], "pending_students", student_id)
+            return
+        if student_id is None:
+            for client in self.clients.values():
+                self._add(client, "pending_courses", course_id)
+            return
+
+        for client_id in self.course_clients.get(course_id, ()):
+            self._add(self.clients[client_id], "pending_courses", course_id)
+        for client_id in self.student_clients.get(student_id, ()):
+            client = self.clients[client_id]
+            self._add(client, "pending_students", student_id)
+            self._add(client, "pending_courses", course_id)
+
+    def reload_all(self):
+        """
+        Tells every client to reload everything with its next message.
+
+        Returns:
+        None
+        """
+        for client in self.clients.values():
+            client["pending_students"].clear()
+            client["pending_courses"].clear()
+            client["reload"] = True
+
+    def _add(self, client, pending, key):
+        if client["reload"]:
+            return
+        client[pending].add(key)
+        if len(client["pending_students"]) + len(client["pending_courses"]) > self.max_pending:
+            client["pending_students"].clear()
+            client["pending_courses"].clear()
+            client["reload"] = True
+
+    def flush(self):
+        """
+        Sends the pending changes of every client that is ready for a message.
+
+        Returns:
+        int: The number of clients a message was sent to.
+        """
+        now = time.monotonic()
+        sent = 0
+        for client_id, client in list(self.clients.items()):
+            if client["sent_at"] is not None:
+                if now - client["sent_at"] > self.ack_timeout:
+                    self.drop(client_id)
+                continue
+            socket = self.sockets.get(client_id)
+            if socket is None:
+                continue
+            if not (client["reload"] or client["pending_students"] or client["pending_courses"]):
+                continue
+            message = {
+                "reload": client["reload"],
+                "students": sorted(client["pending_students"]),
+                "courses": sorted(client["pending_courses"]),
+            }
+            client["pending_students"] = set()
+            client["pending_courses"] = set()
+            client["reload"] = False
+            client["sent_at"] = now
+            try:
+                socket.send(json.dumps(message))
+                sent += 1
+            except (WebSocketError, OSError) as e:
+                print(f"An error occurred: {e}")
+                self.drop(client_id)
+        return sent
+
+    def serve(self, client_id, socket):
+        """
+        Handles a client's WebSocket until it closes.
+
+        The client sends JSON messages: {"type": "subscribe", "students": [...],
+        "courses": [...]} to replace its subscriptions, and {"type": "ack"} once
+        it has handled a message.
+
+        Parameters:
+        client_id (str): The id the client chose for itself.
+        socket: The client's WebSocket.
+
+        Returns:
+        None
+        """
+        self.connect(client_id, socket)
+        try:
+            while True:
+                raw = socket.receive()
+                if raw is None:
+                    break
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    continue
+                if message.get("type") == "subscribe":
+                    self.subscribe(
+                        client_id, message.get("students", ()), message.get("courses", ())
+                    )
+                elif message.get("type") == "ack":
+                    self.acknowledge(client_id)
+        except WebSocketError:
+            pass
+        finally:
+            self.disconnect(client_id, socket)
+
+
+def get_push_hub():
+    """
+    Returns the shared push hub, creating it and subscribing it to enrollment events.
+
+    Returns:
+    PushHub: The shared hub.
+    """
+    global _hub
+    if _hub is None:
+        _hub = PushHub()
+        collegeapp.subscribe_enrollment(_hub.on_enrollment)
+    return _hub
+
+
+def add_route(app):
+    """
+    Adds the /push WebSocket route of the shared hub to a bottle app.
+
+    Clients connect to /push?client=<id>; the server must run gevent-websocket's
+    WebSocketHandler, as eel's does.
+
+    Parameters:
+    app (bottle.Bottle): The app, e.g. the one eel serves.
+
+    Returns:
+    bottle.Bottle: The app.
+    """
+
+    @app.route("/push")
+    def push_socket():
+        socket = bottle.request.environ.get("wsgi.websocket")
+        client_id = bottle.request.query.get("client")
+        if socket is None or not client_id:
+            return bottle.HTTPResponse("Expected a WebSocket with a client id", status=400)
+        get_push_hub().serve(client_id, socket)
+
+    return app
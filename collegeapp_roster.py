@@ -0,0 +1,144 @@
+import threading
+from collections import OrderedDict
+
+import collegeapp
+
+# The most courses whose roster pages are kept in memory
+MAX_CACHED_COURSES = 256
+
+# Events after which a course's cached roster pages are out of date
+_ROSTER_EVENTS = (collegeapp.ENROLLED, collegeapp.WITHDRAWN, collegeapp.COURSE_REMOVED)
+
+# One roster cache per database file
+_caches = {}
+
+
+class RosterCache:
+    """
+    Cached roster pages, grouped per course.
+
+    Pages are stored under their (after_id, limit) key inside the entry of their
+    course. An enrollment event for a course drops that course's entry only, so
+    other courses keep their cached pages; an edited student drops the courses
+    whose cached pages list them. The least recently used courses are
+    evicted once more than MAX_CACHED_COURSES are cached.
+
+    Pages are read on the batch endpoint's pool threads while events arrive on
+    the hub, so the cache is guarded by a lock, which is never held while the
+    database is read. A page read while an event came in is returned but not
+    kept, as it may predate the event.
+    """
+
+    def __init__(self, file, max_courses=MAX_CACHED_COURSES):
+        self.file = file
+        self.max_courses = max_courses
+        self.courses = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_page(self, course_id, after_id=None, limit=50):
+        """
+        Returns a roster page, reading it from the database on a cache miss.
+
+        Parameters:
+        course_id (int): The id of the course.
+        after_id (int, optional): The last student id of the previous page.
+        limit (int): The most students to return.
+
+        Returns:
+        dict: The page, in the format returned by collegeapp.Courses.get_roster.
+        """
+        with self.lock:
+            pages = self.courses.get(course_id)
+            if pages is not None:
+                self.courses.move_to_end(course_id)
+                page = pages.get((after_id, limit))
+                if page is not None:
+                    self.hits += 1
+                    return page
+            self.misses += 1
+            generation = self.generation
+
+        course = collegeapp.Courses(None, None, None, None, course_id)
+        course.file = self.file
+        page = course.get_roster(after_id, limit)
+
+        with self.lock:
+            if generation != self.generation:
+                return page
+            pages = self.courses.get(course_id)
+            if pages is None:
+                pages = self.courses[course_id] = {}
+                if len(self.courses) > self.max_courses:
+                    self.courses.popitem(last=False)
+            pages[(after_id, limit)] = page
+        return page
+
+    def invalidate(self, course_id=None):
+        """
+        Drops the cached pages of one course, or of every course.
+
+        Parameters:
+        course_id (int, optional): The course to drop; None drops everything.
+
+        Returns:
+        None
+        """
+        with self.lock:
+            self.generation += 1
+            if course_id is None:
+                self.courses.clear()
+            else:
+                self.courses.pop(course_id, None)
+
+    def on_enrollment(self, event):
+        """
+        Drops the pages of a course whose roster changed.
+
+        Parameters:
+        event (dict): An event published by collegeapp.publish_enrollment.
+
+        Returns:
+        None
+        """
+        if event["event"] in _ROSTER_EVENTS:
+            self.invalidate(event["course_id"])
+        elif event["event"] == collegeapp.STUDENT_UPDATED:
+            self.invalidate_student(event["student_id"])
+
+    def invalidate_student(self, student_id):
+        """
+        Drops the pages of every course whose cached pages list a student.
+
+        Parameters:
+        student_id (int): The id of the edited student.
+
+        Returns:
+        None
+        """
+        with self.lock:
+            self.generation += 1
+            for course_id, pages in list(self.courses.items()):
+                for page in pages.values():
+                    if student_id in page["students"]["data"]["id"]:
+                        del self.courses[course_id]
+                        break
+
+
+def get_roster_cache(file):
+    """
+    Returns the roster cache of a database, subscribing it to enrollment events.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+
+    Returns:
+    RosterCache: The shared cache.
+    """
+    if file not in _caches:
+        cache = RosterCache(file)
+        collegeapp.subscribe_enrollment(cache.on_enrollment)
+        _caches[file] = cache
+    return _caches[file]
@@ -0,0 +1,140 @@
+import bisect
+
+# Meeting day letters, Monday through Sunday
+DAYS = "MTWRFSU"
+
+
+def parse_days(days):
+    """
+    Splits a meeting pattern such as "MWF" or "TR" into its day letters.
+
+    Parameters:
+    days (str): The meeting pattern, using the letters in DAYS.
+
+    Returns:
+    list: The day letters of the pattern, without duplicates, in week order.
+    """
+    if not days:
+        return []
+    days = days.upper()
+    return [day for day in DAYS if day in days]
+
+
+class WeekIndex:
+    """
+    An interval index of the meetings in one student's week.
+
+    Meetings are kept per day in a list sorted by start time, with start and end
+    given in minutes since midnight. Next to it, max_ends holds the latest end
+    of each prefix of that list. The meetings that clash with a new time range
+    are found with one binary search for the last meeting starting before the
+    range ends, followed by a walk backwards that stops once no earlier meeting
+    can still be running at the range's start. Meetings already in the index
+    may overlap each other, e.g. a long lab around a short lecture; the prefix
+    maximum keeps the walk correct for them, and for a schedule without
+    overlaps it stays O(log n + k) per day.
+    """
+
+    def __init__(self):
+        self.starts = {day: [] for day in DAYS}
+        self.meetings = {day: [] for day in DAYS}
+        self.max_ends = {day: [] for day in DAYS}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Builds an index from (course_id, meeting_days, start_time, end_time) rows.
+
+        Rows without a meeting pattern or times are skipped.
+
+        Parameters:
+        rows (iterable): The sections to index.
+
+        Returns:
+        WeekIndex: The populated index.
+        """
+        index = cls()
+        for course_id, days, start, end in rows:
+            index.add(course_id, days, start, end)
+        return index
+
+    def add(self, course_id, days, start, end):
+        """
+        Adds a section's meetings to the index.
+
+        Parameters:
+        course_id (int): The id of the course the meetings belong to.
+        days (str): The meeting pattern, e.g. "MWF".
+        start (int): The start time in minutes since midnight.
+        end (int): The end time in minutes since midnight.
+
+        Returns:
+        None
+        """
+        if start is None or end is None:
+            return
+        for day in parse_days(days):
+            position = bisect.bisect_right(self.starts[day], start)
+            self.starts[day].insert(position, start)
+            self.meetings[day].insert(position, (start, end, course_id))
+            # The prefix maxima from the new meeting on may all have changed
+            max_ends = self.max_ends[day]
+            max_ends.insert(position, end)
+            latest = max_ends[position - 1] if position else end
+            for i in range(position, len(max_ends)):
+                latest = max(latest, self.meetings[day][i][1])
+                max_ends[i] = latest
+
+    def conflicts(self, days, start, end):
+        """
+        Finds the indexed sections that overlap the given meeting pattern.
+
+        Meetings are half-open ranges, so a class ending at 10:00 does not clash
+        with one starting at 10:00.
+
+        Parameters:
+        days (str): The meeting pattern, e.g. "TR".
+        start (int): The start time in minutes since midnight.
+        end (int): The end time in minutes since midnight.
+
+        Returns:
+        set: The ids of the courses that clash.
+        """
+        clashes = set()
+        if start is None or end is None:
+            return clashes
+        for day in parse_days(days):
+            meetings = self.meetings[day]
+            max_ends = self.max_ends[day]
+            position = bisect.bisect_left(self.starts[day], end) - 1
+            while position >= 0 and max_ends[position] > start:
+                if meetings[position][1] > start:
+                    clashes.add(meetings[position][2])
+                position -= 1
+        return clashes
+
+    def check_cart(self, sections):
+        """
+        Checks a whole proposed cart of sections against the week at once.
+
+        Every section is checked against the indexed week and against the cart
+        sections accepted before it, so k sections cost O(k log n) in total.
+        Sections that clash are not added to the cart, which keeps the index free
+        of overlaps.
+
+        Parameters:
+        sections (iterable): (course_id, meeting_days, start_time, end_time) rows.
+
+        Returns:
+        dict: A mapping of course id to the set of course ids it clashes with,
+        for the cart sections that clash with anything.
+        """
+        cart = WeekIndex()
+        clashes = {}
+        for course_id, days, start, end in sections:
+            found = self.conflicts(days, start, end) | cart.conflicts(days, start, end)
+            if found:
+                clashes[course_id] = found
+            else:
+                cart.add(course_id, days, start, end)
+        return clashes
@@ -0,0 +1,160 @@
+import os
+import signal
+import socket
+import time
+
+import gevent
+import gevent.socket
+from gevent import pywsgi
+from geventwebsocket.handler import WebSocketHandler
+
+import database_functions
+
+# A worker that dies sooner than this many seconds after starting is restarted
+# only after a pause of that long, so a crashing worker cannot spin the CPU
+MIN_WORKER_LIFETIME = 1
+
+# Seconds between two checks of the data version in a worker
+COHERENCE_INTERVAL = 0.1
+
+# The most changelog rows handed to on_change at once
+CHANGES_PER_CALL = 1000
+
+
+def watch_data_version(file, on_change, interval=COHERENCE_INTERVAL):
+    """
+    Calls 'on_change' with the changelog rows of every write, from any process.
+
+    Each worker keeps its own caches, which enrollment events only keep current
+    for writes made by that worker. Running this in a greenlet of every worker
+    polls database_functions.data_version, which is cheap, and only when it
+    moved reads the changes recorded since the last call (see
+    database_functions.changes_since). The worker can then update the caches
+    of the tables that changed, at most 'interval' seconds after another
+    worker wrote. Writes to tables outside the changelog produce no call.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    on_change (callable): Called with a list of at most CHANGES_PER_CALL
+    changes, or with None when the changelog was compacted past the last
+    change handled, in which case everything has to be rebuilt.
+    interval (float): Seconds between two checks.
+
+    Returns:
+    None; runs until the greenlet is killed.
+    """
+    version = database_functions.data_version(file)
+    seq = database_functions.changelog_version(file)
+    while True:
+        gevent.sleep(interval)
+        current = database_functions.data_version(file)
+        if current == version:
+            continue
+        version = current
+        if database_functions.changelog_horizon(file) > seq:
+            seq = database_functions.changelog_version(file)
+            on_change(None)
+            continue
+        while True:
+            changes = database_functions.changes_since(file, seq, CHANGES_PER_CALL)
+            if not changes:
+                break
+            seq = changes[-1][0]
+            on_change(changes)
+            if len(changes) < CHANGES_PER_CALL:
+                break
+
+
+def run_worker(listener, app, worker, on_start=None):
+    """
+    Serves 'app' on an inherited listening socket until the process is stopped.
+
+    Parameters:
+    listener (socket.socket): The listening socket shared by all workers.
+    app (callable): The WSGI app, e.g. a bottle app with the Eel routes.
+    worker (int): The number of this worker, from 0.
+    on_start (callable, optional): Called with the worker number before serving.
+
+    Returns:
+    None
+    """
+    if on_start is not None:
+        on_start(worker)
+    # gevent only accepts cooperatively on its own socket type
+    listener = gevent.socket.socket(listener.family, listener.type, fileno=listener.detach())
+    server = pywsgi.WSGIServer(listener, app, handler_class=WebSocketHandler, log=None)
+    server.serve_forever()
+
+
+def serve(app, host="localhost", port=8000, workers=None, on_start=None):
+    """
+    Serves a WSGI app from several pre-forked worker processes.
+
+    The supervisor opens the listening socket, closes its own database
+    connections and forks 'workers' processes that all accept on that socket,
+    each running its own gevent server, connection pool and caches. The
+    database should be in WAL mode (see database_functions.enable_wal), so that
+    workers read while another one writes. The supervisor restarts workers that
+    exit and stops them all on SIGINT or SIGTERM.
+
+    Enrollment events are published in the worker whose request made the
+    change; other workers learn of it from the changelog through
+    watch_data_version, which 'on_start' should run in every worker.
+
+    Parameters:
+    app (callable): The WSGI app.
+    host (str): The address to listen on.
+    port (int): The port to listen on.
+    workers (int, optional): The number of worker processes; one per CPU by default.
+    on_start (callable, optional): Called in each worker with its number before
+    it serves, e.g. to start its background greenlets.
+
+    Returns:
+    None
+    """
+    workers = workers or os.cpu_count() or 1
+    listener = socket.create_server((host, port), backlog=1024)
+    database_functions.close_connections()
+
+    children = {}
+    stopping = False
+
+    def spawn(worker):
+        pid = gevent.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                run_worker(listener, app, worker, on_start)
+            finally:
+                os._exit(1)
+        children[pid] = (worker, time.monotonic())
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for worker in range(workers):
+        spawn(worker)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(f"Serving on http://{host}:{port} with {workers} workers")
+
+    while children:
+        try:
+            pid, status = os.waitpid(-1, 0)
+        except ChildProcessError:
+            break
+        worker, started = children.pop(pid, (None, None))
+        if worker is None or stopping:
+            continue
+        print(f"Worker {worker} exited with status {status}, restarting it")
+        if time.monotonic() - started < MIN_WORKER_LIFETIME:
+            time.sleep(MIN_WORKER_LIFETIME)
+        spawn(worker)
+    listener.close()
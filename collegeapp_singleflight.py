@@ -0,0 +1,153 @@
+import functools
+import json
+import threading
+import time
+
+import gevent.event
+
+
+class _Call:
+    """
+    An in-flight call whose result is shared by every caller waiting on it.
+
+    Callers wait in one of two ways. eel is not monkey-patched, so greenlets on
+    the main thread's hub must wait on a gevent event, or they would block the
+    whole hub while the leader runs; callers on other threads, such as those of
+    the batch endpoint's thread pool, wait on a threading event.
+    """
+
+    def __init__(self):
+        self.thread_done = threading.Event()
+        self.greenlet_done = gevent.event.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self):
+        if threading.current_thread() is threading.main_thread():
+            self.greenlet_done.wait()
+        else:
+            self.thread_done.wait()
+
+    def finish(self):
+        self.thread_done.set()
+        self.greenlet_done.set()
+
+
+class SingleFlight:
+    """
+    Wraps a function so identical concurrent calls share one execution.
+
+    The first caller for a key runs the function; callers with the same key
+    that arrive while it runs wait for it and receive the same result, or the
+    same exception; if the leader is killed instead, they get a RuntimeError.
+    With a ttl, a successful result is also kept for that many
+    seconds and handed to later callers without running the function again.
+    forget drops kept results, e.g. when an enrollment event shows they are out
+    of date; a call that was already running when forget was called does not
+    keep its result.
+
+    Works across threads, such as the thread pool used by the batch endpoint.
+    """
+
+    def __init__(self, function, ttl=0, key=None):
+        self.function = function
+        self.ttl = ttl
+        self.key = key
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.results = {}
+        self.generation = 0
+        self.executions = 0
+        self.shared = 0
+        self.cached = 0
+        functools.update_wrapper(self, function)
+
+    def make_key(self, args, kwargs):
+        """
+        Builds the key that identifies a call.
+
+        Parameters:
+        args (tuple): The positional arguments of the call.
+        kwargs (dict): The keyword arguments of the call.
+
+        Returns:
+        hashable: The key given by the 'key' function, or the arguments as JSON.
+        """
+        if self.key is not None:
+            return self.key(*args, **kwargs)
+        return json.dumps([args, kwargs], sort_keys=True, default=str)
+
+    def __call__(self, *args, **kwargs):
+        key = self.make_key(args, kwargs)
+        with self.lock:
+            result = self.results.get(key)
+            if result is not None and result[0] > time.monotonic():
+                self.cached += 1
+                return result[1]
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                generation = self.generation
+                self.executions += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.wait()
+            if isinstance(call.error, Exception):
+                raise call.error
+            if call.error is not None:
+                # The leader was killed or interrupted, e.g. by GreenletExit
+                raise RuntimeError(f"The shared call was interrupted: {call.error!r}")
+            return call.value
+
+        try:
+            call.value = self.function(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+                if call.error is None and self.ttl > 0 and generation == self.generation:
+                    self.results[key] = (time.monotonic() + self.ttl, call.value)
+            call.finish()
+        return call.value
+
+    def forget(self, key=None):
+        """
+        Drops the kept result of one key, or of every key.
+
+        Parameters:
+        key (hashable, optional): The key to drop; None drops everything.
+
+        Returns:
+        None
+        """
+        with self.lock:
+            self.generation += 1
+            if key is None:
+                self.results.clear()
+            else:
+                self.results.pop(key, None)
+
+
+def single_flight(ttl=0, key=None):
+    """
+    Decorator that wraps a function in a SingleFlight.
+
+    Parameters:
+    ttl (float): Seconds to keep a result for later callers; 0 only shares
+    results between concurrent callers.
+    key (callable, optional): Builds the key of a call from its arguments;
+    by default the arguments themselves are the key.
+
+    Returns:
+    callable: The decorator.
+    """
+
+    def decorator(function):
+        return SingleFlight(function, ttl, key)
+
+    return decorator
@@ -0,0 +1,261 @@
+import concurrent.futures
+import json
+import random
+
+import database_functions
+
+
+def _build_time_slots():
+    slots = []
+    for hour in range(8, 17):
+        slots.append(("MWF", hour * 60, hour * 60 + 50))
+    for start in range(8 * 60, 17 * 60, 90):
+        slots.append(("TR", start, start + 75))
+    return slots
+
+
+# The standard meeting patterns sections are scheduled into, as
+# (meeting_days, start_time, end_time). Slots never overlap each other, so two
+# sections only clash when they are given the same slot.
+TIME_SLOTS = _build_time_slots()
+
+
+def load_problem(file):
+    """
+    Reads everything the timetable solver needs from the database.
+
+    Section sizes are the course capacity when one is set, otherwise the number
+    of students currently enrolled.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+
+    Returns:
+    dict: A problem with the keys
+        - "sections": a list of (course_id, [instructor_ids], size) tuples
+        - "rooms": a list of (room_id, capacity) tuples, smallest room first
+        - "availability": a mapping of instructor id to the list of slots
+          they can teach in, for instructors with availability rows
+    """
+    courses = database_functions.read_from_database(
+        file,
+        "SELECT id, COALESCE(capacity, enrolled_count, 0) FROM courses ORDER BY id",
+    )
+    instructors = {}
+    for course_id, instructor_id in (
+        database_functions.read_from_database(
+            file, "SELECT course_id, instructor_id FROM course_instructors"
+        )
+        or []
+    ):
+        instructors.setdefault(course_id, []).append(instructor_id)
+
+    rooms = database_functions.read_from_database(
+        file, "SELECT id, capacity FROM rooms ORDER BY capacity, id"
+    )
+
+    availability = {}
+    for instructor_id, slot in (
+        database_functions.read_from_database(
+            file, "SELECT instructor_id, slot FROM instructor_availability"
+        )
+        or []
+    ):
+        availability.setdefault(instructor_id, []).append(slot)
+
+    return {
+        "sections": [
+            (course_id, instructors.get(course_id, []), size)
+            for course_id, size in courses or []
+        ],
+        "rooms": rooms or [],
+        "availability": availability,
+    }
+
+
+def solve(problem, seed=0):
+    """
+    Assigns every section a time slot and a room.
+
+    Each value a section can take is one (slot, room) pair, numbered
+    slot * len(rooms) + room, and a section's domain is an integer bitset of the
+    values it may still take. The domain starts as the instructor's available
+    slots combined with the rooms large enough for the section. The solver
+    repeatedly picks the section with the smallest domain, gives it the value
+    that empties the fewest domains of sections sharing an instructor, and
+    propagates: the (slot, room) pair is removed from every domain, and the
+    whole slot from the domains of sections sharing an instructor. A section
+    whose domain becomes empty is left unassigned. Ties are broken by the seed.
+
+    Parameters:
+    problem (dict): A problem as returned by load_problem.
+    seed (int): The seed for tie breaking, so different starts explore
+    different timetables.
+
+    Returns:
+    dict: A result with the keys
+        - "assignments": a mapping of course id to (slot, room_id)
+        - "unassigned": the ids of the courses that could not be placed
+        - "seed": the seed that was used
+    """
+    rng = random.Random(seed)
+    rooms = problem["rooms"]
+    room_count = len(rooms)
+    slot_count = len(TIME_SLOTS)
+    all_rooms = (1 << room_count) - 1
+    slot_masks = [all_rooms << (slot * room_count) for slot in range(slot_count)]
+
+    sections = problem["sections"]
+    domains = []
+    for course_id, instructor_ids, size in sections:
+        fitting = 0
+        for room, (room_id, capacity) in enumerate(rooms):
+            if capacity >= size:
+                fitting |= 1 << room
+        allowed = set(range(slot_count))
+        for instructor_id in instructor_ids:
+            if instructor_id in problem["availability"]:
+                allowed &= set(problem["availability"][instructor_id])
+        domain = 0
+        for slot in allowed:
+            domain |= fitting << (slot * room_count)
+        domains.append(domain)
+
+    teaching = {}
+    for index, (course_id, instructor_ids, size) in enumerate(sections):
+        for instructor_id in instructor_ids:
+            teaching.setdefault(instructor_id, []).append(index)
+
+    assignments = {}
+    unassigned = []
+    remaining = set(range(len(sections)))
+    tie_breaks = [rng.random() for _ in sections]
+
+    while remaining:
+        index = min(
+            remaining, key=lambda i: (domains[i].bit_count(), tie_breaks[i])
+        )
+        remaining.discard(index)
+        domain = domains[index]
+        course_id, instructor_ids, size = sections[index]
+        if not domain:
+            unassigned.append(course_id)
+            continue
+
+        neighbours = {
+            other
+            for instructor_id in instructor_ids
+            for other in teaching[instructor_id]
+            if other in remaining
+        }
+
+        best = None
+        for slot in range(slot_count):
+            in_slot = domain & slot_masks[slot]
+            if not in_slot:
+                continue
+            # The lowest bit is the smallest room that still fits
+            value = in_slot & -in_slot
+            wipeouts = sum(
+                1
+                for other in neighbours
+                if not domains[other] & ~slot_masks[slot] & ~value
+            )
+            score = (wipeouts, rng.random())
+            if best is None or score < best[0]:
+                best = (score, slot, value)
+
+        score, slot, value = best
+        room = value.bit_length() - 1 - slot * room_count
+        assignments[course_id] = (slot, rooms[room][0])
+
+        for other in remaining:
+            domains[other] &= ~value
+        for other in neighbours:
+            domains[other] &= ~slot_masks[slot]
+
+    return {"assignments": assignments, "unassigned": unassigned, "seed": seed}
+
+
+def solve_multi_start(problem, starts=4, processes=None):
+    """
+    Runs the solver with several seeds in parallel and keeps the best timetable.
+
+    Every start runs in its own process, so the starts use all available cores.
+    The best timetable is the one with the fewest unassigned sections.
+
+    Parameters:
+    problem (dict): A problem as returned by load_problem.
+    starts (int): The number of seeds to try.
+    processes (int, optional): The number of worker processes, defaulting to
+    one per core.
+
+    Returns:
+    dict: The best result, in the format returned by solve.
+    """
+    if starts <= 1:
+        return solve(problem)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(solve, [problem] * starts, range(starts)))
+    return min(results, key=lambda result: (len(result["unassigned"]), result["seed"]))
+
+
+def write_timetable(file, assignments):
+    """
+    Stores the meeting pattern and room of every assigned section in one transaction.
+
+    Every course missing from the assignments, such as a section the solver
+    left unassigned, has its meeting time and room cleared in the same
+    transaction, so it cannot double-book a room or instructor against the new
+    timetable with its old slot.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    assignments (dict): A mapping of course id to (slot, room_id).
+
+    Returns:
+    None
+    """
+    rows = [
+        (*TIME_SLOTS[slot], room_id, course_id)
+        for course_id, (slot, room_id) in assignments.items()
+    ]
+    with database_functions.transaction(file) as c:
+        c.execute(
+            """UPDATE courses
+            SET meeting_days = NULL, start_time = NULL, end_time = NULL, room_id = NULL
+            WHERE id NOT IN (SELECT value FROM json_each(?))""",
+            (json.dumps(list(assignments)),),
+        )
+        c.executemany(
+            """UPDATE courses
+            SET meeting_days = ?, start_time = ?, end_time = ?, room_id = ?
+            WHERE id = ?""",
+            rows,
+        )
+
+
+def generate_timetable(file, starts=1, processes=None, write=True):
+    """
+    Builds a timetable for every course and optionally saves it.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    starts (int): The number of solver starts; more than one runs them in parallel.
+    processes (int, optional): The number of worker processes for parallel starts.
+    write (bool): Whether to store the timetable in the courses table.
+
+    Returns:
+    dict: The result, in the format returned by solve.
+    """
+    problem = load_problem(file)
+    result = solve_multi_start(problem, starts, processes)
+    if write:
+        write_timetable(file, result["assignments"])
+    return result
+
+
+if __name__ == "__main__":
+    timetable = generate_timetable("college_data.db", starts=4)
+    print(f"Scheduled {len(timetable['assignments'])} sections")
+    print(f"Could not schedule: {timetable['unassigned']}")
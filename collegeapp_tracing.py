@@ -0,0 +1,253 @@
+import collections
+import contextlib
+import contextvars
+import functools
+import json
+import random
+import threading
+import time
+
+import database_functions
+
+# The share of traces recorded when tracing is configured without a rate
+DEFAULT_SAMPLE_RATE = 0.1
+
+# How many finished spans the in-process ring buffer keeps
+RING_BUFFER_SIZE = 2000
+
+# SQL text longer than this is cut in statement spans
+MAX_STATEMENT_LENGTH = 500
+
+# The span open in the current context; _UNSAMPLED inside a trace that was not sampled
+_current_span = contextvars.ContextVar("collegeapp_span", default=None)
+_UNSAMPLED = object()
+
+# The share of traces recorded and where their spans go, see configure
+_sample_rate = 0.0
+_exporters = []
+
+
+class Span:
+    """
+    One timed operation of a trace.
+
+    Spans of one trace share its trace_id; parent_id is the span_id of the
+    span that was open when this one started, None for the root.
+    """
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+
+    def to_dict(self):
+        """
+        Returns the span as a JSON serializable dict.
+
+        Returns:
+        dict: The trace, span and parent ids, name, start time (Unix seconds),
+        duration in milliseconds, attributes and the error, if any.
+        """
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration * 1000 if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class RingBufferExporter:
+    """Keeps the most recent finished spans in memory."""
+
+    def __init__(self, size=RING_BUFFER_SIZE):
+        self.spans = collections.deque(maxlen=size)
+
+    def export(self, span):
+        self.spans.append(span.to_dict())
+
+    def get_spans(self, trace_id=None):
+        """
+        Returns the kept spans, oldest first.
+
+        Parameters:
+        trace_id (str, optional): Only return the spans of this trace.
+
+        Returns:
+        list: The spans, as dicts.
+        """
+        spans = list(self.spans)
+        if trace_id is not None:
+            spans = [span for span in spans if span["trace_id"] == trace_id]
+        return spans
+
+
+class JsonlExporter:
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(line)
+
+
+def configure(sample_rate=DEFAULT_SAMPLE_RATE, exporters=None):
+    """
+    Turns tracing on, or off with a sample rate of 0.
+
+    Sampling is decided once per trace, when its root span starts; every span
+    inside a sampled trace is recorded and none of an unsampled one, so traces
+    are always complete.
+
+    Parameters:
+    sample_rate (float): The share of traces to record, from 0 to 1.
+    exporters (list, optional): What finished spans are handed to, e.g. a
+    RingBufferExporter and a JsonlExporter.
+
+    Returns:
+    None
+    """
+    global _sample_rate, _exporters
+    _sample_rate = sample_rate
+    _exporters = list(exporters or [])
+    if sample_rate > 0:
+        database_functions.add_statement_listener(on_statement)
+    else:
+        database_functions.remove_statement_listener(on_statement)
+
+
+def _export(span):
+    for exporter in _exporters:
+        try:
+            exporter.export(span)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """
+    Times the block as a span, a child of the span open around it.
+
+    Outside any span this starts a new trace, which is sampled with the
+    configured rate.
+
+    Parameters:
+    name (str): What the block does.
+    **attributes: Details to record with the span.
+
+    Yields:
+    Span or None: The span, or None if the trace is not sampled.
+    """
+    parent = _current_span.get()
+    if parent is _UNSAMPLED or (parent is None and random.random() >= _sample_rate):
+        token = _current_span.set(_UNSAMPLED)
+        try:
+            yield None
+        finally:
+            _current_span.reset(token)
+        return
+
+    if parent is None:
+        current = Span(name, f"{random.getrandbits(128):032x}", None, attributes)
+    else:
+        current = Span(name, parent.trace_id, parent.span_id, attributes)
+    token = _current_span.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = repr(e)
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        _current_span.reset(token)
+        _export(current)
+
+
+def traced(name=None):
+    """
+    Decorator that runs each call of a function in a span.
+
+    Parameters:
+    name (str, optional): The name of the span; by default the module and name
+    of the function, e.g. "collegeapp_controller.grab".
+
+    Returns:
+    callable: The decorator.
+    """
+
+    def decorator(function):
+        span_name = name or f"{function.__module__}.{function.__name__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _sample_rate <= 0:
+                return function(*args, **kwargs)
+            with span(span_name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def on_statement(instructions, seconds, error):
+    """
+    Records an executed statement as a span of the trace that ran it.
+
+    This is a database_functions statement listener; statements run outside a
+    sampled trace are not recorded.
+
+    Parameters:
+    instructions (str): The SQL text.
+    seconds (float): How long it took to execute.
+    error (Exception or None): What it raised.
+
+    Returns:
+    None
+    """
+    parent = _current_span.get()
+    if parent is None or parent is _UNSAMPLED:
+        return
+    statement = Span(
+        "sql",
+        parent.trace_id,
+        parent.span_id,
+        {"statement": " ".join(instructions.split())[:MAX_STATEMENT_LENGTH]},
+    )
+    statement.start -= seconds
+    statement.duration = seconds
+    if error is not None:
+        statement.error = repr(error)
+    _export(statement)
+
+
+def get_exporter(kind):
+    """
+    Returns the first configured exporter of a type.
+
+    Parameters:
+    kind (type): The exporter class, e.g. RingBufferExporter.
+
+    Returns:
+    object or None: The exporter.
+    """
+    for exporter in _exporters:
+        if isinstance(exporter, kind):
+            return exporter
+    return None
+
@@ -1,13 +1,236 @@
+import contextlib
+import os
 import sqlite3
+import threading
+import time
+
+# The most idle connections kept open per database file in one process
+POOL_SIZE = 8
+
+# Idle connections by (process id, database file), see get_connection
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Connections lent out by get_connection, by (process id, database file)
+_in_use = {}
+
+# The connection each process watches the data version with, by database file
+_watchers = {}
+
+# Functions called after every statement run on a pooled connection, see
+# add_statement_listener
+_statement_listeners = []
+
+
+def add_statement_listener(listener):
+    """
+    Calls 'listener' after every statement executed on a pooled connection.
+
+    The listener is called with the SQL text, the seconds the statement took to
+    execute and the exception it raised, or None. It runs in the thread and
+    context of the caller, so it can attribute the statement to the request that
+    ran it. Fetching the rows of a SELECT is not included in the time.
+
+    Parameters:
+    listener (callable): Called as listener(instructions, seconds, error).
+
+    Returns:
+    None
+    """
+    if listener not in _statement_listeners:
+        _statement_listeners.append(listener)
+
+
+def remove_statement_listener(listener):
+    """
+    Stops calling a listener added with add_statement_listener.
+
+    Parameters:
+    listener (callable): The listener.
+
+    Returns:
+    None
+    """
+    if listener in _statement_listeners:
+        _statement_listeners.remove(listener)
+
+
+class _Cursor(sqlite3.Cursor):
+    """A cursor that reports each statement it executes to the statement listeners."""
+
+    def execute(self, instructions, *args):
+        if not _statement_listeners:
+            return super().execute(instructions, *args)
+        return _report(instructions, super().execute, instructions, *args)
+
+    def executemany(self, instructions, *args):
+        if not _statement_listeners:
+            return super().executemany(instructions, *args)
+        return _report(instructions, super().executemany, instructions, *args)
+
+
+class _Connection(sqlite3.Connection):
+    """A connection whose cursors are _Cursor, so statements in transactions are reported too."""
+
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+
+def _report(instructions, execute, *args):
+    error = None
+    started = time.perf_counter()
+    try:
+        return execute(*args)
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        for listener in list(_statement_listeners):
+            listener(instructions, seconds, error)
+
+
+@contextlib.contextmanager
+def get_connection(file):
+    """
+    Lends out a connection from this process's pool for the specified database.
+
+    Opening a SQLite connection costs more than most of the app's queries, so
+    connections are kept open and reused. Each process has its own pool, keyed by
+    its process id, so a forked worker never touches connections opened by its
+    parent. Connections are in autocommit mode (isolation_level=None); every
+    statement commits on its own unless the caller runs BEGIN itself, as
+    transaction does. A transaction left open is rolled back when the
+    connection comes back. Foreign keys are enforced on every connection, so
+    deleting a student, instructor or course cascades to the rows that refer to
+    it, and the triggers on those rows keep the counters such as
+    courses.enrolled_count current.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+
+    Yields:
+    sqlite3.Connection: The connection, for the duration of the block.
+    """
+    key = (os.getpid(), file)
+    with _pools_lock:
+        pool = _pools.setdefault(key, [])
+        conn = pool.pop() if pool else None
+    if conn is None:
+        conn = sqlite3.connect(
+            file,
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+            factory=_Connection,
+        )
+        conn.execute("PRAGMA foreign_keys = ON")
+    with _pools_lock:
+        _in_use[key] = _in_use.get(key, 0) + 1
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        with _pools_lock:
+            _in_use[key] -= 1
+            if len(pool) < POOL_SIZE:
+                pool.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+
+def pool_stats():
+    """
+    Counts the connections of this process's pools.
+
+    Returns:
+    dict: {file: {"idle": int, "in_use": int}} for every database file this
+    process has connected to.
+    """
+    pid = os.getpid()
+    with _pools_lock:
+        return {
+            key[1]: {"idle": len(pool), "in_use": _in_use.get(key, 0)}
+            for key, pool in _pools.items()
+            if key[0] == pid
+        }
+
+
+def close_connections():
+    """
+    Closes every pooled connection of this process.
+
+    A process that is about to fork workers calls this first, so no open
+    connection is inherited across the fork.
+
+    Returns:
+    None
+    """
+    with _pools_lock:
+        pools = [pool for key, pool in _pools.items() if key[0] == os.getpid()]
+        _pools.clear()
+    for pool in pools:
+        for conn in pool:
+            conn.close()
+    for conn in _watchers.values():
+        conn.close()
+    _watchers.clear()
+
+
+def enable_wal(file):
+    """
+    Switches the database to write-ahead logging.
+
+    In WAL mode readers do not block the writer and the writer does not block
+    readers, which lets several processes serve reads from the same file while
+    one of them writes. The mode is stored in the database file, so the switch is
+    permanent: every later connection, from this app or any other tool, uses WAL
+    until the mode is changed back with PRAGMA journal_mode=DELETE. While the
+    database is open, SQLite keeps its -wal and -shm files next to it.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+
+    Returns:
+    str: The journal mode now in effect, "wal" on success.
+    """
+    row = read_from_database(file, "PRAGMA journal_mode=WAL", "one")
+    return row[0] if row else None
+
+
+def data_version(file):
+    """
+    Returns a number that changes whenever another connection commits to the database.
+
+    This is SQLite's PRAGMA data_version, read through one dedicated connection
+    per process, so it moves on commits from other processes as well as from
+    this process's pooled connections. Caches compare it with the value they
+    were built at to notice writes made by other worker processes.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+
+    Returns:
+    int: The data version.
+    """
+    conn = _watchers.get(file)
+    if conn is None:
+        conn = _watchers[file] = sqlite3.connect(
+            file, isolation_level=None, check_same_thread=False
+        )
+    return conn.execute("PRAGMA data_version").fetchone()[0]
 
 
 def write_to_database(file, instructions, values=None):
     """
     Executes a write operation on the specified SQLite database.
 
-    This function connects to the SQLite database specified by the 'file' parameter,
-    executes the SQL command provided in the 'instructions' parameter with the
-    provided values, commits the changes, and then closes the connection.
+    This function borrows a connection to the SQLite database specified by the 'file'
+    parameter from the pool (see get_connection), executes the SQL command provided
+    in the 'instructions' parameter with the provided values, which commits the
+    changes, and then returns the connection to the pool.
 
     Parameters:
     file (str): The path to the SQLite database file.
@@ -17,24 +240,25 @@ def write_to_database(file, instructions, values=None):
     Returns:
     None
     """
-    conn = sqlite3.connect(file)
-    c = conn.cursor()
-    if values:
-        c.execute(instructions, values)
-    else:
-        c.execute(instructions)
-    conn.commit()
-    conn.close()
+    with get_connection(file) as conn:
+        c = conn.cursor()
+        try:
+            if values:
+                c.execute(instructions, values)
+            else:
+                c.execute(instructions)
+        finally:
+            c.close()
 
 
 def read_from_database(file, instructions, action="all", values=None):
     """
     Executes a read operation on the specified SQLite database and retrieves the results.
 
-    This function connects to the SQLite database specified by the 'file' parameter,
-    executes the SQL query provided in the 'instructions' parameter, and retrieves
-    the data based on the specified 'action'. The connection to the database is closed
-    after the operation.
+    This function borrows a connection to the SQLite database specified by the 'file'
+    parameter from the pool (see get_connection), executes the SQL query provided in
+    the 'instructions' parameter, and retrieves the data based on the specified
+    'action'. The connection is returned to the pool after the operation.
 
     Parameters:
     file (str): The path to the SQLite database file.
@@ -50,29 +274,136 @@ def read_from_database(file, instructions, action="all", values=None):
         - If action is "one", returns a single tuple representing one row or None if no more rows are available.
         - If action is ("many", int), returns a list of tuples containing the specified number of rows.
     """
-    conn = sqlite3.connect(file)
-    c = conn.cursor()
-    try:
-        if values:
-            c.execute(instructions, values)
-        else:
-            c.execute(instructions)
-
-        if action == "one":
-            data = c.fetchone()
-        elif isinstance(action, tuple) and action[0] == "many":
-            data = c.fetchmany(action[1])
-        else:  # Default action is "all"
-            data = c.fetchall()
-    except sqlite3.Error as e:
-        print(f"An error occurred: {e}")
-        data = None
-    finally:
-        c.close()
-        conn.close()
+    with get_connection(file) as conn:
+        c = conn.cursor()
+        try:
+            if values:
+                c.execute(instructions, values)
+            else:
+                c.execute(instructions)
+
+            if action == "one":
+                data = c.fetchone()
+            elif isinstance(action, tuple) and action[0] == "many":
+                data = c.fetchmany(action[1])
+            else:  # Default action is "all"
+                data = c.fetchall()
+        except sqlite3.Error as e:
+            print(f"An error occurred: {e}")
+            data = None
+        finally:
+            c.close()
     return data
 
 
+@contextlib.contextmanager
+def transaction(file, mode="IMMEDIATE"):
+    """
+    Runs several statements on the specified SQLite database as one transaction.
+
+    The transaction is opened with BEGIN IMMEDIATE by default, which takes the
+    database write lock up front. Concurrent writers then queue on SQLite's busy
+    timeout instead of failing halfway through with "database is locked", so
+    read-check-write sequences such as seat allocation cannot interleave.
+    The transaction is committed when the block exits normally and rolled back
+    if an exception is raised.
+
+    Example:
+    with transaction(file) as c:
+        c.execute("INSERT INTO ...", values)
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    mode (str): The transaction type, one of "DEFERRED", "IMMEDIATE" or "EXCLUSIVE".
+
+    Yields:
+    sqlite3.Cursor: A cursor to execute the statements of the transaction with.
+    """
+    with get_connection(file) as conn:
+        c = conn.cursor()
+        c.execute(f"BEGIN {mode}")
+        try:
+            yield c
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        finally:
+            c.close()
+
+
+def read_columnar(file, instructions, values=None, dictionary_columns=()):
+    """
+    Executes a read operation and returns the result set in a column-oriented payload.
+
+    Instead of a list of row tuples, the rows fetched from the cursor are transposed
+    into one list per column, so the column names are only sent once no matter how
+    many rows are returned. Columns listed in 'dictionary_columns' are dictionary
+    encoded: every distinct value is stored once and the column holds integer codes
+    pointing into that dictionary, which keeps repetitive text such as majors small.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    instructions (str): The SQL query to execute (e.g., SELECT).
+    values (tuple, optional): A tuple containing the values to safely substitute into the SQL command.
+    dictionary_columns (iterable, optional): The names of the columns to dictionary encode.
+
+    Returns:
+    dict or None:
+        - {"columns": [...], "data": {column: [...]}, "dictionaries": {column: [...]}}
+        - None if the query failed.
+    """
+    with get_connection(file) as conn:
+        c = conn.cursor()
+        try:
+            if values:
+                c.execute(instructions, values)
+            else:
+                c.execute(instructions)
+            payload = fetch_columnar(c, dictionary_columns)
+        except sqlite3.Error as e:
+            print(f"An error occurred: {e}")
+            payload = None
+        finally:
+            c.close()
+    return payload
+
+
+def fetch_columnar(c, dictionary_columns=()):
+    """
+    Fetches the rows of an executed query into a column-oriented payload.
+
+    This is the part of read_columnar that works on a cursor, for queries that run
+    inside a transaction.
+
+    Parameters:
+    c (sqlite3.Cursor): A cursor on which a SELECT has just been executed.
+    dictionary_columns (iterable, optional): The names of the columns to dictionary encode.
+
+    Returns:
+    dict: {"columns": [...], "data": {column: [...]}, "dictionaries": {column: [...]}}
+    """
+    columns = [description[0] for description in c.description]
+    rows = c.fetchall()
+    if rows:
+        transposed = [list(column) for column in zip(*rows)]
+    else:
+        transposed = [[] for _ in columns]
+
+    data = dict(zip(columns, transposed))
+    dictionaries = {}
+    for column in dictionary_columns:
+        if column not in data:
+            continue
+        lookup = {}
+        data[column] = [
+            lookup.setdefault(value, len(lookup)) for value in data[column]
+        ]
+        dictionaries[column] = list(lookup)
+
+    return {"columns": columns, "data": data, "dictionaries": dictionaries}
+
+
 def initial_write(file):
     """
     Initializes the database with required tables and populates them with dummy data.
@@ -224,6 +555,675 @@ def initial_write(file):
     for dummy_data in bulk_dummy_data:
         write_to_database(file, dummy_data)
 
+    upgrade_database(file)
+
+
+def column_exists(file, table, column):
+    """
+    Checks whether a table in the database already has the given column.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    table (str): The name of the table to inspect.
+    column (str): The name of the column to look for.
+
+    Returns:
+    bool: True if the column exists, otherwise False.
+    """
+    columns = read_from_database(file, f"PRAGMA table_info({table})")
+    return any(info[1] == column for info in columns or [])
+
+
+# The tables whose changes are recorded in changelog
+CHANGELOG_TABLES = (
+    "departments",
+    "courses",
+    "students",
+    "instructors",
+    "staff",
+    "course_students",
+    "course_instructors",
+    "course_waitlist",
+    "course_prerequisites",
+)
+
+# The columns copied into changelog.course_id and changelog.student_id, so that
+# a change can be traced to its course and student even after the row is gone
+CHANGELOG_KEYS = {
+    "courses": ("rowid", None),
+    "students": (None, "rowid"),
+    "course_students": ("course_id", "student_id"),
+    "course_instructors": ("course_id", None),
+    "course_waitlist": ("course_id", "student_id"),
+    "course_prerequisites": ("course_id", None),
+}
+
+# Columns kept current by triggers on other tables. Updates that only change
+# these are not recorded in changelog, so an enrollment does not make every
+# cached copy of the courses or students table look out of date.
+CHANGELOG_IGNORED_COLUMNS = {
+    "courses": ("enrolled_count",),
+    "students": ("credit_load",),
+}
+
+
+def upgrade_database(file):
+    """
+    Adds the columns, tables and triggers introduced after the original schema.
+
+    Every step checks whether it has already been applied, so this function is safe
+    to run on every start-up. It is called at the end of initial_write for new
+    databases and brings databases created by older versions of the app up to date.
+
+    The following structures are added:
+    - courses.enrolled_count, kept in sync with course_students by triggers
+    - courses.capacity, the seat limit of a course (NULL means unlimited)
+    - course_waitlist, the FIFO waitlist of full courses, indexed by position
+    - students.credit_load, the running total of credits of the student's
+      courses, kept in sync with course_students and courses.credits by triggers
+    - courses.meeting_days, start_time and end_time, the weekly meeting pattern
+      of a course (days such as "MWF", times in minutes since midnight)
+    - course_prerequisites, the courses that must be taken before a course
+    - rooms, with a few sample rooms, and courses.room_id
+    - instructor_availability, the time slots (see collegeapp_timetable) an
+      instructor can teach in; instructors without rows are always available
+    - students.class_year, used to rank students in batch seat allocation
+    - enrollment_requests, the enrollment requests collected for the next
+      batch allocation run (see collegeapp_lottery)
+    - grades, one letter grade per course_students row, removed with the row
+    - summary_counts, summary_major_enrollment and summary_unassigned_courses,
+      the admin dashboard figures, kept current by triggers (see
+      refresh_summary_tables), and an index on courses.enrolled_count
+    - changelog, one row per insert, update or delete on CHANGELOG_TABLES (see
+      changes_since), with the course and student the row belongs to (see
+      CHANGELOG_KEYS), and
+      changelog_state, which remembers how far compact_changelog has trimmed it;
+      changelog is indexed by row and by table (see table_versions); updates of
+      only the CHANGELOG_IGNORED_COLUMNS are not recorded
+
+    Parameters:
+    file (str): The path to the SQLite database file to upgrade.
+
+    Returns:
+    None
+    """
+    if not column_exists(file, "courses", "enrolled_count"):
+        write_to_database(
+            file,
+            "ALTER TABLE courses ADD COLUMN enrolled_count INTEGER NOT NULL DEFAULT 0",
+        )
+        write_to_database(
+            file,
+            """UPDATE courses SET enrolled_count = (
+                SELECT COUNT(*) FROM course_students
+                WHERE course_students.course_id = courses.id
+            )""",
+        )
+
+    if not column_exists(file, "courses", "capacity"):
+        write_to_database(file, "ALTER TABLE courses ADD COLUMN capacity INTEGER")
+
+    if not column_exists(file, "students", "credit_load"):
+        write_to_database(
+            file,
+            "ALTER TABLE students ADD COLUMN credit_load INTEGER NOT NULL DEFAULT 0",
+        )
+        write_to_database(
+            file,
+            """UPDATE students SET credit_load = (
+                SELECT COALESCE(SUM(courses.credits), 0)
+                FROM course_students
+                JOIN courses ON courses.id = course_students.course_id
+                WHERE course_students.student_id = students.id
+            )""",
+        )
+
+    meeting_columns = {
+        "meeting_days": "TEXT",
+        "start_time": "INTEGER",
+        "end_time": "INTEGER",
+    }
+    for column, column_type in meeting_columns.items():
+        if not column_exists(file, "courses", column):
+            write_to_database(
+                file, f"ALTER TABLE courses ADD COLUMN {column} {column_type}"
+            )
+
+    if not column_exists(file, "students", "class_year"):
+        write_to_database(file, "ALTER TABLE students ADD COLUMN class_year INTEGER")
+
+    if not column_exists(file, "courses", "room_id"):
+        write_to_database(
+            file, "ALTER TABLE courses ADD COLUMN room_id INTEGER REFERENCES rooms(id)"
+        )
+
+    create_course_waitlist_table = """CREATE TABLE IF NOT EXISTS course_waitlist (
+                                    course_id INTEGER,
+                                    student_id INTEGER,
+                                    position INTEGER NOT NULL,
+                                    PRIMARY KEY (course_id, student_id),
+                                    FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE,
+                                    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+                                    )"""
+
+    create_course_waitlist_index = """CREATE UNIQUE INDEX IF NOT EXISTS course_waitlist_position
+                                    ON course_waitlist (course_id, position)"""
+
+    create_course_prerequisites_table = """CREATE TABLE IF NOT EXISTS course_prerequisites (
+                                        course_id INTEGER,
+                                        prerequisite_id INTEGER,
+                                        PRIMARY KEY (course_id, prerequisite_id),
+                                        FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE,
+                                        FOREIGN KEY (prerequisite_id) REFERENCES courses(id) ON DELETE CASCADE
+                                        )"""
+
+    create_rooms_table = """CREATE TABLE IF NOT EXISTS rooms (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            name TEXT NOT NULL,
+                            capacity INTEGER NOT NULL
+                            )"""
+
+    rooms_dummy_data = """INSERT INTO rooms (name, capacity)
+                        SELECT * FROM (VALUES
+                            ('Science Hall 101', 120),
+                            ('Science Hall 204', 40),
+                            ('Liberal Arts 110', 60),
+                            ('Liberal Arts 215', 30),
+                            ('Library Seminar Room', 20)
+                        )
+                        WHERE NOT EXISTS (SELECT 1 FROM rooms)"""
+
+    create_instructor_availability_table = """CREATE TABLE IF NOT EXISTS instructor_availability (
+                                            instructor_id INTEGER,
+                                            slot INTEGER,
+                                            PRIMARY KEY (instructor_id, slot),
+                                            FOREIGN KEY (instructor_id) REFERENCES instructors(id) ON DELETE CASCADE
+                                            )"""
+
+    create_enrollment_requests_table = """CREATE TABLE IF NOT EXISTS enrollment_requests (
+                                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                        student_id INTEGER NOT NULL,
+                                        course_id INTEGER NOT NULL,
+                                        preference INTEGER NOT NULL DEFAULT 1,
+                                        submitted_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                                        UNIQUE (student_id, course_id),
+                                        FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+                                        FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE
+                                        )"""
+
+    create_grades_table = """CREATE TABLE IF NOT EXISTS grades (
+                            course_id INTEGER,
+                            student_id INTEGER,
+                            grade TEXT NOT NULL,
+                            grade_points REAL NOT NULL,
+                            PRIMARY KEY (course_id, student_id),
+                            FOREIGN KEY (course_id, student_id)
+                                REFERENCES course_students(course_id, student_id) ON DELETE CASCADE
+                            )"""
+
+    bulk_create_tables = [
+        create_course_waitlist_table,
+        create_course_waitlist_index,
+        create_course_prerequisites_table,
+        create_rooms_table,
+        rooms_dummy_data,
+        create_instructor_availability_table,
+        create_enrollment_requests_table,
+        create_grades_table,
+    ]
+
+    for table in bulk_create_tables:
+        write_to_database(file, table)
+
+    enrolled_count_insert_trigger = """CREATE TRIGGER IF NOT EXISTS course_students_count_insert
+                                    AFTER INSERT ON course_students
+                                    BEGIN
+                                        UPDATE courses SET enrolled_count = enrolled_count + 1
+                                        WHERE id = NEW.course_id;
+                                    END"""
+
+    enrolled_count_delete_trigger = """CREATE TRIGGER IF NOT EXISTS course_students_count_delete
+                                    AFTER DELETE ON course_students
+                                    BEGIN
+                                        UPDATE courses SET enrolled_count = enrolled_count - 1
+                                        WHERE id = OLD.course_id;
+                                    END"""
+
+    enrolled_count_update_trigger = """CREATE TRIGGER IF NOT EXISTS course_students_count_update
+                                    AFTER UPDATE OF course_id ON course_students
+                                    BEGIN
+                                        UPDATE courses SET enrolled_count = enrolled_count - 1
+                                        WHERE id = OLD.course_id;
+                                        UPDATE courses SET enrolled_count = enrolled_count + 1
+                                        WHERE id = NEW.course_id;
+                                    END"""
+
+    credit_load_insert_trigger = """CREATE TRIGGER IF NOT EXISTS course_students_credit_insert
+                                AFTER INSERT ON course_students
+                                BEGIN
+                                    UPDATE students SET credit_load = credit_load + COALESCE(
+                                        (SELECT credits FROM courses WHERE id = NEW.course_id), 0)
+                                    WHERE id = NEW.student_id;
+                                END"""
+
+    credit_load_delete_trigger = """CREATE TRIGGER IF NOT EXISTS course_students_credit_delete
+                                AFTER DELETE ON course_students
+                                BEGIN
+                                    UPDATE students SET credit_load = credit_load - COALESCE(
+                                        (SELECT credits FROM courses WHERE id = OLD.course_id), 0)
+                                    WHERE id = OLD.student_id;
+                                END"""
+
+    credit_load_update_trigger = """CREATE TRIGGER IF NOT EXISTS course_students_credit_update
+                                AFTER UPDATE ON course_students
+                                BEGIN
+                                    UPDATE students SET credit_load = credit_load - COALESCE(
+                                        (SELECT credits FROM courses WHERE id = OLD.course_id), 0)
+                                    WHERE id = OLD.student_id;
+                                    UPDATE students SET credit_load = credit_load + COALESCE(
+                                        (SELECT credits FROM courses WHERE id = NEW.course_id), 0)
+                                    WHERE id = NEW.student_id;
+                                END"""
+
+    course_credits_update_trigger = """CREATE TRIGGER IF NOT EXISTS courses_credit_update
+                                    AFTER UPDATE OF credits ON courses
+                                    BEGIN
+                                        UPDATE students
+                                        SET credit_load = credit_load
+                                            + COALESCE(NEW.credits, 0) - COALESCE(OLD.credits, 0)
+                                        WHERE id IN (
+                                            SELECT student_id FROM course_students
+                                            WHERE course_id = NEW.id
+                                        );
+                                    END"""
+
+    grades_delete_trigger = """CREATE TRIGGER IF NOT EXISTS course_students_grade_delete
+                            AFTER DELETE ON course_students
+                            BEGIN
+                                DELETE FROM grades
+                                WHERE course_id = OLD.course_id AND student_id = OLD.student_id;
+                            END"""
+
+    create_summary_counts_table = """CREATE TABLE IF NOT EXISTS summary_counts (
+                                    name TEXT PRIMARY KEY,
+                                    value INTEGER NOT NULL
+                                    )"""
+
+    create_summary_major_table = """CREATE TABLE IF NOT EXISTS summary_major_enrollment (
+                                    major TEXT PRIMARY KEY,
+                                    students INTEGER NOT NULL
+                                    )"""
+
+    create_summary_unassigned_table = """CREATE TABLE IF NOT EXISTS summary_unassigned_courses (
+                                        course_id INTEGER PRIMARY KEY
+                                        )"""
+
+    create_enrolled_count_index = """CREATE INDEX IF NOT EXISTS courses_enrolled_count
+                                    ON courses (enrolled_count)"""
+
+    for table in [
+        create_summary_counts_table,
+        create_summary_major_table,
+        create_summary_unassigned_table,
+        create_enrolled_count_index,
+    ]:
+        write_to_database(file, table)
+
+    summary_count_triggers = []
+    for name, table in [
+        ("students", "students"),
+        ("courses", "courses"),
+        ("instructors", "instructors"),
+        ("enrollments", "course_students"),
+    ]:
+        summary_count_triggers.append(
+            f"""CREATE TRIGGER IF NOT EXISTS summary_{name}_insert
+            AFTER INSERT ON {table}
+            BEGIN
+                UPDATE summary_counts SET value = value + 1 WHERE name = '{name}';
+            END"""
+        )
+        summary_count_triggers.append(
+            f"""CREATE TRIGGER IF NOT EXISTS summary_{name}_delete
+            AFTER DELETE ON {table}
+            BEGIN
+                UPDATE summary_counts SET value = value - 1 WHERE name = '{name}';
+            END"""
+        )
+
+    summary_major_insert_trigger = """CREATE TRIGGER IF NOT EXISTS summary_major_insert
+                                    AFTER INSERT ON students
+                                    BEGIN
+                                        INSERT INTO summary_major_enrollment (major, students)
+                                        VALUES (COALESCE(NEW.major, 'Undeclared'), 1)
+                                        ON CONFLICT (major) DO UPDATE SET students = students + 1;
+                                    END"""
+
+    summary_major_delete_trigger = """CREATE TRIGGER IF NOT EXISTS summary_major_delete
+                                    AFTER DELETE ON students
+                                    BEGIN
+                                        UPDATE summary_major_enrollment SET students = students - 1
+                                        WHERE major = COALESCE(OLD.major, 'Undeclared');
+                                    END"""
+
+    summary_major_update_trigger = """CREATE TRIGGER IF NOT EXISTS summary_major_update
+                                    AFTER UPDATE OF major ON students
+                                    BEGIN
+                                        UPDATE summary_major_enrollment SET students = students - 1
+                                        WHERE major = COALESCE(OLD.major, 'Undeclared');
+                                        INSERT INTO summary_major_enrollment (major, students)
+                                        VALUES (COALESCE(NEW.major, 'Undeclared'), 1)
+                                        ON CONFLICT (major) DO UPDATE SET students = students + 1;
+                                    END"""
+
+    summary_unassigned_course_insert_trigger = """CREATE TRIGGER IF NOT EXISTS summary_unassigned_course_insert
+                                                AFTER INSERT ON courses
+                                                BEGIN
+                                                    INSERT OR IGNORE INTO summary_unassigned_courses (course_id)
+                                                    VALUES (NEW.id);
+                                                END"""
+
+    summary_unassigned_course_delete_trigger = """CREATE TRIGGER IF NOT EXISTS summary_unassigned_course_delete
+                                                AFTER DELETE ON courses
+                                                BEGIN
+                                                    DELETE FROM summary_unassigned_courses
+                                                    WHERE course_id = OLD.id;
+                                                END"""
+
+    summary_unassigned_assign_trigger = """CREATE TRIGGER IF NOT EXISTS summary_unassigned_assign
+                                        AFTER INSERT ON course_instructors
+                                        BEGIN
+                                            DELETE FROM summary_unassigned_courses
+                                            WHERE course_id = NEW.course_id;
+                                        END"""
+
+    summary_unassigned_unassign_trigger = """CREATE TRIGGER IF NOT EXISTS summary_unassigned_unassign
+                                        AFTER DELETE ON course_instructors
+                                        WHEN NOT EXISTS (
+                                            SELECT 1 FROM course_instructors WHERE course_id = OLD.course_id
+                                        ) AND EXISTS (
+                                            SELECT 1 FROM courses WHERE id = OLD.course_id
+                                        )
+                                        BEGIN
+                                            INSERT OR IGNORE INTO summary_unassigned_courses (course_id)
+                                            VALUES (OLD.course_id);
+                                        END"""
+
+    bulk_triggers = summary_count_triggers + [
+        summary_major_insert_trigger,
+        summary_major_delete_trigger,
+        summary_major_update_trigger,
+        summary_unassigned_course_insert_trigger,
+        summary_unassigned_course_delete_trigger,
+        summary_unassigned_assign_trigger,
+        summary_unassigned_unassign_trigger,
+        enrolled_count_insert_trigger,
+        enrolled_count_delete_trigger,
+        enrolled_count_update_trigger,
+        credit_load_insert_trigger,
+        credit_load_delete_trigger,
+        credit_load_update_trigger,
+        course_credits_update_trigger,
+        grades_delete_trigger,
+    ]
+
+    for trigger in bulk_triggers:
+        write_to_database(file, trigger)
+
+    create_changelog_table = """CREATE TABLE IF NOT EXISTS changelog (
+                                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                                table_name TEXT NOT NULL,
+                                op TEXT NOT NULL,
+                                row_id INTEGER NOT NULL,
+                                course_id INTEGER,
+                                student_id INTEGER
+                                )"""
+
+    create_changelog_row_index = """CREATE INDEX IF NOT EXISTS changelog_row
+                                    ON changelog (table_name, row_id, seq)"""
+
+    create_changelog_table_index = """CREATE INDEX IF NOT EXISTS changelog_table
+                                    ON changelog (table_name, seq)"""
+
+    create_changelog_state_table = """CREATE TABLE IF NOT EXISTS changelog_state (
+                                    name TEXT PRIMARY KEY,
+                                    value INTEGER NOT NULL
+                                    )"""
+
+    for table in [
+        create_changelog_table,
+        create_changelog_row_index,
+        create_changelog_table_index,
+        create_changelog_state_table,
+    ]:
+        write_to_database(file, table)
+
+    for column in ("course_id", "student_id"):
+        if not column_exists(file, "changelog", column):
+            write_to_database(file, f"ALTER TABLE changelog ADD COLUMN {column} INTEGER")
+
+    for table in CHANGELOG_TABLES:
+        update = "UPDATE"
+        if table in CHANGELOG_IGNORED_COLUMNS:
+            columns = [
+                info[1]
+                for info in read_from_database(file, f"PRAGMA table_info({table})")
+                if info[1] not in CHANGELOG_IGNORED_COLUMNS[table]
+            ]
+            update = "UPDATE OF " + ", ".join(columns)
+        keys = CHANGELOG_KEYS.get(table, (None, None))
+        for event, op, row in [
+            ("INSERT", "I", "NEW"),
+            (update, "U", "NEW"),
+            ("DELETE", "D", "OLD"),
+        ]:
+            course_id, student_id = [
+                f"{row}.{key}" if key is not None else "NULL" for key in keys
+            ]
+            name = f"changelog_{table}_{event.split()[0].lower()}"
+            trigger = f"""CREATE TRIGGER {name}
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO changelog (table_name, op, row_id, course_id, student_id)
+                    VALUES ('{table}', '{op}', {row}.rowid, {course_id}, {student_id});
+                END"""
+            # Recreated when its columns change, e.g. after an ALTER TABLE above
+            existing = read_from_database(
+                file,
+                "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                "one",
+                (name,),
+            )
+            if existing is None or existing[0] != trigger:
+                with transaction(file) as c:
+                    c.execute(f"DROP TRIGGER IF EXISTS {name}")
+                    c.execute(trigger)
+
+    if not read_from_database(file, "SELECT 1 FROM summary_counts", "one"):
+        refresh_summary_tables(file)
+
+
+def refresh_summary_tables(file):
+    """
+    Rebuilds the admin dashboard summary tables from the live tables.
+
+    The summary tables are normally kept current by the triggers created in
+    upgrade_database, so this full rebuild is only needed to fill them the first
+    time or to repair them, e.g. from a scheduled job. It runs in one transaction
+    so the dashboard never sees half-rebuilt figures.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+
+    Returns:
+    None
+    """
+    with transaction(file) as c:
+        c.execute("DELETE FROM summary_counts")
+        c.execute(
+            """INSERT INTO summary_counts (name, value)
+            SELECT 'students', COUNT(*) FROM students
+            UNION ALL SELECT 'courses', COUNT(*) FROM courses
+            UNION ALL SELECT 'instructors', COUNT(*) FROM instructors
+            UNION ALL SELECT 'enrollments', COUNT(*) FROM course_students"""
+        )
+        c.execute("DELETE FROM summary_major_enrollment")
+        c.execute(
+            """INSERT INTO summary_major_enrollment (major, students)
+            SELECT COALESCE(major, 'Undeclared'), COUNT(*)
+            FROM students
+            GROUP BY COALESCE(major, 'Undeclared')"""
+        )
+        c.execute("DELETE FROM summary_unassigned_courses")
+        c.execute(
+            """INSERT INTO summary_unassigned_courses (course_id)
+            SELECT id FROM courses
+            WHERE NOT EXISTS (
+                SELECT 1 FROM course_instructors WHERE course_id = courses.id
+            )"""
+        )
+
+
+def changes_since(file, seq, limit=1000):
+    """
+    Reads the changes recorded in changelog after a sequence number.
+
+    Each change only names the row that changed, and the course and student it
+    belongs to (see CHANGELOG_KEYS), so a consumer re-reads the rows it cares
+    about: an "I" or "U" row that no longer exists has been deleted since. A consumer keeps the seq of the last change it handled and passes it
+    back in on its next call. If that seq is older than changelog_horizon, the
+    log has been trimmed past it and the consumer has to rebuild from the tables.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    seq (int): The sequence number of the last change already handled, 0 for all.
+    limit (int): The most changes to return.
+
+    Returns:
+    list: (seq, table_name, op, row_id, course_id, student_id) tuples in
+    sequence order, where op is "I", "U" or "D" and course_id and student_id
+    are None for tables without them.
+    """
+    return read_from_database(
+        file,
+        """SELECT seq, table_name, op, row_id, course_id, student_id FROM changelog
+        WHERE seq > ?
+        ORDER BY seq
+        LIMIT ?""",
+        "all",
+        (seq, limit),
+    )
+
+
+def changelog_horizon(file):
+    """
+    Returns the highest sequence number removed from changelog by retention.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+
+    Returns:
+    int: The horizon; changes_since is only complete for seq values at or above it.
+    """
+    row = read_from_database(
+        file, "SELECT value FROM changelog_state WHERE name = 'horizon'", "one"
+    )
+    return row[0] if row else 0
+
+
+def changelog_version(file):
+    """
+    Returns the current data version, the seq of the latest recorded change.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+
+    Returns:
+    int: The version; it only ever grows.
+    """
+    row = read_from_database(
+        file,
+        """SELECT MAX(
+            COALESCE((SELECT MAX(seq) FROM changelog), 0),
+            COALESCE((SELECT value FROM changelog_state WHERE name = 'horizon'), 0)
+        )""",
+        "one",
+    )
+    return row[0] if row else 0
+
+
+def table_versions(file, tables=CHANGELOG_TABLES):
+    """
+    Returns the version of each table, the seq of the latest change to it.
+
+    Every table's version is looked up through the changelog_table index, so
+    this stays cheap however long the changelog is. Tables whose changes have
+    all been trimmed report the horizon instead.
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    tables (iterable): The names of the tables, from CHANGELOG_TABLES.
+
+    Returns:
+    dict: A mapping of table name to version.
+    """
+    tables = [table for table in tables if table in CHANGELOG_TABLES]
+    horizon = changelog_horizon(file)
+    if not tables:
+        return {}
+    command = "SELECT " + ", ".join(
+        f"(SELECT MAX(seq) FROM changelog WHERE table_name = '{table}')"
+        for table in tables
+    )
+    row = read_from_database(file, command, "one") or [None] * len(tables)
+    return {
+        table: max(version or 0, horizon) for table, version in zip(tables, row)
+    }
+
+
+def compact_changelog(file, retain=100000):
+    """
+    Shrinks changelog without losing anything a consumer needs.
+
+    First, every change that is followed by a later change to the same row is
+    dropped, since a consumer reading past it will see the later one anyway.
+    Then, if more than 'retain' changes are left, the oldest are deleted and the
+    horizon is moved up to the last deleted seq so that consumers further behind
+    know to rebuild. Meant to be run periodically (see main.py).
+
+    Parameters:
+    file (str): The path to the SQLite database file.
+    retain (int): The most changes to keep.
+
+    Returns:
+    int: The number of changes deleted.
+    """
+    with transaction(file) as c:
+        c.execute(
+            """DELETE FROM changelog
+            WHERE EXISTS (
+                SELECT 1 FROM changelog AS later
+                WHERE later.table_name = changelog.table_name
+                    AND later.row_id = changelog.row_id
+                    AND later.seq > changelog.seq
+            )"""
+        )
+        deleted = c.rowcount
+
+        c.execute(
+            "SELECT seq FROM changelog ORDER BY seq DESC LIMIT 1 OFFSET ?", (retain,)
+        )
+        row = c.fetchone()
+        if row:
+            c.execute("DELETE FROM changelog WHERE seq <= ?", (row[0],))
+            deleted += c.rowcount
+            c.execute(
+                """INSERT INTO changelog_state (name, value) VALUES ('horizon', ?)
+                ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)""",
+                (row[0],),
+            )
+    return deleted
+
 
 def main():
     """
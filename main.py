@@ -10,29 +10,85 @@ This program converts temperature from Celsius to Fahrenheit and vice versa
     Date: 048/23/2024
 """
 
+import argparse
+import contextvars
+import importlib.metadata
+import shutil
+import tempfile
+import time
+
+import bottle
 import eel
+import gevent
+import collegeapp
+import collegeapp_api
 import collegeapp_controller
+import collegeapp_metrics
+import collegeapp_profiling
+import collegeapp_push
+import collegeapp_server
+import collegeapp_tracing
+import database_functions
 
+database_functions.upgrade_database("college_data.db")
+collegeapp_metrics.install()
 eel.init("web")
 
 
-@eel.expose
+def expose(function):
+    # Every exposed function records its timing, payload size and errors, and
+    # opens the root span of a trace
+    traced = collegeapp_tracing.traced(f"eel.{function.__name__}")(function)
+    wrapper = collegeapp_profiling.profiled(traced)
+    eel.expose(wrapper)
+    return wrapper
+
+
+# The read-only exposed functions that may be combined in one batch call
+BATCH_FUNCTIONS = {}
+
+
+def batchable(function):
+    # Applied above @expose, so batched calls are profiled and traced too
+    BATCH_FUNCTIONS[function.__name__] = function
+    return function
+
+
+@batchable
+@expose
 def get_data():
     x = collegeapp_controller.grab("students")
     return x
 
 
-@eel.expose
+@batchable
+@expose
 def send_data(role):
     print(role)
 
 
-@eel.expose
-def get_student_data():
-    return collegeapp_controller.grab("students")
+@batchable
+@expose
+def get_student_data(since_version=None):
+    return collegeapp_controller.grab_delta(
+        "students", since_version, ("major",), collegeapp_controller.STUDENT_COLUMNS
+    )
+
+
+@batchable
+@expose
+def get_versions():
+    return collegeapp_controller.get_versions()
 
 
-@eel.expose
+@batchable
+@expose
+def get_reference_data(table, since_version=None):
+    return collegeapp_controller.get_reference_data(table, since_version)
+
+
+@batchable
+@expose
 def get_student_classes(student_data):
     print(student_data)
     student = {
@@ -45,4 +101,290 @@ def get_student_classes(student_data):
     return collegeapp_controller.process_student_schedule(student)
 
 
-eel.start("index.html")
+@expose
+def register_student_class(student_data, course_id):
+    student = {
+        "id": student_data[0],
+        "name": student_data[1],
+        "email": student_data[2],
+        "major": student_data[3],
+    }
+
+    return collegeapp_controller.enroll_student(student, course_id)
+
+
+@expose
+def request_student_class(student_data, course_id, preference=1):
+    student = {
+        "id": student_data[0],
+        "name": student_data[1],
+        "email": student_data[2],
+        "major": student_data[3],
+    }
+
+    return collegeapp_controller.request_enrollment(student, course_id, preference)
+
+
+@expose
+def run_enrollment_allocation(seed=0, mode="priority"):
+    # mode is "priority" or "lottery", see collegeapp_lottery
+    return collegeapp_controller.allocate_requests(seed, mode)
+
+
+@batchable
+@expose
+def check_student_cart(student_data, course_ids):
+    student = {
+        "id": student_data[0],
+        "name": student_data[1],
+        "email": student_data[2],
+        "major": student_data[3],
+    }
+
+    return collegeapp_controller.check_student_cart(student, course_ids)
+
+
+@batchable
+@expose
+def get_student_eligible_courses(student_data):
+    student = {
+        "id": student_data[0],
+        "name": student_data[1],
+        "email": student_data[2],
+        "major": student_data[3],
+    }
+
+    return collegeapp_controller.get_eligible_courses(student)
+
+
+@batchable
+@expose
+def get_student_transcript(student_data):
+    return collegeapp_controller.get_transcript(student_data[0])
+
+
+@batchable
+@expose
+def get_student_credit_loads(student_ids):
+    return collegeapp_controller.get_credit_loads(student_ids)
+
+
+@batchable
+@expose
+def get_instructor_data():
+    return collegeapp_controller.grab_columnar("instructors")
+
+
+@batchable
+@expose
+def get_instructor_courses(instructor_id):
+    return collegeapp_controller.get_instructor_courses(instructor_id)
+
+
+@batchable
+@expose
+def get_course_roster(course_id, after_id=None, limit=50):
+    return collegeapp_controller.get_course_roster(course_id, after_id, limit)
+
+
+@batchable
+@expose
+def get_admin_analytics():
+    return collegeapp_controller.get_department_analytics()
+
+
+@batchable
+@expose
+def get_admin_dashboard(limit=5):
+    return collegeapp_controller.get_admin_dashboard(limit)
+
+
+@expose
+def batch(calls):
+    # Each call is [name, args]; SQLite releases the GIL, so running the calls
+    # on gevent's thread pool lets their queries overlap
+    pool = gevent.get_hub().threadpool
+    pending = []
+    for name, args in calls:
+        function = BATCH_FUNCTIONS.get(name)
+        if function is None:
+            pending.append(None)
+        else:
+            # Run in a copy of this context, so the calls' spans join the batch's trace
+            context = contextvars.copy_context()
+            pending.append(pool.spawn(context.run, function, *args))
+
+    results = []
+    for (name, _), job in zip(calls, pending):
+        if job is None:
+            results.append({"error": f"Unknown batch function: {name}"})
+            continue
+        try:
+            results.append({"value": job.get()})
+        except Exception as e:
+            results.append({"error": repr(e)})
+    return results
+
+
+@expose
+def get_metrics():
+    return collegeapp_profiling.get_metrics()
+
+
+@expose
+def profile_endpoint(name, calls=1):
+    return collegeapp_profiling.profile_next(name, calls)
+
+
+@expose
+def get_traces(trace_id=None):
+    exporter = collegeapp_tracing.get_exporter(collegeapp_tracing.RingBufferExporter)
+    return exporter.get_spans(trace_id) if exporter is not None else []
+
+
+# Seconds between two pushes of coalesced changes to the front end
+PUSH_INTERVAL = 0.5
+
+
+def push_changes_periodically():
+    while True:
+        eel.sleep(PUSH_INTERVAL)
+        collegeapp_controller.flush_push()
+
+
+# Seconds between two compactions of the change log
+CHANGELOG_COMPACTION_INTERVAL = 3600
+
+
+def compact_changelog_periodically():
+    while True:
+        eel.sleep(CHANGELOG_COMPACTION_INTERVAL)
+        database_functions.compact_changelog("college_data.db")
+
+
+def allocate_requests_periodically(interval):
+    while True:
+        eel.sleep(interval)
+        # A new seed for every registration window
+        collegeapp_controller.allocate_requests(seed=int(time.time()))
+
+
+parser = argparse.ArgumentParser(description="College database app")
+parser.add_argument(
+    "--headless",
+    action="store_true",
+    help="serve the JSON API under /api and the Eel UI without opening a browser",
+)
+parser.add_argument("--host", default="localhost")
+parser.add_argument("--port", type=int, default=8000)
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=1,
+    help="serve headless from this many pre-forked worker processes; this switches "
+    "college_data.db to WAL mode for good",
+)
+parser.add_argument(
+    "--trace-rate",
+    type=float,
+    default=0,
+    help="share of calls to trace, from 0 (off) to 1",
+)
+parser.add_argument("--trace-file", help="also append the trace spans to this JSONL file")
+parser.add_argument(
+    "--allocation-interval",
+    type=float,
+    default=0,
+    help="seat the pending enrollment requests every this many seconds; 0 (the "
+    "default) leaves it to run_enrollment_allocation",
+)
+arguments = parser.parse_args()
+
+trace_exporters = [collegeapp_tracing.RingBufferExporter()]
+if arguments.trace_file:
+    trace_exporters.append(collegeapp_tracing.JsonlExporter(arguments.trace_file))
+collegeapp_tracing.configure(arguments.trace_rate, trace_exporters)
+
+
+def start_background_tasks(worker=0):
+    collegeapp_controller.start_push()
+    eel.spawn(push_changes_periodically)
+    # One compaction and one allocation job are enough for the shared database
+    if worker == 0:
+        eel.spawn(compact_changelog_periodically)
+        if arguments.allocation_interval > 0:
+            eel.spawn(allocate_requests_periodically, arguments.allocation_interval)
+
+
+def add_routes(app):
+    # The routes served next to eel's own: /metrics and the /push WebSocket
+    collegeapp_metrics.add_route(app)
+    collegeapp_push.add_route(app)
+    return app
+
+
+# The Eel release whose private _start_args keep_running_when_windows_close writes
+EEL_VERSION = "0.17."
+
+
+def keep_running_when_windows_close():
+    # eel has no public way to set its close callback without eel.start, which
+    # opens a browser and runs eel's own server, so the pre-forked workers cannot
+    # call it. This writes the option eel.start would set into its private
+    # _start_args instead, which is only known to work with EEL_VERSION.
+    version = importlib.metadata.version("eel")
+    if not version.startswith(EEL_VERSION):
+        raise RuntimeError(
+            f"--workers needs Eel {EEL_VERSION}x, found {version}; "
+            "check keep_running_when_windows_close before upgrading eel"
+        )
+    eel._start_args["close_callback"] = lambda page, sockets: None
+
+
+def start_worker(worker, metrics_directory):
+    collegeapp_metrics.set_worker(worker, metrics_directory)
+    eel.spawn(collegeapp_metrics.publish_periodically)
+    start_background_tasks(worker)
+    # Every worker publishes every worker's changes, so caches and push
+    # clients see writes made by the other workers too
+    collegeapp.follow_changelog()
+    eel.spawn(
+        collegeapp_server.watch_data_version,
+        "college_data.db",
+        collegeapp_controller.apply_changes,
+    )
+
+
+if arguments.workers > 1:
+    database_functions.enable_wal("college_data.db")
+    app = add_routes(collegeapp_api.build_app())
+    eel.register_eel_routes(app)
+    keep_running_when_windows_close()
+    # Where the workers share their metrics, so any of them serves all of /metrics
+    metrics_directory = tempfile.mkdtemp(prefix="collegeapp-metrics-")
+    try:
+        collegeapp_server.serve(
+            app,
+            arguments.host,
+            arguments.port,
+            arguments.workers,
+            lambda worker: start_worker(worker, metrics_directory),
+        )
+    finally:
+        shutil.rmtree(metrics_directory, ignore_errors=True)
+elif arguments.headless:
+    start_background_tasks()
+    # Keep serving when browser windows close, instead of exiting like the desktop app
+    eel.start(
+        "index.html",
+        mode=None,
+        host=arguments.host,
+        port=arguments.port,
+        app=add_routes(collegeapp_api.build_app()),
+        close_callback=lambda page, sockets: None,
+    )
+else:
+    start_background_tasks()
+    # eel serves the desktop app with bottle's default app
+    add_routes(bottle.default_app())
+    eel.start("index.html", host=arguments.host, port=arguments.port)
@@ -0,0 +1,125 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from wsgiref.util import setup_testing_defaults
+
+try:
+    import bottle
+    import geventwebsocket
+except ImportError:
+    raise unittest.SkipTest("bottle and gevent-websocket are not installed")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp_api
+import database_functions
+
+
+class JsonApiTest(unittest.TestCase):
+    def setUp(self):
+        # The controller works on college_data.db in the working directory
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        os.chdir(self.directory)
+        database_functions.initial_write("college_data.db")
+        self.app = collegeapp_api.build_app()
+
+    def tearDown(self):
+        database_functions.close_connections()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def call(self, method, path, query="", body=None, headers=()):
+        environ = {}
+        setup_testing_defaults(environ)
+        environ.update(REQUEST_METHOD=method, PATH_INFO=path, QUERY_STRING=query)
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            environ["CONTENT_TYPE"] = "application/json"
+            environ["CONTENT_LENGTH"] = str(len(data))
+            environ["wsgi.input"] = io.BytesIO(data)
+        for name, value in headers:
+            environ["HTTP_" + name.upper().replace("-", "_")] = value
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response["status"] = int(status.split()[0])
+            # Header names are case-insensitive, and bottle title-cases them
+            response["headers"] = {name.lower(): value for name, value in response_headers}
+
+        content = b"".join(self.app(environ, start_response))
+        return response["status"], response["headers"], content
+
+    def test_pages_of_a_table(self):
+        status, headers, content = self.call("GET", "/api/students", "limit=2")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["content-type"], "application/json")
+        page = json.loads(content)
+        self.assertEqual(page["rows"]["data"]["id"], [1, 2])
+        self.assertEqual(page["next"], 2)
+
+    def test_unchanged_responses_are_not_sent_again(self):
+        status, headers, content = self.call("GET", "/api/departments")
+        etag = headers["etag"]
+
+        status, headers, content = self.call(
+            "GET", "/api/departments", headers=[("If-None-Match", etag)]
+        )
+        self.assertEqual(status, 304)
+        self.assertEqual(content, b"")
+
+        database_functions.write_to_database(
+            "college_data.db", "UPDATE departments SET name = 'Computing' WHERE id = 1"
+        )
+        status, headers, content = self.call(
+            "GET", "/api/departments", headers=[("If-None-Match", etag)]
+        )
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers["etag"], etag)
+
+    def test_large_responses_are_compressed(self):
+        plain = self.call("GET", "/api/courses")[2]
+        minimum = collegeapp_api.GZIP_MIN_SIZE
+        collegeapp_api.GZIP_MIN_SIZE = 0
+        try:
+            status, headers, content = self.call(
+                "GET", "/api/courses", headers=[("Accept-Encoding", "gzip, deflate")]
+            )
+            uncompressed = self.call("GET", "/api/courses")[1]
+        finally:
+            collegeapp_api.GZIP_MIN_SIZE = minimum
+
+        self.assertEqual(headers["content-encoding"], "gzip")
+        self.assertEqual(gzip.decompress(content), plain)
+        self.assertNotIn("content-encoding", uncompressed)
+
+    def test_bad_requests(self):
+        status, headers, content = self.call("GET", "/api/grades")
+        self.assertEqual(status, 404)
+        self.assertIn("error", json.loads(content))
+
+        status, headers, content = self.call("GET", "/api/students", "limit=ten")
+        self.assertEqual(status, 400)
+
+        status, headers, content = self.call(
+            "POST", "/api/students/5/enrollments", body={"course_id": "4"}
+        )
+        self.assertEqual(status, 400)
+
+    def test_enrolling(self):
+        status, headers, content = self.call(
+            "POST", "/api/students/5/enrollments", body={"course_id": 4}
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(content), {"result": "enrolled"})
+
+
+if __name__ == "__main__":
+    unittest.main()
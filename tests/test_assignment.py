@@ -0,0 +1,67 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp
+import collegeapp_assignment
+import database_functions
+
+
+class BalanceDepartmentTest(unittest.TestCase):
+    def test_heaviest_load_is_minimized(self):
+        department = {
+            "courses": [(1, 4), (2, 4), (3, 3), (4, 3)],
+            "instructors": [(10, 0, 12), (11, 0, 12)],
+        }
+        result = collegeapp_assignment.balance_department(department)
+
+        self.assertEqual(sorted(result["assignments"]), [1, 2, 3, 4])
+        self.assertEqual(sorted(result["loads"].values()), [7, 7])
+        self.assertEqual(result["unassigned"], [])
+
+    def test_courses_beyond_every_capacity_stay_unassigned(self):
+        department = {"courses": [(1, 4), (2, 4)], "instructors": [(10, 6, 12)]}
+        result = collegeapp_assignment.balance_department(department)
+
+        self.assertEqual(result["assignments"], {1: 10})
+        self.assertEqual(result["unassigned"], [2])
+        self.assertEqual(result["loads"], {10: 10})
+
+
+class BalanceAssignmentsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, "college_data.db")
+        database_functions.initial_write(self.file)
+        self.events = []
+        collegeapp.subscribe_enrollment(self.events.append)
+
+    def tearDown(self):
+        collegeapp.unsubscribe_enrollment(self.events.append)
+        database_functions.close_connections()
+        shutil.rmtree(self.directory)
+
+    def test_only_written_assignments_are_published(self):
+        # Courses 1 and 2 belong to department 1, taught by instructors 1 and 5
+        database_functions.write_to_database(
+            self.file, "DELETE FROM course_instructors WHERE course_id IN (1, 2)"
+        )
+        collegeapp_assignment.balance_assignments(self.file, processes=1)
+        collegeapp_assignment.balance_assignments(self.file, processes=1)
+
+        rows = database_functions.read_from_database(
+            self.file, "SELECT course_id, instructor_id FROM course_instructors WHERE course_id IN (1, 2)"
+        )
+        self.assertEqual(sorted(row[0] for row in rows), [1, 2])
+        self.assertEqual(
+            sorted(event["course_id"] for event in self.events if event["event"] == collegeapp.INSTRUCTOR_ASSIGNED),
+            [1, 2],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
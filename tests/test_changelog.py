@@ -0,0 +1,84 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database_functions
+
+
+class ChangelogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, "college_data.db")
+        database_functions.initial_write(self.file)
+        self.version = database_functions.changelog_version(self.file)
+
+    def tearDown(self):
+        database_functions.close_connections()
+        shutil.rmtree(self.directory)
+
+    def write(self, command, values=()):
+        database_functions.write_to_database(self.file, command, values)
+
+    def rename_department(self, department_id):
+        self.write("UPDATE departments SET name = name || '!' WHERE id = ?", (department_id,))
+
+    def test_inserts_updates_and_deletes_are_logged(self):
+        self.write("INSERT INTO departments (name, description) VALUES ('History', 'Past')")
+        self.rename_department(1)
+        self.write("DELETE FROM departments WHERE name = 'History'")
+
+        changes = database_functions.changes_since(self.file, self.version)
+        self.assertEqual(
+            [change[1:4] for change in changes],
+            [("departments", "I", 5), ("departments", "U", 1), ("departments", "D", 5)],
+        )
+        self.assertEqual(database_functions.changelog_version(self.file), changes[-1][0])
+        self.assertEqual(database_functions.changes_since(self.file, changes[-1][0]), [])
+
+    def test_compaction_keeps_the_latest_change_of_each_row(self):
+        self.rename_department(1)
+        self.rename_department(2)
+        self.rename_department(1)
+        latest = database_functions.changelog_version(self.file)
+
+        database_functions.compact_changelog(self.file)
+
+        changes = database_functions.changes_since(self.file, self.version)
+        self.assertEqual([(change[1], change[3]) for change in changes], [("departments", 2), ("departments", 1)])
+        self.assertEqual(changes[-1][0], latest)
+        self.assertEqual(database_functions.changelog_horizon(self.file), 0)
+
+    def test_retention_moves_the_horizon(self):
+        for department_id in (1, 2, 3):
+            self.rename_department(department_id)
+        latest = database_functions.changelog_version(self.file)
+
+        database_functions.compact_changelog(self.file, retain=1)
+
+        changes = database_functions.changes_since(self.file, 0)
+        self.assertEqual([change[0] for change in changes], [latest])
+        self.assertEqual(database_functions.changelog_horizon(self.file), latest - 1)
+        self.assertEqual(database_functions.changelog_version(self.file), latest)
+
+    def test_table_versions_report_the_horizon_for_trimmed_tables(self):
+        self.rename_department(1)
+        self.write("UPDATE instructors SET name = name WHERE id = 1")
+        versions = database_functions.table_versions(self.file, ["departments", "instructors", "rooms"])
+        self.assertEqual(sorted(versions), ["departments", "instructors"])
+        self.assertLess(versions["departments"], versions["instructors"])
+
+        database_functions.compact_changelog(self.file, retain=0)
+
+        horizon = database_functions.changelog_horizon(self.file)
+        self.assertEqual(
+            database_functions.table_versions(self.file, ["departments", "staff"]),
+            {"departments": horizon, "staff": horizon},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
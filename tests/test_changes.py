@@ -0,0 +1,93 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp
+import collegeapp_analytics
+import collegeapp_roster
+import database_functions
+
+
+class PublishChangesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, "college_data.db")
+        database_functions.initial_write(self.file)
+        self.seq = database_functions.changelog_version(self.file)
+        self.events = []
+        collegeapp.subscribe_enrollment(self.events.append)
+
+    def tearDown(self):
+        collegeapp.unsubscribe_enrollment(self.events.append)
+        for cache in (collegeapp_roster._caches, collegeapp_analytics._analytics):
+            listener = cache.pop(self.file, None)
+            if listener is not None:
+                collegeapp.unsubscribe_enrollment(listener.on_enrollment)
+        database_functions.close_connections()
+        shutil.rmtree(self.directory)
+
+    def write_elsewhere(self, command, values=()):
+        # Stands in for another worker process, which publishes no events here
+        database_functions.write_to_database(self.file, command, values)
+
+    def publish(self):
+        changes = database_functions.changes_since(self.file, self.seq)
+        self.seq = changes[-1][0]
+        collegeapp.publish_changes(changes)
+
+    def events_of(self, *kinds):
+        return [
+            (event["event"], event["course_id"], event["student_id"])
+            for event in self.events
+            if event["event"] in kinds
+        ]
+
+    def test_deleted_rows_keep_their_course_and_student(self):
+        self.write_elsewhere("DELETE FROM course_students WHERE course_id = 2 AND student_id = 3")
+        self.publish()
+
+        self.assertEqual(self.events_of(collegeapp.WITHDRAWN), [(collegeapp.WITHDRAWN, 2, 3)])
+        self.assertIsNotNone(self.events[-1]["seq"])
+
+    def test_changes_of_other_processes_reach_the_caches(self):
+        roster = collegeapp_roster.get_roster_cache(self.file)
+        analytics = collegeapp_analytics.get_analytics(self.file)
+        roster.get_page(1), roster.get_page(3)
+        before = {row["id"]: row for row in analytics.get_summary()["departments"]}
+
+        # Course 1 is in department 1 and has 3 credits
+        self.write_elsewhere("INSERT INTO course_students (course_id, student_id) VALUES (1, 5)")
+        self.publish()
+
+        self.assertNotIn(1, roster.courses)
+        self.assertIn(3, roster.courses)
+        after = {row["id"]: row for row in analytics.get_summary()["departments"]}
+        self.assertEqual(after[1]["credit_hours"], before[1]["credit_hours"] + 3)
+
+    def test_own_changes_read_back_are_not_counted_twice(self):
+        analytics = collegeapp_analytics.get_analytics(self.file)
+        before = {row["id"]: row for row in analytics.get_summary()["departments"]}
+        student = collegeapp.Students(None, None, None, 5)
+        student.file = self.file
+        self.assertEqual(student.enroll(1), collegeapp.ENROLLED)
+        self.publish()
+
+        after = {row["id"]: row for row in analytics.get_summary()["departments"]}
+        self.assertEqual(after[1]["credit_hours"], before[1]["credit_hours"] + 3)
+
+    def test_edits_of_unrelated_tables_publish_nothing(self):
+        self.write_elsewhere("UPDATE courses SET enrolled_count = enrolled_count WHERE id = 1")
+        self.write_elsewhere("INSERT INTO course_prerequisites (course_id, prerequisite_id) VALUES (2, 1)")
+        changes = database_functions.changes_since(self.file, self.seq)
+        collegeapp.publish_changes(changes)
+
+        self.assertEqual([change[1] for change in changes], ["course_prerequisites"])
+        self.assertEqual(self.events, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
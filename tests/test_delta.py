@@ -0,0 +1,62 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp
+import database_functions
+
+
+class StudentDeltaTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, "college_data.db")
+        database_functions.initial_write(self.file)
+        self.views = collegeapp.Views()
+        self.views.file = self.file
+
+    def tearDown(self):
+        database_functions.close_connections()
+        shutil.rmtree(self.directory)
+
+    def delta(self, since_version=None):
+        return self.views.get_table_delta(
+            "students", since_version, "id, name, email, major, class_year", ("major",)
+        )
+
+    def test_first_call_returns_the_whole_table(self):
+        delta = self.delta()
+        self.assertTrue(delta["full"])
+        self.assertEqual(delta["rows"]["columns"], ["id", "name", "email", "major", "class_year"])
+        self.assertEqual(delta["rows"]["data"]["id"], [1, 2, 3, 4, 5])
+
+    def test_enrolling_does_not_mark_the_student_changed(self):
+        version = self.delta()["version"]
+        student = collegeapp.Students(None, None, None, 5)
+        student.file = self.file
+        self.assertEqual(student.enroll(4), collegeapp.ENROLLED)
+
+        self.assertLessEqual(database_functions.table_versions(self.file, ["students"])["students"], version)
+        delta = self.delta(version)
+        self.assertFalse(delta["full"])
+        self.assertEqual(delta["deleted"], [])
+        self.assertEqual(delta["rows"]["data"]["id"], [])
+
+    def test_edits_and_deletes_are_sent(self):
+        version = self.delta()["version"]
+        student = collegeapp.Students(None, None, None, 5)
+        student.file = self.file
+        student.update(name="Eva Grey", id=5)
+        database_functions.write_to_database(self.file, "DELETE FROM students WHERE id = 4")
+
+        delta = self.delta(version)
+        self.assertEqual(delta["rows"]["data"]["id"], [5])
+        self.assertEqual(delta["rows"]["data"]["name"], ["Eva Grey"])
+        self.assertEqual(delta["deleted"], [4])
+
+
+if __name__ == "__main__":
+    unittest.main()
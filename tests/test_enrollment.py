@@ -0,0 +1,124 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp
+import collegeapp_analytics
+import database_functions
+
+
+class EnrollmentCountTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, "college_data.db")
+        database_functions.initial_write(self.file)
+
+    def tearDown(self):
+        database_functions.close_connections()
+        shutil.rmtree(self.directory)
+
+    def enrolled_count(self, course_id):
+        return database_functions.read_from_database(
+            self.file, "SELECT enrolled_count FROM courses WHERE id = ?", "one", (course_id,)
+        )[0]
+
+    def test_removing_a_student_decrements_enrolled_count(self):
+        # Student 1 is enrolled in courses 1 and 2
+        before = self.enrolled_count(1), self.enrolled_count(2)
+        student = collegeapp.Students(None, None, None, 1)
+        student.file = self.file
+        student.remove()
+
+        self.assertEqual((self.enrolled_count(1), self.enrolled_count(2)), (before[0] - 1, before[1] - 1))
+        self.assertIsNone(
+            database_functions.read_from_database(
+                self.file, "SELECT 1 FROM course_students WHERE student_id = 1", "one"
+            )
+        )
+
+    def test_removing_a_course_removes_its_requests_and_credits(self):
+        read = database_functions.read_from_database
+        student = collegeapp.Students(None, None, None, 4)
+        student.file = self.file
+        student.request_enrollment(2)
+        credit_load = read(self.file, "SELECT credit_load FROM students WHERE id = 1", "one")[0]
+
+        # Course 2 has 4 credits and student 1 is enrolled in it
+        course = collegeapp.Courses(None, None, None, None, 2)
+        course.file = self.file
+        course.remove()
+
+        self.assertIsNone(read(self.file, "SELECT 1 FROM enrollment_requests WHERE course_id = 2", "one"))
+        self.assertEqual(
+            read(self.file, "SELECT credit_load FROM students WHERE id = 1", "one")[0], credit_load - 4
+        )
+
+    def waitlisted(self, course_id, student_id):
+        return database_functions.read_from_database(
+            self.file,
+            "SELECT 1 FROM course_waitlist WHERE course_id = ? AND student_id = ?",
+            "one",
+            (course_id, student_id),
+        ) is not None
+
+    def test_raising_capacity_promotes_the_waitlist(self):
+        # Course 1 has students 1 and 2
+        course = collegeapp.Courses(None, None, None, None, 1)
+        course.file = self.file
+        course.update_course(id=1, capacity=2)
+        student = collegeapp.Students(None, None, None, 4)
+        student.file = self.file
+        self.assertEqual(student.enroll(1), collegeapp.WAITLISTED)
+
+        course.update_course(id=1, capacity=3)
+
+        self.assertEqual(self.enrolled_count(1), 3)
+        self.assertFalse(self.waitlisted(1, 4))
+
+    def test_enrolling_leaves_the_waitlist(self):
+        course = collegeapp.Courses(None, None, None, None, 1)
+        course.file = self.file
+        course.update_course(id=1, capacity=2)
+        student = collegeapp.Students(None, None, None, 4)
+        student.file = self.file
+        student.enroll(1)
+        database_functions.write_to_database(self.file, "UPDATE courses SET capacity = 3 WHERE id = 1")
+
+        self.assertEqual(student.enroll(1), collegeapp.ENROLLED)
+        self.assertFalse(self.waitlisted(1, 4))
+
+    def test_editing_a_course_refreshes_the_analytics(self):
+        analytics = collegeapp_analytics.get_analytics(self.file)
+        before = {row["id"]: row for row in analytics.get_summary()["departments"]}
+        department_id = database_functions.read_from_database(
+            self.file, "SELECT department_id FROM courses WHERE id = 1", "one"
+        )[0]
+        # Course 1 has 3 credits and 2 students
+        course = collegeapp.Courses(None, None, None, None, 1)
+        course.file = self.file
+        course.update_course(id=1, credits=5)
+
+        after = {row["id"]: row for row in analytics.get_summary()["departments"]}
+        self.assertEqual(
+            after[department_id]["credit_hours"], before[department_id]["credit_hours"] + 4
+        )
+
+    def test_enrolling_twice_reports_already_enrolled(self):
+        # Student 1 is enrolled in course 1 but has never taken course 5
+        course = collegeapp.Courses(None, None, None, None, 1)
+        course.file = self.file
+        course.add_prerequisite(5)
+        student = collegeapp.Students(None, None, None, 1)
+        student.file = self.file
+
+        self.assertEqual(student.enroll(1), collegeapp.ALREADY_ENROLLED)
+        self.assertEqual(self.enrolled_count(1), 2)
+
+
+
+if __name__ == "__main__":
+    unittest.main()
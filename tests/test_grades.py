@@ -0,0 +1,87 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp_grades
+import database_functions
+
+
+class GradesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, "college_data.db")
+        database_functions.initial_write(self.file)
+        # Student 1 takes courses 1 (3 credits) and 2 (4 credits), student 2 course 1
+        collegeapp_grades.record_grade(self.file, 1, 1, "A")
+        collegeapp_grades.record_grade(self.file, 2, 1, "B")
+        collegeapp_grades.record_grade(self.file, 1, 2, "F")
+
+    def tearDown(self):
+        database_functions.close_connections()
+        shutil.rmtree(self.directory)
+
+    def test_gpas_are_weighted_by_credits(self):
+        gpas = collegeapp_grades.compute_gpas(self.file)
+
+        self.assertEqual(sorted(gpas), [1, 2])
+        self.assertAlmostEqual(gpas[1][0], (3 * 4.0 + 4 * 3.0) / 7)
+        self.assertEqual(gpas[1][1], 7)
+        self.assertEqual(gpas[2], (0.0, 3))
+
+    def test_gpas_without_numpy_match(self):
+        with_numpy = collegeapp_grades.compute_gpas(self.file)
+        numpy = collegeapp_grades.numpy
+        collegeapp_grades.numpy = None
+        try:
+            without_numpy = collegeapp_grades.compute_gpas(self.file)
+        finally:
+            collegeapp_grades.numpy = numpy
+
+        self.assertEqual(sorted(with_numpy), sorted(without_numpy))
+        for student_id, (gpa, credits) in with_numpy.items():
+            self.assertAlmostEqual(without_numpy[student_id][0], gpa)
+            self.assertEqual(without_numpy[student_id][1], credits)
+
+    def test_regrading_replaces_the_grade(self):
+        collegeapp_grades.record_grade(self.file, 1, 2, "C")
+
+        self.assertEqual(collegeapp_grades.compute_gpas(self.file)[2], (2.0, 3))
+
+    def test_only_enrolled_students_are_graded(self):
+        # Student 1 is not enrolled in course 3
+        collegeapp_grades.record_grade(self.file, 3, 1, "A")
+
+        self.assertIsNone(
+            database_functions.read_from_database(
+                self.file, "SELECT 1 FROM grades WHERE course_id = 3", "one"
+            )
+        )
+        with self.assertRaises(ValueError):
+            collegeapp_grades.record_grade(self.file, 1, 1, "E")
+
+    def test_honours_and_probation(self):
+        self.assertEqual(
+            collegeapp_grades.deans_list(self.file, minimum_gpa=3.4, minimum_credits=7),
+            [(1, collegeapp_grades.compute_gpas(self.file)[1][0])],
+        )
+        self.assertEqual(collegeapp_grades.deans_list(self.file), [])
+        self.assertEqual(collegeapp_grades.probation(self.file), [(2, 0.0)])
+
+    def test_transcript_lists_ungraded_courses(self):
+        # Student 3 takes course 2 without a grade yet
+        ungraded = collegeapp_grades.transcript(self.file, 3)
+        self.assertIsNone(ungraded["courses"][0][3])
+        self.assertIsNone(ungraded["gpa"])
+
+        transcript = collegeapp_grades.transcript(self.file, 1)
+        self.assertEqual([course[3] for course in transcript["courses"]], ["A", "B"])
+        self.assertAlmostEqual(transcript["gpa"], (3 * 4.0 + 4 * 3.0) / 7)
+        self.assertEqual(transcript["credits"], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
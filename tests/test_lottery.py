@@ -0,0 +1,101 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp
+import collegeapp_grades
+import collegeapp_lottery
+import collegeapp_schedule
+import database_functions
+
+
+def make_student(major="Physics", class_year=2, credits_earned=0, credit_load=0):
+    return {
+        "major": major,
+        "class_year": class_year,
+        "credits_earned": credits_earned,
+        "credit_load": credit_load,
+        "week": collegeapp_schedule.WeekIndex(),
+        "taken": set(),
+    }
+
+
+def make_course(credits=3, free_seats=1, department="Mathematics"):
+    return {
+        "department": department,
+        "credits": credits,
+        "free_seats": free_seats,
+        "meeting": (None, None, None),
+        "prerequisites": set(),
+    }
+
+
+class AllocateTest(unittest.TestCase):
+    def test_seats_won_in_earlier_rounds_do_not_raise_priority(self):
+        students = {1: make_student(credits_earned=0), 2: make_student(credits_earned=3)}
+        courses = {10: make_course(credits=4, free_seats=None), 20: make_course()}
+        # Student 1 wins a first choice; both then want the last seat of course 20
+        requests = [(1, 10, 1), (1, 20, 2), (2, 20, 2)]
+
+        result = collegeapp_lottery.allocate(requests, students, courses)
+
+        self.assertEqual(result["enrolled"], [(1, 10), (2, 20)])
+        self.assertEqual(result["rejected"], [(1, 20, collegeapp.COURSE_FULL)])
+
+    def test_same_seed_gives_same_lottery(self):
+        def run(seed):
+            students = {student_id: make_student() for student_id in range(1, 9)}
+            courses = {1: make_course(free_seats=3)}
+            requests = [(student_id, 1, 1) for student_id in students]
+            return collegeapp_lottery.allocate(requests, students, courses, seed, collegeapp_lottery.LOTTERY)
+
+        self.assertEqual(run(7), run(7))
+        self.assertEqual(len(run(7)["enrolled"]), 3)
+
+    def test_credit_limit_and_prerequisites_are_enforced(self):
+        students = {1: make_student(credit_load=collegeapp.MAX_CREDIT_LOAD - 2), 2: make_student()}
+        courses = {1: make_course(free_seats=None), 2: make_course(free_seats=None)}
+        courses[2]["prerequisites"] = {1}
+
+        result = collegeapp_lottery.allocate([(1, 1, 1), (2, 2, 1)], students, courses)
+
+        self.assertEqual(
+            result["rejected"],
+            [(1, 1, collegeapp.CREDIT_LIMIT), (2, 2, collegeapp.MISSING_PREREQUISITES)],
+        )
+
+
+class RunAllocationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, "college_data.db")
+        database_functions.initial_write(self.file)
+
+    def tearDown(self):
+        database_functions.close_connections()
+        shutil.rmtree(self.directory)
+
+    def test_earned_credits_decide_the_last_seat(self):
+        read = database_functions.read_from_database
+        database_functions.write_to_database(self.file, "UPDATE courses SET capacity = 1 WHERE id = 5")
+        # Student 2 passed course 1 (3 credits); student 5 has earned nothing
+        collegeapp_grades.record_grade(self.file, 1, 2, "B")
+        for student_id in (5, 2):
+            student = collegeapp.Students(None, None, None, student_id)
+            student.file = self.file
+            student.request_enrollment(5)
+
+        result = collegeapp_lottery.run_allocation(self.file)
+
+        self.assertEqual(result["enrolled"], [(2, 5)])
+        self.assertEqual(result["rejected"], [(5, 5, collegeapp.COURSE_FULL)])
+        self.assertEqual(read(self.file, "SELECT student_id FROM course_students WHERE course_id = 5"), [(2,)])
+        self.assertEqual(read(self.file, "SELECT COUNT(*) FROM enrollment_requests", "one")[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
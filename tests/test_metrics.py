@@ -0,0 +1,68 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    import bottle
+    import gevent
+    import geventwebsocket
+except ImportError:
+    raise unittest.SkipTest("bottle, gevent and gevent-websocket are not installed")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp_metrics
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        collegeapp_metrics._statements.clear()
+
+    def tearDown(self):
+        collegeapp_metrics._statements.clear()
+        collegeapp_metrics.set_worker(None)
+        shutil.rmtree(self.directory)
+
+    def test_statements_are_classed_by_verb_and_table(self):
+        statement_class = collegeapp_metrics.statement_class
+        self.assertEqual(statement_class("SELECT * FROM courses WHERE id = ?"), "select courses")
+        self.assertEqual(
+            statement_class("insert into course_students (course_id) values (?)"),
+            "insert course_students",
+        )
+        self.assertEqual(statement_class("UPDATE students SET name = ?"), "update students")
+        self.assertEqual(statement_class("BEGIN IMMEDIATE"), "begin")
+        self.assertEqual(statement_class("PRAGMA data_version"), "pragma")
+        self.assertEqual(statement_class("   "), "empty")
+
+    def test_latencies_fill_a_cumulative_histogram(self):
+        for seconds in (0.0001, 0.003, 0.003, 5):
+            collegeapp_metrics.on_statement("SELECT 1 FROM rooms", seconds, None)
+        collegeapp_metrics.on_statement("SELECT 1 FROM rooms", 0.0001, ValueError())
+
+        lines = collegeapp_metrics.collect()["collegeapp_db_query_duration_seconds"]["lines"]
+        self.assertIn('collegeapp_db_query_duration_seconds_bucket{statement="select rooms",le="0.0005"} 2', lines)
+        self.assertIn('collegeapp_db_query_duration_seconds_bucket{statement="select rooms",le="0.005"} 4', lines)
+        self.assertIn('collegeapp_db_query_duration_seconds_bucket{statement="select rooms",le="2.5"} 4', lines)
+        self.assertIn('collegeapp_db_query_duration_seconds_bucket{statement="select rooms",le="+Inf"} 5', lines)
+        self.assertIn('collegeapp_db_query_duration_seconds_count{statement="select rooms"} 5', lines)
+        errors = collegeapp_metrics.collect()["collegeapp_db_query_errors_total"]["lines"]
+        self.assertEqual(errors, ['collegeapp_db_query_errors_total{statement="select rooms"} 1'])
+
+    def test_every_worker_serves_every_workers_metrics(self):
+        collegeapp_metrics.on_statement("SELECT 1 FROM rooms", 0.001, None)
+        collegeapp_metrics.set_worker(0, self.directory)
+        collegeapp_metrics.publish()
+        collegeapp_metrics.set_worker(1, self.directory)
+
+        text = collegeapp_metrics.render()
+        self.assertIn('collegeapp_db_queries_total{statement="select rooms",worker="0"} 1', text)
+        self.assertIn('collegeapp_db_queries_total{statement="select rooms",worker="1"} 1', text)
+        self.assertEqual(text.count("# TYPE collegeapp_db_queries_total counter"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp
+import collegeapp_prerequisites
+import database_functions
+from collegeapp_prerequisites import PrerequisiteGraph
+
+
+class PrerequisiteGraphTest(unittest.TestCase):
+    def setUp(self):
+        # 3 needs 2, which needs 1
+        self.graph = PrerequisiteGraph()
+        for course_id in (1, 2, 3, 4):
+            self.graph.bit(course_id)
+        self.graph.add(2, 1)
+        self.graph.add(3, 2)
+
+    def test_only_direct_prerequisites_are_required(self):
+        graph = self.graph
+        self.assertEqual(graph.missing(3, graph.mask([2])), [])
+        self.assertEqual(graph.missing(3, graph.mask([1])), [2])
+        self.assertEqual(graph.eligible(graph.mask([2])), [1, 3, 4])
+        self.assertEqual(graph.all_prerequisites(3), [1, 2])
+
+    def test_cycles_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.graph.add(1, 3)
+        with self.assertRaises(ValueError):
+            self.graph.add(4, 4)
+        self.assertEqual(self.graph.all_prerequisites(1), [])
+
+    def test_removing_a_prerequisite_updates_dependents(self):
+        self.graph.remove(2, 1)
+        self.assertEqual(self.graph.all_prerequisites(3), [2])
+        self.assertEqual(self.graph.missing(2, 0), [])
+
+
+class CoursePrerequisiteTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, "college_data.db")
+        database_functions.initial_write(self.file)
+
+    def tearDown(self):
+        collegeapp_prerequisites.forget_graph(self.file)
+        database_functions.close_connections()
+        shutil.rmtree(self.directory)
+
+    def course(self, course_id):
+        course = collegeapp.Courses(None, None, None, None, course_id)
+        course.file = self.file
+        return course
+
+    def test_a_completed_chain_allows_the_next_course(self):
+        # Student 4 is only in course 3; 5 needs 3, which needs 1
+        self.course(3).add_prerequisite(1)
+        self.course(5).add_prerequisite(3)
+        student = collegeapp.Students(None, None, None, 4)
+        student.file = self.file
+
+        self.assertEqual(student.enroll(5), collegeapp.ENROLLED)
+
+    def test_a_failed_write_leaves_the_graph_unchanged(self):
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.course(5).add_prerequisite(99)
+        self.assertEqual(self.course(5).get_prerequisites(), [])
+
+    def test_new_courses_enter_the_graph(self):
+        student = collegeapp.Students(None, None, None, 5)
+        student.file = self.file
+        before = student.get_eligible_courses()
+        # id, name, department_id, description, credits, enrolled_count, capacity,
+        # meeting_days, start_time, end_time, room_id
+        row = (None, "Topology", 2, None, 3, 0, None, None, None, None, None)
+        self.course(None).create_row("courses", row)
+
+        new_id = database_functions.read_from_database(
+            self.file, "SELECT id FROM courses WHERE name = 'Topology'", "one"
+        )[0]
+        self.assertEqual(student.get_eligible_courses(), before + [new_id])
+
+
+if __name__ == "__main__":
+    unittest.main()
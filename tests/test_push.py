@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+import unittest
+
+try:
+    import bottle
+    import geventwebsocket
+except ImportError:
+    raise unittest.SkipTest("bottle and gevent-websocket are not installed")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp
+import collegeapp_push
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    def send(self, message):
+        self.sent.append(json.loads(message))
+
+    def close(self):
+        self.closed = True
+
+
+def event(kind, course_id, student_id=None):
+    return {"event": kind, "course_id": course_id, "student_id": student_id, "seq": None}
+
+
+class PushHubTest(unittest.TestCase):
+    def setUp(self):
+        self.hub = collegeapp_push.PushHub(max_pending=3)
+        self.socket = FakeSocket()
+        self.hub.connect("a", self.socket)
+        self.hub.subscribe("a", student_ids=[1], course_ids=[2])
+
+    def test_changes_are_coalesced_per_client(self):
+        self.hub.on_enrollment(event(collegeapp.ENROLLED, 2, 3))
+        self.hub.on_enrollment(event(collegeapp.WITHDRAWN, 2, 4))
+        self.hub.on_enrollment(event(collegeapp.ENROLLED, 3, 1))
+        self.hub.on_enrollment(event(collegeapp.ENROLLED, 4, 5))
+
+        self.assertEqual(self.hub.flush(), 1)
+        self.assertEqual(self.socket.sent, [{"reload": False, "students": [1], "courses": [2, 3]}])
+
+    def test_a_client_gets_nothing_new_until_it_acknowledges(self):
+        self.hub.on_enrollment(event(collegeapp.ENROLLED, 2, 3))
+        self.hub.flush()
+        self.hub.on_enrollment(event(collegeapp.COURSE_REMOVED, 5))
+
+        self.assertEqual(self.hub.flush(), 0)
+        self.hub.acknowledge("a")
+        self.assertEqual(self.hub.flush(), 1)
+        self.assertEqual(self.socket.sent[-1]["courses"], [5])
+
+    def test_too_many_changes_ask_for_a_reload(self):
+        for course_id in range(10, 15):
+            self.hub.on_enrollment(event(collegeapp.ENROLLED, course_id, 1))
+
+        self.hub.flush()
+        self.assertEqual(self.socket.sent, [{"reload": True, "students": [], "courses": []}])
+
+    def test_silent_clients_are_dropped(self):
+        hub = collegeapp_push.PushHub(ack_timeout=-1)
+        socket = FakeSocket()
+        hub.connect("a", socket)
+        hub.subscribe("a", course_ids=[2])
+        hub.on_enrollment(event(collegeapp.ENROLLED, 2, 3))
+        hub.flush()
+
+        hub.flush()
+        self.assertTrue(socket.closed)
+        self.assertEqual(hub.clients, {})
+        self.assertEqual(hub.course_clients, {})
+
+    def test_reconnecting_closes_the_old_socket(self):
+        socket = FakeSocket()
+        self.hub.connect("a", socket)
+        self.hub.disconnect("a", self.socket)
+
+        self.assertTrue(self.socket.closed)
+        self.assertIn("a", self.hub.clients)
+
+
+if __name__ == "__main__":
+    unittest.main()
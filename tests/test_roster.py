@@ -0,0 +1,53 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp
+import collegeapp_roster
+import database_functions
+
+
+class RosterCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, "college_data.db")
+        database_functions.initial_write(self.file)
+        self.cache = collegeapp_roster.get_roster_cache(self.file)
+
+    def tearDown(self):
+        collegeapp._enrollment_listeners.remove(self.cache.on_enrollment)
+        collegeapp_roster._caches.pop(self.file, None)
+        database_functions.close_connections()
+        shutil.rmtree(self.directory)
+
+    def names(self, course_id):
+        return self.cache.get_page(course_id)["students"]["data"]["name"]
+
+    def test_editing_a_student_refreshes_their_courses(self):
+        # Student 1 is enrolled in courses 1 and 2, student 4 in course 3
+        self.names(1), self.names(2), self.names(3)
+        student = collegeapp.Students(None, None, None, 1)
+        student.file = self.file
+        student.update(name="Renamed", id=1)
+
+        self.assertIn("Renamed", self.names(1))
+        self.assertIn("Renamed", self.names(2))
+        self.assertIn(3, self.cache.courses)
+
+    def test_enrolling_drops_only_that_course(self):
+        self.names(1), self.names(3)
+        student = collegeapp.Students(None, None, None, 5)
+        student.file = self.file
+        self.assertEqual(student.enroll(1), collegeapp.ENROLLED)
+
+        self.assertNotIn(1, self.cache.courses)
+        self.assertIn(3, self.cache.courses)
+        self.assertIn(5, self.cache.get_page(1)["students"]["data"]["id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
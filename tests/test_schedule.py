@@ -0,0 +1,42 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collegeapp_schedule import WeekIndex
+
+
+class WeekIndexTest(unittest.TestCase):
+    def test_back_to_back_meetings_do_not_clash(self):
+        week = WeekIndex.from_rows([(1, "MWF", 540, 600)])
+        self.assertEqual(week.conflicts("M", 600, 660), set())
+        self.assertEqual(week.conflicts("M", 480, 540), set())
+
+    def test_overlap_on_shared_day(self):
+        week = WeekIndex.from_rows([(1, "MWF", 540, 600), (2, "TR", 540, 615)])
+        self.assertEqual(week.conflicts("WR", 570, 630), {1, 2})
+        self.assertEqual(week.conflicts("S", 570, 630), set())
+
+    def test_nested_meetings(self):
+        # Course 1 (8:00-12:00) runs around course 2 (9:00-9:30)
+        week = WeekIndex.from_rows([(1, "M", 480, 720), (2, "M", 540, 570)])
+        self.assertEqual(week.conflicts("M", 600, 660), {1})
+        self.assertEqual(week.conflicts("M", 550, 560), {1, 2})
+        self.assertEqual(week.conflicts("M", 720, 780), set())
+
+    def test_meetings_without_times_are_skipped(self):
+        week = WeekIndex.from_rows([(1, "M", None, None)])
+        self.assertEqual(week.conflicts("M", 0, 1440), set())
+        self.assertEqual(week.conflicts("M", None, None), set())
+
+    def test_check_cart_reports_clashes_within_the_cart(self):
+        week = WeekIndex.from_rows([(1, "M", 480, 540)])
+        clashes = week.check_cart(
+            [(2, "M", 510, 570), (3, "T", 600, 660), (4, "T", 630, 690)]
+        )
+        self.assertEqual(clashes, {2: {1}, 4: {3}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    import gevent
+    import geventwebsocket
+except ImportError:
+    raise unittest.SkipTest("gevent-websocket is not installed")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp_server
+import database_functions
+
+
+class WatchDataVersionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, "college_data.db")
+        database_functions.initial_write(self.file)
+        self.calls = []
+        self.watcher = gevent.spawn(
+            collegeapp_server.watch_data_version, self.file, self.calls.append, 0.01
+        )
+        gevent.sleep(0.05)
+
+    def tearDown(self):
+        self.watcher.kill()
+        database_functions.close_connections()
+        shutil.rmtree(self.directory)
+
+    def test_hands_over_only_the_new_changes(self):
+        database_functions.write_to_database(
+            self.file, "DELETE FROM course_students WHERE course_id = 2 AND student_id = 3"
+        )
+        gevent.sleep(0.1)
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual([change[1:] for change in self.calls[0]], [("course_students", "D", 4, 2, 3)])
+
+    def test_writes_outside_the_changelog_are_not_handed_over(self):
+        database_functions.write_to_database(self.file, "UPDATE rooms SET capacity = capacity")
+        gevent.sleep(0.1)
+
+        self.assertEqual(self.calls, [])
+
+    def test_a_compacted_changelog_asks_for_a_rebuild(self):
+        database_functions.write_to_database(
+            self.file, "UPDATE departments SET name = name || '!' WHERE id = 1"
+        )
+        database_functions.write_to_database(
+            self.file, "UPDATE departments SET name = name || '!' WHERE id = 2"
+        )
+        database_functions.compact_changelog(self.file, retain=0)
+        gevent.sleep(0.1)
+
+        self.assertIn(None, self.calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
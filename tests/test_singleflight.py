@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+
+try:
+    import gevent
+except ImportError:
+    raise unittest.SkipTest("gevent is not installed")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collegeapp_singleflight import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_thread_and_greenlet_callers_share_one_call(self):
+        calls = []
+
+        def slow(value):
+            calls.append(value)
+            gevent.sleep(0.5)
+            return value * 2
+
+        flight = SingleFlight(slow)
+        leader = gevent.spawn(flight, 1)
+        gevent.sleep(0.01)
+        in_thread = gevent.get_hub().threadpool.spawn(flight, 1)
+        in_greenlet = gevent.spawn(flight, 1)
+        self.assertEqual([leader.get(), in_thread.get(), in_greenlet.get()], [2, 2, 2])
+        self.assertEqual(calls, [1])
+
+    def test_followers_of_a_killed_leader_raise(self):
+        flight = SingleFlight(lambda value: gevent.sleep(1))
+        leader = gevent.spawn(flight, 1)
+        gevent.sleep(0.01)
+        follower = gevent.spawn(flight, 1)
+        gevent.sleep(0.01)
+        leader.kill()
+        follower.join()
+        self.assertIsInstance(follower.exception, RuntimeError)
+
+
+if __name__ == "__main__":
+    unittest.main()
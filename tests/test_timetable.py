@@ -0,0 +1,65 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp_timetable
+import database_functions
+from collegeapp_timetable import TIME_SLOTS
+
+
+class SolveTest(unittest.TestCase):
+    def test_sections_never_share_a_room_or_an_instructor_slot(self):
+        problem = {
+            "sections": [(1, [7], 20), (2, [7], 20), (3, [8], 20), (4, [], 20)],
+            "rooms": [(1, 30)],
+            "availability": {},
+        }
+        assignments = collegeapp_timetable.solve(problem)["assignments"]
+
+        self.assertEqual(sorted(assignments), [1, 2, 3, 4])
+        self.assertEqual(len(set(assignments.values())), 4)
+        self.assertNotEqual(assignments[1][0], assignments[2][0])
+
+    def test_sections_without_a_fitting_room_or_slot_are_unassigned(self):
+        problem = {
+            "sections": [(1, [], 50), (2, [7], 10), (3, [7], 10)],
+            "rooms": [(1, 30)],
+            "availability": {7: [0]},
+        }
+        result = collegeapp_timetable.solve(problem)
+
+        # Section 1 fits no room; instructor 7 can only teach one of 2 and 3
+        self.assertEqual(list(result["assignments"].values()), [(0, 1)])
+        self.assertEqual(sorted(result["unassigned"] + list(result["assignments"])), [1, 2, 3])
+
+
+class WriteTimetableTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, "college_data.db")
+        database_functions.initial_write(self.file)
+
+    def tearDown(self):
+        database_functions.close_connections()
+        shutil.rmtree(self.directory)
+
+    def test_unassigned_sections_lose_their_old_slot(self):
+        database_functions.write_to_database(
+            self.file,
+            "UPDATE courses SET meeting_days = 'MWF', start_time = 480, end_time = 530, room_id = 1",
+        )
+        collegeapp_timetable.write_timetable(self.file, {2: (1, 3)})
+
+        rows = database_functions.read_from_database(
+            self.file,
+            "SELECT id, meeting_days, start_time, end_time, room_id FROM courses WHERE id IN (1, 2) ORDER BY id",
+        )
+        self.assertEqual(rows, [(1, None, None, None, None), (2, *TIME_SLOTS[1], 3)])
+
+
+if __name__ == "__main__":
+    unittest.main()
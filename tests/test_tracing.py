@@ -0,0 +1,81 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collegeapp_tracing
+import database_functions
+
+
+class TracingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(self.directory, "college_data.db")
+        database_functions.initial_write(self.file)
+        self.exporter = collegeapp_tracing.RingBufferExporter()
+
+    def tearDown(self):
+        collegeapp_tracing.configure(0)
+        database_functions.close_connections()
+        shutil.rmtree(self.directory)
+
+    def count_courses(self):
+        with collegeapp_tracing.span("count", table="courses"):
+            return database_functions.read_from_database(self.file, "SELECT COUNT(*) FROM courses", "one")[0]
+
+    def test_spans_of_a_trace_are_linked(self):
+        collegeapp_tracing.configure(1, [self.exporter])
+        traced = collegeapp_tracing.traced("request")(self.count_courses)
+
+        self.assertEqual(traced(), 5)
+
+        sql, count, request = self.exporter.get_spans()
+        self.assertEqual([sql["name"], count["name"], request["name"]], ["sql", "count", "request"])
+        self.assertEqual(sql["attributes"], {"statement": "SELECT COUNT(*) FROM courses"})
+        self.assertEqual(count["attributes"], {"table": "courses"})
+        self.assertIsNone(request["parent_id"])
+        self.assertEqual(count["parent_id"], request["span_id"])
+        self.assertEqual(sql["parent_id"], count["span_id"])
+        self.assertEqual({sql["trace_id"], count["trace_id"]}, {request["trace_id"]})
+        self.assertEqual(self.exporter.get_spans(request["trace_id"]), [sql, count, request])
+        self.assertEqual(self.exporter.get_spans("0" * 32), [])
+
+    def test_unsampled_traces_record_nothing(self):
+        collegeapp_tracing.configure(1e-12, [self.exporter])
+        self.assertEqual(collegeapp_tracing.traced()(self.count_courses)(), 5)
+        collegeapp_tracing.configure(0, [self.exporter])
+        self.assertEqual(collegeapp_tracing.traced()(self.count_courses)(), 5)
+
+        self.assertEqual(self.exporter.get_spans(), [])
+
+    def test_errors_are_recorded_and_raised(self):
+        collegeapp_tracing.configure(1, [self.exporter])
+        with self.assertRaises(Exception):
+            with collegeapp_tracing.span("broken"):
+                database_functions.write_to_database(self.file, "INSERT INTO nowhere VALUES (1)")
+
+        sql, broken = self.exporter.get_spans()
+        self.assertEqual(broken["name"], "broken")
+        self.assertIn("no such table", sql["error"])
+        self.assertIn("no such table", broken["error"])
+
+    def test_exporters(self):
+        ring = collegeapp_tracing.RingBufferExporter(size=2)
+        path = os.path.join(self.directory, "spans.jsonl")
+        collegeapp_tracing.configure(1, [ring, collegeapp_tracing.JsonlExporter(path)])
+        for name in ("first", "second", "third"):
+            with collegeapp_tracing.span(name):
+                pass
+
+        self.assertEqual([span["name"] for span in ring.get_spans()], ["second", "third"])
+        with open(path, encoding="utf-8") as spans:
+            self.assertEqual([json.loads(line)["name"] for line in spans], ["first", "second", "third"])
+        self.assertIs(collegeapp_tracing.get_exporter(collegeapp_tracing.RingBufferExporter), ring)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,389 @@
+// Run several read-only backend functions in one round trip; calls are [name, args] pairs
+async function batchCall(calls) {
+    const results = await eel.batch(calls)();
+    return results.map((result, i) => {
+        if ('error' in result) {
+            throw new Error(`${calls[i][0]}: ${result.error}`);
+        }
+        return result.value;
+    });
+}
+
+// Decode a columnar payload ({columns, data, dictionaries}) into row arrays
+function decodeColumnar(payload) {
+    if (!payload) {
+        return [];
+    }
+    const columns = payload.columns.map(column => {
+        const values = payload.data[column];
+        const dictionary = payload.dictionaries && payload.dictionaries[column];
+        return dictionary ? values.map(code => dictionary[code]) : values;
+    });
+    const rowCount = columns.length ? columns[0].length : 0;
+    const rows = new Array(rowCount);
+    for (let i = 0; i < rowCount; i++) {
+        rows[i] = columns.map(values => values[i]);
+    }
+    return rows;
+}
+
+// Reference tables cached in IndexedDB, and their in-memory copies by id
+const REFERENCE_TABLES = ['courses', 'departments', 'instructors'];
+const referenceData = {courses: new Map(), departments: new Map(), instructors: new Map()};
+const referenceVersions = {};
+
+// Open the reference cache, or resolve to null where IndexedDB is not available
+function openReferenceDb() {
+    return new Promise(resolve => {
+        if (!window.indexedDB) {
+            resolve(null);
+            return;
+        }
+        const request = indexedDB.open('college-reference', 1);
+        request.onupgradeneeded = () => {
+            const db = request.result;
+            REFERENCE_TABLES.forEach(table => db.createObjectStore(table, {keyPath: 'id'}));
+            db.createObjectStore('versions');
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => resolve(null);
+    });
+}
+
+// Wrap an IndexedDB request or transaction in a promise
+function idbDone(target) {
+    return new Promise((resolve, reject) => {
+        if (target instanceof IDBTransaction) {
+            target.oncomplete = () => resolve();
+            target.onerror = () => reject(target.error);
+        } else {
+            target.onsuccess = () => resolve(target.result);
+            target.onerror = () => reject(target.error);
+        }
+    });
+}
+
+// Turn a columnar payload into objects keyed by column name
+function columnarObjects(payload) {
+    return decodeColumnar(payload).map(row => {
+        const record = {};
+        payload.columns.forEach((column, i) => record[column] = row[i]);
+        return record;
+    });
+}
+
+// Bring the cached reference tables up to date, refetching only the changed rows
+async function syncReferenceData(versions = null) {
+    if (versions === null) {
+        versions = await eel.get_versions()();
+    }
+    const db = await openReferenceDb();
+
+    for (const table of REFERENCE_TABLES) {
+        if (db && referenceVersions[table] === undefined) {
+            const tx = db.transaction([table, 'versions']);
+            const cachedVersion = await idbDone(tx.objectStore('versions').get(table));
+            const records = await idbDone(tx.objectStore(table).getAll());
+            if (cachedVersion !== undefined) {
+                referenceVersions[table] = cachedVersion;
+                referenceData[table] = new Map(records.map(record => [record.id, record]));
+            }
+        }
+
+        const cachedVersion = referenceVersions[table];
+        if (cachedVersion !== undefined && versions[table] <= cachedVersion) {
+            continue;
+        }
+
+        const delta = await eel.get_reference_data(table, cachedVersion === undefined ? null : cachedVersion)();
+        const changed = columnarObjects(delta.rows);
+        const records = referenceData[table];
+        if (delta.full) {
+            records.clear();
+        }
+        changed.forEach(record => records.set(record.id, record));
+        delta.deleted.forEach(id => records.delete(id));
+        referenceVersions[table] = delta.version;
+
+        if (db) {
+            const tx = db.transaction([table, 'versions'], 'readwrite');
+            const store = tx.objectStore(table);
+            if (delta.full) {
+                store.clear();
+            }
+            changed.forEach(record => store.put(record));
+            delta.deleted.forEach(id => store.delete(id));
+            tx.objectStore('versions').put(delta.version, table);
+            await idbDone(tx);
+        }
+    }
+}
+
+// Local copy of the students table, kept current with deltas from the backend
+const studentCache = {version: null, rows: new Map()};
+
+// Fetch the students changed since the cached version and apply them
+async function loadStudents(delta = null) {
+    if (delta === null) {
+        delta = await eel.get_student_data(studentCache.version)();
+    }
+    if (delta.full) {
+        studentCache.rows.clear();
+    }
+    decodeColumnar(delta.rows).forEach(student => studentCache.rows.set(student[0], student));
+    delta.deleted.forEach(id => studentCache.rows.delete(id));
+    studentCache.version = delta.version;
+    return Array.from(studentCache.rows.values()).sort((a, b) => a[0] - b[0]);
+}
+
+// Load the selected instructor's courses into the course table
+async function loadInstructorCourses() {
+    const instructorId = parseInt($('#instructor-list').val());
+    if (isNaN(instructorId)) {
+        return;
+    }
+    const courses = decodeColumnar(await eel.get_instructor_courses(instructorId)());
+    pushState.instructorId = instructorId;
+    pushState.courseIds = courses.map(course => course[0]);
+    pushState.rosterCourseId = null;
+    await updatePushSubscriptions();
+
+    const courseTableBody = $('#course-table tbody');
+    courseTableBody.empty();
+    courses.forEach(course => {
+        const row = `<tr>
+                        <td>${course[0]}</td>
+                        <td>${course[1]}</td>
+                        <td>${course[2]}</td>
+                        <td>${course[3]}</td>
+                        <td>${course[4]}</td>
+                        <td><button class="roster-btn" data-course-id="${course[0]}">View</button></td>
+                     </tr>`;
+        courseTableBody.append(row);
+    });
+
+    $('#roster-table-container').hide();
+    $('#course-table-container').show();
+}
+
+// Load the selected student's schedule into the class table
+async function loadStudentSchedule() {
+    const selectedOption = $('#student-list option:selected');
+    const studentData = $(selectedOption).data('student-info'); // Retrieve the stored student data
+
+    if (studentData) {
+        // Get the schedule and the reference data versions in one round trip
+        const [schedulePayload, versions] = await batchCall([
+            ['get_student_classes', [studentData]], // Pass the full student data
+            ['get_versions', []],
+        ]);
+        await syncReferenceData(versions);
+        const pairs = decodeColumnar(schedulePayload);
+
+        // Resolve the course and instructor names from the cached reference data
+        const schedule = new Map();
+        pairs.forEach(([courseId, instructorId]) => {
+            if (!schedule.has(courseId)) {
+                schedule.set(courseId, []);
+            }
+            const instructor = referenceData.instructors.get(instructorId);
+            if (instructor) {
+                schedule.get(courseId).push(instructor.name);
+            }
+        });
+
+        // Populate the class table with the schedule data
+        const classTableBody = $('#class-table tbody');
+        classTableBody.empty(); // Clear previous rows
+
+        schedule.forEach((instructors, courseId) => {
+            const course = referenceData.courses.get(courseId);
+            if (course) {
+                const row = `<tr>
+                                <td>${course.id}</td>
+                                <td>${course.name}</td>
+                                <td>${course.department_id}</td>
+                                <td>${course.description}</td>
+                                <td>${course.credits}</td>
+                                <td>${instructors.join(', ')}</td>
+                             </tr>`;
+                classTableBody.append(row);
+            } else {
+                console.error('Course is missing from the reference data:', courseId);
+            }
+        });
+
+        pushState.studentId = studentData[0];
+        pushState.scheduleCourseIds = Array.from(schedule.keys());
+        await updatePushSubscriptions();
+
+        $('#class-table-container').show();
+    } else {
+        $('#class-table-container').hide();
+    }
+}
+
+// Id of this window for the backend's push subscriptions
+const pushClientId = Math.random().toString(36).slice(2);
+
+// Milliseconds to wait before reconnecting a closed push socket
+const PUSH_RECONNECT_DELAY = 2000;
+
+// What this window shows, so pushed changes can refresh just those views
+const pushState = {
+    studentId: null, scheduleCourseIds: [], instructorId: null, courseIds: [], rosterCourseId: null
+};
+
+// This window's own WebSocket to the backend's push hub
+let pushSocket = null;
+
+// Open the push socket; the backend closes it when it drops this window, so reconnect then
+function connectPush() {
+    const protocol = location.protocol === 'https:' ? 'wss:' : 'ws:';
+    pushSocket = new WebSocket(`${protocol}//${location.host}/push?client=${pushClientId}`);
+    pushSocket.onopen = () => updatePushSubscriptions();
+    pushSocket.onmessage = event => pushChanges(JSON.parse(event.data));
+    pushSocket.onclose = () => setTimeout(connectPush, PUSH_RECONNECT_DELAY);
+}
+
+// Subscribe to changes of the shown student and courses
+async function updatePushSubscriptions() {
+    if (pushSocket === null || pushSocket.readyState !== WebSocket.OPEN) {
+        return; // Sent once the socket opens
+    }
+    const studentIds = pushState.studentId === null ? [] : [pushState.studentId];
+    pushSocket.send(JSON.stringify({type: 'subscribe', students: studentIds, courses: pushState.courseIds}));
+}
+
+// Refresh the views affected by changes pushed from the backend
+async function pushChanges(changes) {
+    const changed = ids => changes.reload || ids.some(id => changes.courses.includes(id));
+
+    try {
+        if (pushState.studentId !== null &&
+                (changes.students.includes(pushState.studentId) || changed(pushState.scheduleCourseIds))) {
+            await loadStudentSchedule();
+        }
+        if (pushState.instructorId !== null && changed(pushState.courseIds)) {
+            const rosterCourseId = pushState.rosterCourseId;
+            await loadInstructorCourses();
+            if (rosterCourseId !== null) {
+                await loadRosterPage(rosterCourseId, null);
+            }
+        }
+    } finally {
+        // Acknowledge only once handled, so the backend merges further changes meanwhile
+        if (pushSocket.readyState === WebSocket.OPEN) {
+            pushSocket.send(JSON.stringify({type: 'ack'}));
+        }
+    }
+}
+
+// Fill the admin dashboard with the headcounts and course lists
+async function loadAdminDashboard(dashboard = null) {
+    if (dashboard === null) {
+        dashboard = await eel.get_admin_dashboard()();
+    }
+
+    const counts = dashboard.counts;
+    $('#dashboard-counts').text(
+        `Students: ${counts.students || 0} | Courses: ${counts.courses || 0} | ` +
+        `Instructors: ${counts.instructors || 0} | Enrollments: ${counts.enrollments || 0}`
+    );
+
+    const majorTableBody = $('#major-table tbody');
+    majorTableBody.empty();
+    dashboard.majors.forEach(([major, students]) => {
+        majorTableBody.append(`<tr><td>${major}</td><td>${students}</td></tr>`);
+    });
+
+    [['#largest-course-table', dashboard.largest], ['#emptiest-course-table', dashboard.emptiest]].forEach(([table, courses]) => {
+        const tableBody = $(`${table} tbody`);
+        tableBody.empty();
+        courses.forEach(([id, name, enrolled, capacity]) => {
+            tableBody.append(`<tr>
+                                <td>${id}</td>
+                                <td>${name}</td>
+                                <td>${enrolled}</td>
+                                <td>${capacity === null ? '' : capacity}</td>
+                             </tr>`);
+        });
+    });
+
+    const unassignedTableBody = $('#unassigned-course-table tbody');
+    unassignedTableBody.empty();
+    dashboard.unassigned.forEach(([id, name]) => {
+        unassignedTableBody.append(`<tr><td>${id}</td><td>${name}</td></tr>`);
+    });
+}
+
+// Fill the admin tables with the department and instructor figures
+async function loadAdminAnalytics(analytics = null) {
+    if (analytics === null) {
+        analytics = await eel.get_admin_analytics()();
+    }
+
+    const departmentTableBody = $('#department-table tbody');
+    departmentTableBody.empty();
+    analytics.departments.forEach(department => {
+        const row = `<tr>
+                        <td>${department.name}</td>
+                        <td>${department.courses}</td>
+                        <td>${department.enrollment}</td>
+                        <td>${department.credit_hours}</td>
+                        <td>${department.instructors}</td>
+                        <td>${department.teaching_credits}</td>
+                        <td>${department.staff}</td>
+                     </tr>`;
+        departmentTableBody.append(row);
+    });
+
+    const instructorTableBody = $('#instructor-load-table tbody');
+    instructorTableBody.empty();
+    analytics.instructors.forEach(instructor => {
+        const row = `<tr>
+                        <td>${instructor.name}</td>
+                        <td>${instructor.department_id}</td>
+                        <td>${instructor.courses}</td>
+                        <td>${instructor.credits}</td>
+                     </tr>`;
+        instructorTableBody.append(row);
+    });
+}
+
+// Append one roster page to the roster table and remember where the next one starts
+async function loadRosterPage(courseId, afterId) {
+    const page = await eel.get_course_roster(courseId, afterId)();
+    pushState.rosterCourseId = courseId;
+    const rosterTableBody = $('#roster-table tbody');
+    if (afterId === null) {
+        rosterTableBody.empty();
+    }
+
+    decodeColumnar(page.students).forEach(student => {
+        const row = `<tr>
+                        <td>${student[0]}</td>
+                        <td>${student[1]}</td>
+                        <td>${student[2]}</td>
+                        <td>${student[3]}</td>
+                     </tr>`;
+        rosterTableBody.append(row);
+    });
+
+    $('#roster-more-btn').data('course-id', courseId).data('after-id', page.next);
+    $('#roster-more-btn').toggle(page.next !== null);
+    $('#roster-table-container').show();
+}
+
 $(document).ready(function(){
+    connectPush();
+
     // Initially hide elements
     $('#main-menu').hide();
     $('#student-content').hide();
     $('#class-table-container').hide();
+    $('#admin-content').hide();
+    $('#professor-content').hide();
 
     // Role change handler (if needed for future enhancements)
     $('#role').change(function(){
@@ -13,8 +394,20 @@ $(document).ready(function(){
     $('#login-btn').click(async function(){
         const selectedRole = $('#role').val();
 
+        // Fetch everything the chosen role's screen needs in one batch
+        const calls = [['send_data', [selectedRole]]];
+        if (selectedRole === 'student') {
+            calls.push(['get_student_data', [studentCache.version]], ['get_versions', []]);
+        } else if (selectedRole === 'professor') {
+            calls.push(['get_instructor_data', []]);
+        } else if (selectedRole === 'admin') {
+            calls.push(['get_admin_analytics', []], ['get_admin_dashboard', []]);
+        }
+        const [, ...results] = await batchCall(calls);
+
         if (selectedRole === 'student') {
-            const students = await eel.get_student_data()();
+            const students = await loadStudents(results[0]);
+            await syncReferenceData(results[1]);
             
             // Populate the student dropdown
             const studentList = $('#student-list');
@@ -35,44 +428,46 @@ $(document).ready(function(){
             $('#student-content').hide();
         }
 
-        await eel.send_data(selectedRole);
+        if (selectedRole === 'professor') {
+            const instructors = decodeColumnar(results[0]);
+
+            const instructorList = $('#instructor-list');
+            instructorList.empty();
+            instructors.forEach(instructor => {
+                const option = $('<option></option>').val(instructor[0]).text(instructor[1]);
+                instructorList.append(option);
+            });
+
+            $('#professor-content').show();
+        } else {
+            $('#professor-content').hide();
+        }
+
+        if (selectedRole === 'admin') {
+            await loadAdminAnalytics(results[0]);
+            await loadAdminDashboard(results[1]);
+            $('#admin-content').show();
+        } else {
+            $('#admin-content').hide();
+        }
+
         //document.getElementById('myele').innerText = await eel.get_data()();
         $('#role-selection').hide();
         $('#student-main-menu').show();
     });
 
-    // Load Classes button click event
-    $('#load-classes-btn').click(async function(){
-        const selectedOption = $('#student-list option:selected');
-        const studentData = $(selectedOption).data('student-info'); // Retrieve the stored student data
-    
-        if (studentData) {
-            // Send the student's data back to the Python backend to get the schedule
-            const schedule = await eel.get_student_classes(studentData)(); // Pass the full student data
-    
-            // Populate the class table with the schedule data
-            const classTableBody = $('#class-table tbody');
-            classTableBody.empty(); // Clear previous rows
-    
-            schedule.forEach(cls => {
-                if(cls[0] && cls[1] && cls[2] && cls[3] && cls[4] && cls[5]) {
-                    const row = `<tr>
-                                    <td>${cls[0]}</td>
-                                    <td>${cls[1]}</td>
-                                    <td>${cls[2]}</td>
-                                    <td>${cls[3]}</td>
-                                    <td>${cls[4]}</td>
-                                    <td>${cls[5]}</td>
-                                 </tr>`;
-                    classTableBody.append(row);
-                } else {
-                    console.error('Class tuple is missing expected elements:', cls);
-                }
-            });
-    
-            $('#class-table-container').show();
-        } else {
-            $('#class-table-container').hide();
-        }
+    // Load Courses button click event (professor)
+    $('#load-courses-btn').click(loadInstructorCourses);
+
+    // Roster buttons are created with the course table, so delegate the click
+    $('#course-table').on('click', '.roster-btn', async function(){
+        await loadRosterPage($(this).data('course-id'), null);
+    });
+
+    $('#roster-more-btn').click(async function(){
+        await loadRosterPage($(this).data('course-id'), $(this).data('after-id'));
     });
+
+    // Load Classes button click event
+    $('#load-classes-btn').click(loadStudentSchedule);
 });
\ No newline at end of file